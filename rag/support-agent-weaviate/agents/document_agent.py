@@ -1,31 +1,50 @@
+import asyncio
 import os
 import tempfile
 import uuid
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import List, Dict, Any
-from llama_index.core import SimpleDirectoryReader
+from typing import Any, Awaitable, Callable, Dict, List
+import numpy as np
 from llama_index.core.node_parser import SentenceSplitter
 from agents.embedding_agent import EmbeddingAgent
+from agents.parsing import get_parse_pool, parse_file, payloads_to_documents, shutdown_parse_pool
+from config import Config
+from services.chunker import OffsetChunker
+from services.dedup import ChunkDeduplicator
+from services.ingestion_jobs import FILE_CHUNKED, FILE_FAILED, FILE_PARSED, FILE_STORED, FILE_UNCHANGED, IngestionCheckpoint
+from services.stage_timer import StageTimer
+from services.uploads import upload_sha256, upload_size
+from services.vector_backends import chunk_id, content_hash, merge_ingestion_reports
 
 class DocumentAgent:
-    def __init__(self):
-        self.embedding_agent = EmbeddingAgent()
+    def __init__(self, embedding_agent: EmbeddingAgent = None, deduplicator: ChunkDeduplicator = None):
+        self.embedding_agent = embedding_agent or EmbeddingAgent()
+        self.deduplicator = deduplicator
     
     def save_uploaded_files(self, uploaded_files: List[Dict], temp_dir: str) -> List[str]:
-        """Save uploaded files to temporary directory"""
+        """Save uploaded files to temporary directory (spooled uploads are used in place).
+
+        Each file gets its own subdirectory, so uploads sharing a file name
+        never overwrite each other while they are parsed concurrently.
+        """
         input_files = []
         for file_data in uploaded_files:
-            if not all(key in file_data for key in ['filename', 'content']):
+            if 'filename' not in file_data or not ('content' in file_data or 'path' in file_data):
                 continue
                 
             filename = file_data['filename']
-            content = file_data['content']
             
-            if len(content) == 0:
+            if upload_size(file_data) == 0:
                 print(f"⚠️ Skipping empty file: {filename}")
                 continue
             
-            file_path = os.path.join(temp_dir, filename)
+            if 'path' in file_data:
+                input_files.append(file_data['path'])
+                continue
+            
+            content = file_data['content']
+            file_path = os.path.join(tempfile.mkdtemp(dir=temp_dir), os.path.basename(filename))
             
             try:
                 with open(file_path, "wb") as f:
@@ -38,44 +57,76 @@ class DocumentAgent:
         
         return input_files
     
-    def load_documents_with_llamaindex(self, input_files: List[str]) -> List:
+    @staticmethod
+    def _attach_metadata(documents: List, batch_id: str = None, source: str = None) -> List:
+        batch_id = batch_id or str(uuid.uuid4())
+        for i, doc in enumerate(documents):
+            doc.metadata.update({
+                "source": source or doc.metadata.get("file_name", f"Document_{i}"),
+                "ingestion_date": datetime.now().isoformat(),
+                "document_id": batch_id,
+                "batch_id": batch_id,
+                "file_index": i
+            })
+        return documents
+    
+    def load_documents_with_llamaindex(self, input_files: List[str], batch_id: str = None) -> List:
         """Load documents using LlamaIndex"""
         try:
-            documents = SimpleDirectoryReader(
-                input_files=input_files,
-                required_exts=[".txt", ".pdf", ".docx", ".md"]
-            ).load_data(show_progress=False)
+            documents = []
+            for path in input_files:
+                documents.extend(payloads_to_documents(parse_file(path)))
             
             if not documents:
                 raise Exception("No documents were loaded - check file formats")
             
-            # Add metadata
-            batch_id = str(uuid.uuid4())
-            for i, doc in enumerate(documents):
-                doc.metadata.update({
-                    "source": doc.metadata.get("file_name", f"Document_{i}"),
-                    "ingestion_date": datetime.now().isoformat(),
-                    "document_id": batch_id,
-                    "batch_id": batch_id,
-                    "file_index": i
-                })
-            
+            self._attach_metadata(documents, batch_id)
             print(f"📖 Loaded {len(documents)} documents with LlamaIndex")
             return documents
             
         except Exception as e:
             raise Exception(f"Error loading documents: {str(e)}")
     
+    async def parse_file(self, path: str, batch_id: str = None, source: str = None) -> List:
+        """Parse one file in the process pool (PARSE_WORKERS) so CPU-bound PDF/DOCX parsing
+        neither blocks the event loop nor holds the GIL; falls back to a thread when disabled.
+        Chunks get ``source`` as their source (default: the file name)"""
+        pool = get_parse_pool()
+        try:
+            if pool is None:
+                payloads = await asyncio.to_thread(parse_file, path)
+            else:
+                payloads = await asyncio.get_running_loop().run_in_executor(pool, parse_file, path)
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM on a huge PDF); start a fresh pool for the next file
+            shutdown_parse_pool()
+            raise Exception(f"Parser process crashed: {e}")
+        except Exception as e:
+            raise Exception(f"Error loading documents: {str(e)}")
+        
+        if not payloads:
+            raise Exception("No documents were loaded - check file formats")
+        documents = self._attach_metadata(payloads_to_documents(payloads), batch_id, source)
+        print(f"📖 Parsed {os.path.basename(path)} into {len(documents)} documents")
+        return documents
+    
     def create_chunks(self, documents: List, chunk_size: int, chunk_overlap: int) -> List:
-        """Create chunks using SentenceSplitter"""
+        """Create chunks with SentenceSplitter (or the offset chunker when CHUNKER=offset).
+
+        Both return objects with ``.text`` and ``.metadata``; the offset chunker's
+        are slim records pointing into the parsed documents.
+        """
         try:
-            parser = SentenceSplitter(
-                chunk_size=chunk_size, 
-                chunk_overlap=chunk_overlap,
-                paragraph_separator="\n\n",
-                secondary_chunking_regex="[.!?]+\\s+"
-            )
-            nodes = parser.get_nodes_from_documents(documents, show_progress=False)
+            if Config.CHUNKER == "offset":
+                nodes = OffsetChunker(chunk_size, chunk_overlap).chunk_documents(documents)
+            else:
+                parser = SentenceSplitter(
+                    chunk_size=chunk_size, 
+                    chunk_overlap=chunk_overlap,
+                    paragraph_separator="\n\n",
+                    secondary_chunking_regex="[.!?]+\\s+"
+                )
+                nodes = parser.get_nodes_from_documents(documents, show_progress=False)
             
             if not nodes:
                 raise Exception("No chunks were created from documents")
@@ -86,13 +137,145 @@ class DocumentAgent:
         except Exception as e:
             raise Exception(f"Error chunking documents: {str(e)}")
     
+    @staticmethod
+    def source_name(file_data: Dict) -> str:
+        """Source key of an uploaded file (matches the `source` property of its chunks).
+
+        Files collected from a directory carry their path relative to it as ``source``;
+        uploads are keyed by file name.
+        """
+        return file_data.get("source") or os.path.basename(file_data.get("filename", ""))
+    
+    def _skip_unchanged_files(self, uploaded_files: List[Dict], existing_chunks: Dict[str, Dict[str, str]], source_hashes: Dict[str, str], checkpoint: IngestionCheckpoint = None) -> List[Dict]:
+        """Drop files whose stored chunks were all written from identical bytes.
+
+        Files an interrupted job already started may be only partly stored, so
+        they are never skipped; their stored chunks are skipped one by one.
+        """
+        changed = []
+        for file_data in uploaded_files:
+            source = self.source_name(file_data)
+            stored = existing_chunks.get(source) or {}
+            resumed = checkpoint is not None and checkpoint.is_started(source)
+            if stored and not resumed and all(h == source_hashes.get(source) for h in stored.values()):
+                print(f"⏭️ Unchanged, skipping: {source}")
+                continue
+            changed.append(file_data)
+        return changed
+    
+    async def _embed_checkpointed(self, source: str, documents: List[Dict], ids: List[str], checkpoint: IngestionCheckpoint) -> np.ndarray:
+        """Embed a file's chunks, reusing vectors a previous run checkpointed and checkpointing new ones per group"""
+        cached = checkpoint.load_embeddings(ids)
+        missing = [i for i, object_id in enumerate(ids) if object_id not in cached]
+        if cached:
+            print(f"♻️ {source}: reusing {len(ids) - len(missing)} checkpointed embeddings")
+        # One group is what the embedding agent sends concurrently; a failure loses at most that much work
+        group = max(1, Config.EMBEDDING_BATCH_SIZE * Config.EMBEDDING_MAX_CONCURRENCY)
+        fresh = {}
+        for start in range(0, len(missing), group):
+            indices = missing[start:start + group]
+            vectors = await self.embedding_agent.generate_embeddings_batch([documents[i]["content"] for i in indices])
+            group_ids = [ids[i] for i in indices]
+            checkpoint.save_embeddings(source, group_ids, vectors)
+            fresh.update(zip(group_ids, vectors))
+        return np.stack([cached[object_id] if object_id in cached else fresh[object_id] for object_id in ids]).astype(np.float32, copy=False)
+    
+    def _embedding_requests(self, documents: List[Dict[str, Any]]) -> int:
+        """Embedding API requests the batcher would plan for these chunks (cache hits aside)"""
+        texts = [doc["content"] for doc in documents]
+        return len(self.embedding_agent.plan_batches(texts))
+    
+    def _save_file(self, file_data: Dict, temp_dir: str) -> str:
+        """Write one upload to the temp dir; returns its path or None when invalid/empty"""
+        saved = self.save_uploaded_files([file_data], temp_dir)
+        return saved[0] if saved else None
+    
+    def _prepare_chunks(self, nodes: List, existing: Dict[str, str], source_hash: str) -> Dict[str, Any]:
+        """Derive chunk ids for one file's nodes and build storage records for chunks not stored yet"""
+        seen = set()
+        documents, ids = [], []
+        unchanged = 0
+        for i, node in enumerate(nodes):
+            source_file = node.metadata.get("source", "Unknown")
+            text = node.text
+            chunk_hash = content_hash(text)
+            object_id = chunk_id(source_file, chunk_hash)
+            if object_id in seen:
+                continue  # identical chunk repeated within the same source
+            seen.add(object_id)
+            if existing is not None and object_id in existing:
+                unchanged += 1
+                continue
+            file_type = source_file.split('.')[-1].lower() if '.' in source_file else "unknown"
+            documents.append({
+                "content": text,
+                "source": source_file,
+                "document_id": node.metadata.get("document_id", str(uuid.uuid4())),
+                "chunk_index": i,
+                "file_type": file_type,
+                "total_chunks": len(nodes),
+                "ingestion_date": node.metadata.get("ingestion_date", datetime.now().isoformat()),
+                "batch_id": node.metadata.get("batch_id", "unknown"),
+                "chunk_size": len(text),
+                "content_hash": chunk_hash,
+                "source_hash": source_hash
+            })
+            ids.append(object_id)
+        stale, legacy = [], 0
+        for object_id, stored_hash in (existing or {}).items():
+            if object_id in seen:
+                continue
+            # Chunks stored before incremental ingestion have no source_hash: never delete them as stale
+            if stored_hash:
+                stale.append(object_id)
+            else:
+                legacy += 1
+        return {"documents": documents, "ids": ids, "unchanged": unchanged, "stale": stale, "legacy": legacy}
+    
     async def process_documents(
         self, 
         uploaded_files: List[Dict], 
         chunk_size: int = None, 
-        chunk_overlap: int = None
+        chunk_overlap: int = None,
+        existing_chunks: Dict[str, Dict[str, str]] = None,
+        store: Callable[[List[Dict[str, Any]], np.ndarray, List[str]], Awaitable[Dict[str, Any]]] = None,
+        checkpoint: IngestionCheckpoint = None,
+        progress: Callable[[str, str, int], None] = None
     ) -> Dict[str, Any]:
-        """Main processing function"""
+        """Main processing function.
+
+        Files stream through parse → chunk → embed → store stages connected by
+        bounded queues (INGEST_QUEUE_SIZE files in flight per hop), so parsing
+        the next file overlaps embedding/storing the previous one and memory
+        holds only a few files' text and vectors at a time. ``store`` is an
+        async callable ``(documents, embeddings, ids) -> ingestion_report``;
+        without it the chunks and a single embedding matrix are returned in
+        ``documents``/``embeddings``/``ids`` instead.
+
+        Every chunk gets a deterministic id derived from (source, chunk content
+        hash). When ``existing_chunks`` ({source: {id: source_hash}}, from the
+        vector backend) is given, ingestion is incremental: unchanged files are
+        not parsed, unchanged chunks are not embedded, and ids that no longer
+        occur in a re-uploaded source are returned as ``stale_ids``.
+
+        ``checkpoint`` (an ingestion job, see services.ingestion_jobs) records
+        per-file progress and every embedded chunk, so a failed or interrupted
+        run can be resumed without re-embedding. ``progress(event, source, count)``
+        is called as files move through the stages (parsed/chunked/embedded/
+        stored, or unchanged/failed).
+
+        With a ``deduplicator`` (services.dedup), new chunks that exactly or
+        nearly duplicate a chunk already stored, or one kept earlier in the
+        run, are dropped before embedding and recorded against that original;
+        ``dedup`` in the result counts the embeddings, embedding requests and
+        stored objects this avoided.
+        """
+        
+        def report_file(source: str, state: str, count: int = 0, **details):
+            if checkpoint is not None:
+                checkpoint.file_state(source, state, **details)
+            if progress is not None:
+                progress(state, source, count)
         
         if chunk_size is None:
             chunk_size = Config.DEFAULT_CHUNK_SIZE
@@ -102,66 +285,236 @@ class DocumentAgent:
         if not uploaded_files:
             raise Exception("No files provided for processing")
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            try:
-                # Step 1: Save files
-                print("📥 Saving uploaded files...")
-                input_files = self.save_uploaded_files(uploaded_files, temp_dir)
-                
-                if not input_files:
-                    raise Exception("No valid files to process after validation")
-                
-                # Step 2: Load with LlamaIndex
-                print("📖 Loading documents with LlamaIndex...")
-                documents = self.load_documents_with_llamaindex(input_files)
-                
-                # Step 3: Create chunks
-                print("✂️ Creating text chunks...")
-                nodes = self.create_chunks(documents, chunk_size, chunk_overlap)
-                
-                # Step 4: Generate embeddings
-                print("🧠 Generating embeddings...")
-                contents = [node.text for node in nodes]
-                embeddings = await self.embedding_agent.generate_embeddings_batch(contents)
-                
-                # Step 5: Prepare documents for storage
-                prepared_docs = []
-                for i, (node, embedding) in enumerate(zip(nodes, embeddings)):
-                    source_file = node.metadata.get("source", "Unknown")
-                    file_type = source_file.split('.')[-1].lower() if '.' in source_file else "unknown"
-                    
-                    doc_data = {
-                        "content": node.text,
-                        "source": source_file,
-                        "document_id": node.metadata.get("document_id", str(uuid.uuid4())),
-                        "chunk_index": i,
-                        "file_type": file_type,
-                        "total_chunks": len(nodes),
-                        "ingestion_date": node.metadata.get("ingestion_date", datetime.now().isoformat()),
-                        "batch_id": node.metadata.get("batch_id", "unknown"),
-                        "chunk_size": len(node.text)
-                    }
-                    prepared_docs.append((doc_data, embedding))
-                
-                # Calculate statistics
-                total_characters = sum(len(node.text) for node in nodes)
-                avg_chunk_size = total_characters / len(nodes) if nodes else 0
-                
-                result = {
+        source_hashes = {
+            self.source_name(f): upload_sha256(f)
+            for f in uploaded_files if f.get("filename") and (f.get("content") or f.get("path"))
+        }
+        files_unchanged = 0
+        if existing_chunks is not None:
+            changed_files = self._skip_unchanged_files(uploaded_files, existing_chunks, source_hashes, checkpoint)
+            files_unchanged = len(uploaded_files) - len(changed_files)
+            changed_sources = {self.source_name(f) for f in changed_files}
+            for f in uploaded_files:
+                source = self.source_name(f)
+                if source not in changed_sources:
+                    report_file(source, FILE_UNCHANGED, chunks=len(existing_chunks.get(source) or {}))
+            if not changed_files:
+                print("✅ All uploaded files are already up to date")
+                return {
                     "success": True,
-                    "prepared_documents": prepared_docs,
-                    "total_documents": len(documents),
-                    "total_chunks": len(nodes),
-                    "total_characters": total_characters,
-                    "average_chunk_size": avg_chunk_size,
-                    "chunk_size_config": chunk_size,
-                    "chunk_overlap_config": chunk_overlap,
-                    "files_processed": len(input_files),
+                    "documents": [],
+                    "embeddings": np.empty((0, 0), dtype=np.float32),
+                    "ids": [],
+                    "stale_ids": [],
+                    "total_documents": 0,
+                    "total_chunks": 0,
+                    "chunks_embedded": 0,
+                    "chunks_unchanged": sum(len(existing_chunks.get(s) or {}) for s in source_hashes),
+                    "chunks_stale": 0,
+                    "files_unchanged": files_unchanged,
+                    "files_processed": 0,
                     "processing_date": datetime.now().isoformat(),
-                    "batch_id": documents[0].metadata.get("batch_id", "unknown") if documents else "unknown"
                 }
-                
-                return result
-                
-            except Exception as e:
-                raise Exception(f"Document processing error: {str(e)}")
+            uploaded_files = changed_files
+        
+        session = None
+        if self.deduplicator is not None:
+            # Chunks of re-uploaded sources may be deleted as stale, so they cannot stand in for new ones
+            retired = set()
+            if existing_chunks is not None:
+                for f in uploaded_files:
+                    retired.update(existing_chunks.get(self.source_name(f)) or {})
+            session = self.deduplicator.session(retired)
+        dedup = {"chunks_skipped": 0, "embedding_requests_avoided": 0}
+        
+        collected = {"documents": [], "embeddings": [], "ids": []}
+        
+        async def collect(documents, embeddings, ids):
+            collected["documents"].extend(documents)
+            collected["embeddings"].append(embeddings)
+            collected["ids"].extend(ids)
+            return None
+        
+        sink = store or collect
+        batch_id = str(uuid.uuid4())
+        timer = StageTimer(("parse", "chunk", "dedup", "embed", "store"))
+        totals = {"documents": 0, "chunks": 0, "characters": 0, "embedded": 0, "unchanged": 0, "files": 0}
+        stale_ids: List[str] = []
+        storage_reports: List[Dict[str, Any]] = []
+        file_errors: List[str] = []
+        queue_size = max(1, Config.INGEST_QUEUE_SIZE)
+        to_chunk: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        to_embed: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        to_store: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Each stage hands work downstream and ends with a None sentinel; a failing stage
+            # cancels the others through the TaskGroup
+            pending_files = list(reversed(uploaded_files))
+            
+            async def parse_worker():
+                # Up to PARSE_WORKERS files parse at once; the bounded queue still caps what waits downstream
+                while pending_files:
+                    file_data = pending_files.pop()
+                    source = self.source_name(file_data)
+                    path = self._save_file(file_data, temp_dir)
+                    if path is None:
+                        continue
+                    try:
+                        with timer.measure("parse"):
+                            documents = await self.parse_file(path, batch_id, source)
+                    except Exception as e:
+                        file_errors.append(f"{source}: {e}")
+                        print(f"❌ Failed to parse {source}: {e}")
+                        report_file(source, FILE_FAILED, error=str(e))
+                        continue
+                    finally:
+                        if "path" not in file_data:
+                            os.remove(path)
+                    report_file(source, FILE_PARSED, len(documents), sha256=source_hashes.get(source))
+                    await to_chunk.put((source, documents))
+            
+            async def parse_stage():
+                async with asyncio.TaskGroup() as parsers:
+                    for _ in range(max(1, Config.PARSE_WORKERS)):
+                        parsers.create_task(parse_worker())
+                await to_chunk.put(None)
+            
+            async def chunk_stage():
+                while (item := await to_chunk.get()) is not None:
+                    source, documents = item
+                    try:
+                        with timer.measure("chunk"):
+                            nodes = await asyncio.to_thread(self.create_chunks, documents, chunk_size, chunk_overlap)
+                    except Exception as e:
+                        file_errors.append(f"{source}: {e}")
+                        print(f"❌ Failed to chunk {source}: {e}")
+                        report_file(source, FILE_FAILED, error=str(e))
+                        continue
+                    existing = (existing_chunks.get(source) or {}) if existing_chunks is not None else None
+                    prepared = self._prepare_chunks(nodes, existing, source_hashes.get(source, ""))
+                    totals["files"] += 1
+                    totals["documents"] += len(documents)
+                    totals["chunks"] += len(nodes)
+                    totals["characters"] += sum(len(node.text) for node in nodes)
+                    totals["unchanged"] += prepared["unchanged"]
+                    stale_ids.extend(prepared["stale"])
+                    if prepared["legacy"]:
+                        print(f"⚠️ {source}: keeping {prepared['legacy']} chunks stored without a source_hash (before incremental ingestion); delete them by hand once the new chunks are in")
+                    report_file(source, FILE_CHUNKED, len(nodes), chunks=len(nodes))
+                    if session is not None and existing:
+                        session.keep(set(existing).difference(prepared["stale"]))
+                    if session is not None and prepared["documents"]:
+                        with timer.measure("dedup", len(prepared["documents"])):
+                            kept_documents, kept_ids, dropped = await asyncio.to_thread(
+                                session.filter, prepared["documents"], prepared["ids"]
+                            )
+                        if dropped:
+                            dedup["chunks_skipped"] += len(dropped)
+                            dedup["embedding_requests_avoided"] += self._embedding_requests(prepared["documents"]) - self._embedding_requests(kept_documents)
+                            print(f"🧬 {source}: skipped {len(dropped)} duplicate chunks")
+                        prepared["documents"], prepared["ids"] = kept_documents, kept_ids
+                    if session is not None and store is not None:
+                        # Other sources' dropped chunks are re-stored before their originals are deleted
+                        await asyncio.to_thread(session.record, source)
+                    if not prepared["documents"]:
+                        # Nothing new to embed means every chunk is already stored (or duplicates a stored one)
+                        report_file(source, FILE_STORED)
+                    del documents, nodes
+                    if prepared["documents"]:
+                        await to_embed.put((source, prepared["documents"], prepared["ids"]))
+                await to_embed.put(None)
+            
+            embed_workers = max(1, Config.EMBED_WORKERS)
+            
+            async def embed_stage():
+                # EMBED_WORKERS of these embed files at once, each with up to EMBEDDING_MAX_CONCURRENCY requests
+                nonlocal embed_workers
+                while (item := await to_embed.get()) is not None:
+                    source, documents, ids = item
+                    with timer.measure("embed", len(documents)):
+                        if checkpoint is not None:
+                            embeddings = await self._embed_checkpointed(source, documents, ids, checkpoint)
+                        else:
+                            embeddings = await self.embedding_agent.generate_embeddings_batch(
+                                [doc["content"] for doc in documents]
+                            )
+                    totals["embedded"] += len(documents)
+                    if progress is not None:
+                        progress("embedded", source, len(documents))
+                    await to_store.put((source, documents, embeddings, ids))
+                # Hand the sentinel on to the other embed workers; the last one closes the store queue
+                await to_embed.put(None)
+                embed_workers -= 1
+                if embed_workers == 0:
+                    await to_store.put(None)
+            
+            async def store_stage():
+                while (item := await to_store.get()) is not None:
+                    source, documents, embeddings, ids = item
+                    with timer.measure("store", len(documents)):
+                        report = await sink(documents, embeddings, ids)
+                    if report:
+                        storage_reports.append(report)
+                    failed = (report or {}).get("failed", 0)
+                    if failed:
+                        report_file(source, FILE_FAILED, error=f"{failed} chunks failed to store")
+                    else:
+                        if checkpoint is not None:
+                            checkpoint.mark_stored(source, ids)
+                        if session is not None and store is not None:
+                            await asyncio.to_thread(session.commit, ids)
+                        report_file(source, FILE_STORED, len(documents))
+                    print(f"📦 {source}: {len(documents)} chunks embedded and handed to storage")
+            
+            print(f"🚰 Streaming {len(uploaded_files)} files through parse → chunk → embed → store")
+            try:
+                async with asyncio.TaskGroup() as group:
+                    stages = [parse_stage, chunk_stage] + [embed_stage] * embed_workers + [store_stage]
+                    for stage in stages:
+                        group.create_task(stage())
+            except* Exception as eg:
+                raise Exception(f"Document processing error: {eg.exceptions[0]}")
+        
+        if totals["files"] == 0:
+            raise Exception(f"Document processing error: no documents were loaded ({'; '.join(file_errors) or 'no valid files'})")
+        
+        pipeline = timer.report()
+        if existing_chunks is not None:
+            print(f"♻️ Incremental: {totals['embedded']} new, {totals['unchanged']} unchanged, {len(stale_ids)} stale chunks")
+        if dedup["chunks_skipped"]:
+            print(f"🧬 Dedup: {dedup['chunks_skipped']} duplicate chunks skipped ({session.stats['exact']} exact, {session.stats['near']} near)")
+        print(f"⏱️ Ingestion pipeline: {pipeline['wall_s']}s wall, stage overlap x{pipeline['overlap']}")
+        
+        result = {
+            "success": True,
+            "documents": collected["documents"],
+            "embeddings": np.vstack(collected["embeddings"]) if collected["embeddings"] else np.empty((0, 0), dtype=np.float32),
+            "ids": collected["ids"],
+            "stale_ids": stale_ids,
+            "total_documents": totals["documents"],
+            "total_chunks": totals["chunks"],
+            "chunks_embedded": totals["embedded"],
+            "chunks_unchanged": totals["unchanged"],
+            "chunks_stale": len(stale_ids),
+            "files_unchanged": files_unchanged,
+            "total_characters": totals["characters"],
+            "average_chunk_size": totals["characters"] / totals["chunks"] if totals["chunks"] else 0,
+            "chunk_size_config": chunk_size,
+            "chunk_overlap_config": chunk_overlap,
+            "files_processed": totals["files"],
+            "file_errors": file_errors,
+            "pipeline": pipeline,
+            "processing_date": datetime.now().isoformat(),
+            "batch_id": batch_id
+        }
+        if session is not None:
+            result["dedup"] = {
+                **session.stats,
+                **dedup,
+                "embeddings_avoided": dedup["chunks_skipped"],
+                "stored_objects_avoided": dedup["chunks_skipped"],
+            }
+        if storage_reports:
+            result["storage"] = merge_ingestion_reports(storage_reports)
+        return result
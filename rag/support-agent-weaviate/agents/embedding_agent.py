@@ -1,22 +1,80 @@
 import httpx
 import asyncio
-from typing import List, Union
+import base64
+import random
+import numpy as np
+from typing import Any, Dict, List, Union
 from config import Config
+from services.embedding_cache import EmbeddingCache
+from services.rate_limiter import AdaptiveConcurrencyLimiter
+from services.tokenizer import estimate_tokens
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class RetryableEmbeddingError(Exception):
+    """Embedding request rejected by a 429/5xx or transport failure; safe to retry"""
+    def __init__(self, message: str, status_code: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class EmbeddingMatrix:
+    """Preallocated float32 (n, dim) matrix filled row-wise as embeddings arrive"""
+    def __init__(self, n: int):
+        self.n = n
+        self.matrix = None
+
+    def put(self, indices: List[int], vectors: np.ndarray):
+        if self.matrix is None:
+            self.matrix = np.empty((self.n, vectors.shape[1]), dtype=np.float32)
+        self.matrix[indices] = vectors
+
+    def put_row(self, index: int, vector: np.ndarray):
+        if self.matrix is None:
+            self.matrix = np.empty((self.n, vector.shape[0]), dtype=np.float32)
+        self.matrix[index] = vector
+
+    def result(self) -> np.ndarray:
+        if self.matrix is None:
+            return np.empty((self.n, 0), dtype=np.float32)
+        return self.matrix
 
 class EmbeddingAgent:
-    def __init__(self):
+    def __init__(self, cache: EmbeddingCache = None, http_client: httpx.AsyncClient = None):
         self.api_key = Config.NEBIUS_API_KEY
         self.base_url = Config.NEBIUS_BASE_URL
         self.model = Config.EMBEDDING_MODEL
+        if cache is None and Config.EMBEDDING_CACHE_ENABLED:
+            try:
+                cache = EmbeddingCache()
+            except Exception as e:
+                print(f"⚠️ Embedding cache disabled: {e}")
+                cache = None
+        self.cache = cache
+        # Shared pooled client injected by RAGWorkflow; None falls back to a per-call client
+        self.http_client = http_client
         
-    async def generate_embeddings(self, texts: Union[str, List[str]]) -> List[List[float]]:
-        """Generate embeddings using Nebius Studio"""
+    async def generate_embeddings(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """Generate embeddings using Nebius Studio as a float32 (n, dim) matrix, serving repeated texts from the cache.
+
+        Cache misses go out as one request, retried on 429/5xx like the batches of generate_embeddings_batch.
+        """
         if isinstance(texts, str):
             texts = [texts]
             
         if not texts:
             raise Exception("No texts provided for embedding")
         
+        embeddings, missing = self._lookup_cache(texts)
+        if missing:
+            miss_texts = [texts[i] for i in missing]
+            fresh = await self._embed_batch_with_retry(miss_texts, AdaptiveConcurrencyLimiter(max_limit=1))
+            self._store_cache(miss_texts, fresh)
+            embeddings.put(missing, fresh)
+        return embeddings.result()
+    
+    async def _request_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Call the Nebius embeddings endpoint for texts (no caching)"""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -26,43 +84,180 @@ class EmbeddingAgent:
             "model": self.model,
             "input": texts
         }
+        if Config.EMBEDDING_ENCODING_FORMAT:
+            # base64 ships raw little-endian float32 bytes instead of JSON floats
+            payload["encoding_format"] = Config.EMBEDDING_ENCODING_FORMAT
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/embeddings",
-                    headers=headers,
-                    json=payload,
-                    timeout=60.0
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                if "data" not in result:
-                    raise Exception(f"No 'data' field in response. Keys: {list(result.keys())}")
-                
-                embeddings = [item["embedding"] for item in result["data"]]
-                return embeddings
+            response = await self._post(
+                f"{self.base_url}/embeddings",
+                headers=headers,
+                json=payload,
+                timeout=60.0
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            
+            if "data" not in result:
+                raise Exception(f"No 'data' field in response. Keys: {list(result.keys())}")
+            
+            return self._decode_embeddings(result["data"])
                 
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            if status in RETRYABLE_STATUS_CODES:
+                raise RetryableEmbeddingError(
+                    f"Embedding error: HTTP {status}",
+                    status_code=status,
+                    retry_after=self._parse_retry_after(e.response),
+                )
+            print(f"Embedding generation failed: {e}")
+            raise Exception(f"Embedding error: {str(e)}")
+        except httpx.TransportError as e:
+            raise RetryableEmbeddingError(f"Embedding error: {type(e).__name__}: {e}")
         except Exception as e:
             print(f"Embedding generation failed: {e}")
             raise Exception(f"Embedding error: {str(e)}")
     
-    async def generate_embeddings_batch(self, texts: List[str], batch_size: int = None) -> List[List[float]]:
-        """Generate embeddings in batches to handle API limits"""
+    @staticmethod
+    def _decode_embeddings(data: List[Dict[str, Any]]) -> np.ndarray:
+        """Decode an embeddings response (base64 or float lists) into a float32 matrix"""
+        if not data:
+            raise Exception("Empty 'data' field in response")
+        data = sorted(data, key=lambda item: item.get("index", 0))
+        matrix = None
+        for row, item in enumerate(data):
+            embedding = item["embedding"]
+            if isinstance(embedding, str):
+                # View over the decoded bytes; copied once into the matrix row
+                vector = np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+            else:
+                vector = np.asarray(embedding, dtype=np.float32)
+            if matrix is None:
+                matrix = np.empty((len(data), vector.shape[0]), dtype=np.float32)
+            matrix[row] = vector
+        return matrix
+    
+    async def _post(self, url: str, **kwargs) -> httpx.Response:
+        if self.http_client is not None:
+            return await self.http_client.post(url, **kwargs)
+        async with httpx.AsyncClient() as client:
+            return await client.post(url, **kwargs)
+    
+    @staticmethod
+    def _parse_retry_after(response: httpx.Response):
+        try:
+            return float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+    
+    def _lookup_cache(self, texts: List[str]):
+        """Return (EmbeddingMatrix with cache hits filled in, indices of misses)"""
+        embeddings = EmbeddingMatrix(len(texts))
+        if self.cache is None:
+            return embeddings, list(range(len(texts)))
+        try:
+            cached = self.cache.get_many(self.model, texts)
+        except Exception as e:
+            print(f"⚠️ Embedding cache lookup failed: {e}")
+            return embeddings, list(range(len(texts)))
+        missing = []
+        for i, vector in enumerate(cached):
+            if vector is None:
+                missing.append(i)
+            else:
+                embeddings.put_row(i, vector)
+        if len(missing) < len(texts):
+            print(f"🗃️ Embedding cache: {len(texts) - len(missing)}/{len(texts)} hits")
+        return embeddings, missing
+    
+    def _store_cache(self, texts: List[str], embeddings: np.ndarray):
+        if self.cache is None:
+            return
+        try:
+            self.cache.put_many(self.model, texts, embeddings)
+        except Exception as e:
+            print(f"⚠️ Embedding cache write failed: {e}")
+    
+    def plan_batches(
+        self, texts: List[str], indices: List[int] = None, batch_size: int = None, token_budget: int = None
+    ) -> List[List[int]]:
+        """Group indices (default: all texts) into request batches bounded by an estimated token budget and an item cap"""
+        if indices is None:
+            indices = list(range(len(texts)))
         if batch_size is None:
             batch_size = Config.EMBEDDING_BATCH_SIZE
+        if token_budget is None:
+            token_budget = Config.EMBEDDING_BATCH_TOKEN_BUDGET
+        batches, current, current_tokens = [], [], 0
+        for i in indices:
+            tokens = estimate_tokens(texts[i])
+            if current and (current_tokens + tokens > token_budget or len(current) >= batch_size):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _embed_batch_with_retry(self, batch: List[str], limiter: AdaptiveConcurrencyLimiter) -> np.ndarray:
+        max_retries = max(0, Config.EMBEDDING_MAX_RETRIES)
+        for attempt in range(max_retries + 1):
+            try:
+                async with limiter.slot():
+                    embeddings = await self._request_embeddings(batch)
+                await limiter.on_success()
+                return embeddings
+            except RetryableEmbeddingError as e:
+                await limiter.on_throttle()
+                if attempt >= max_retries:
+                    print(f"Embedding generation failed after {attempt + 1} attempts: {e}")
+                    raise
+                delay = e.retry_after or min(30.0, Config.EMBEDDING_RETRY_BASE_DELAY * (2 ** attempt))
+                delay *= 1 + random.random() * 0.25
+                print(f"⏳ {e}; retrying in {delay:.1f}s (concurrency now {limiter.current_limit})")
+                await asyncio.sleep(delay)
+        raise Exception(f"Embedding generation failed after {max_retries + 1} attempts")
+    
+    async def generate_embeddings_batch(
+        self,
+        texts: List[str],
+        batch_size: int = None,
+        max_concurrency: int = None,
+        token_budget: int = None,
+    ) -> np.ndarray:
+        """Generate a float32 (n, dim) embedding matrix; cache misses are sent in token-budgeted batches with bounded, adaptive concurrency"""
+        if batch_size is None:
+            batch_size = Config.EMBEDDING_BATCH_SIZE
+        if max_concurrency is None:
+            max_concurrency = Config.EMBEDDING_MAX_CONCURRENCY
+        if token_budget is None:
+            token_budget = Config.EMBEDDING_BATCH_TOKEN_BUDGET
             
-        all_embeddings = []
+        all_embeddings, missing = self._lookup_cache(texts)
+        if not missing:
+            return all_embeddings.result()
         
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_embeddings = await self.generate_embeddings(batch)
-            all_embeddings.extend(batch_embeddings)
-            
-            # Small delay to respect rate limits
-            if i + batch_size < len(texts):
-                await asyncio.sleep(0.1)
+        batches = self.plan_batches(texts, missing, batch_size, token_budget)
+        limiter = AdaptiveConcurrencyLimiter(max_limit=max_concurrency)
+        
+        async def run(batch_indices: List[int]):
+            batch = [texts[j] for j in batch_indices]
+            batch_embeddings = await self._embed_batch_with_retry(batch, limiter)
+            self._store_cache(batch, batch_embeddings)
+            # Write into the original rows so output order stays stable
+            all_embeddings.put(batch_indices, batch_embeddings)
+        
+        try:
+            async with asyncio.TaskGroup() as group:
+                for batch_indices in batches:
+                    group.create_task(run(batch_indices))
+        except* Exception as eg:
+            # Surface the first failure like the serial implementation did
+            raise eg.exceptions[0]
         
-        return all_embeddings
+        if limiter.throttle_events:
+            print(f"⚠️ Embedding upstream throttled {limiter.throttle_events} time(s); final concurrency {limiter.current_limit}")
+        return all_embeddings.result()
@@ -1,22 +1,33 @@
 import json
 import time
 import asyncio
-from typing import List, Dict, Any
-from openai import OpenAI
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import httpx
+from openai import AsyncOpenAI
 from pydantic import ValidationError
 from config import Config
-from tools.support_tools import SUPPORT_TOOLS, AVAILABLE_TOOLS
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, AIMessage
+from tools.support_tools import SUPPORT_TOOLS, AVAILABLE_TOOLS, WRITE_TOOLS
+from services.context_packer import pack_context
+from services.session_memory import SessionStore
 
 
 class LLMAgent:
-    def __init__(self) -> None:
-        self.client = OpenAI(base_url=Config.NEBIUS_BASE_URL, api_key=Config.NEBIUS_API_KEY)
+    def __init__(self, http_client: httpx.AsyncClient = None) -> None:
+        # Shared pooled client injected by RAGWorkflow (None: the SDK opens its own); completions
+        # get their own, longer timeouts since generation can take minutes
+        self.client = AsyncOpenAI(
+            base_url=Config.NEBIUS_BASE_URL,
+            api_key=Config.NEBIUS_API_KEY,
+            http_client=http_client,
+            timeout=httpx.Timeout(Config.LLM_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT),
+            max_retries=Config.LLM_MAX_RETRIES,
+        )
         self.model = Config.LLM_MODEL
         self.last_generation_time = 0
 
-        self.memory = ConversationBufferMemory(return_messages=True)
+        # Conversation history per Slack thread / Streamlit session, compacted to a token budget
+        self.sessions = SessionStore(summarizer=self._summarize)
+        self._tools_tokens = None
 
         self.system_prompt = """\
 You are Nebius's internal support AI assistant. Only answer questions specifically related to Nebius — our products, services, infrastructure, APIs, pricing/billing, support processes, SLAs, security/compliance, onboarding, and internal tools/docs. All responses must be in Slack message format (no generic Markdown).
@@ -34,7 +45,7 @@ Rules:
 1. Only call a tool when it directly addresses the user's request. Otherwise, answer from your own knowledge and retrieved Nebius docs.
 2. First, call the necessary tool. After the tool result is available, provide a final Slack response mentioning the action taken.
 3. If the user asks to book a call, directly book it using the tool (no web search required).
-4. Web search policy for Nebius‑related queries only: call `web_search` ONLY when avg_vector_relevance < min_vector_relevance_threshold (default 0.70). If avg_vector_relevance >= threshold, rely on retrieved documents/knowledge and DO NOT call web_search.
+4. Web search policy for Nebius‑related queries only: call `web_search` ONLY when avg_vector_relevance < min_vector_relevance_threshold (both given in the Telemetry line). If avg_vector_relevance >= threshold, rely on retrieved documents/knowledge and DO NOT call web_search.
    • Never use web search for out‑of‑scope, non‑Nebius questions — reply that you cannot help.
 5. When you call `web_search`, pass `num_results` exactly equal to `web_search_limit` provided in telemetry.
 6. If the user is unsatisfied with the answer, ask for more details. If still unsatisfied, offer to raise a Notion ticket. If still unsatisfied, offer to book a call.
@@ -53,23 +64,57 @@ Rules:
         temperature: float = 0.7,
         max_tokens: int = 10000,
         user_email: str | None = None,
+        conversation_id: str | None = None,
+        doc_retrieval_limit: int | None = None,
     ) -> Dict[str, Any]:
+        """Run the tool loop to the final answer and return it (no streaming)"""
+        async for event in self.stream_response(
+            query,
+            context=context,
+            retrieved_docs=retrieved_docs,
+            avg_vector_relevance=avg_vector_relevance,
+            min_vector_relevance=min_vector_relevance,
+            web_search_limit=web_search_limit,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            user_email=user_email,
+            conversation_id=conversation_id,
+            doc_retrieval_limit=doc_retrieval_limit,
+            stream=False,
+        ):
+            if event["event"] == "final":
+                return event["response"]
 
-        # Build memory context messages
-        memory_msgs = self.memory.load_memory_variables({})["history"]
+    async def stream_response(
+        self,
+        query: str,
+        context: List[Dict[str, Any]] | None = None,
+        retrieved_docs: List[Dict[str, Any]] | None = None,
+        avg_vector_relevance: float = 0.0,
+        min_vector_relevance: float | None = None,
+        web_search_limit: int | None = None,
+        temperature: float = 0.7,
+        max_tokens: int = 10000,
+        user_email: str | None = None,
+        conversation_id: str | None = None,
+        doc_retrieval_limit: int | None = None,
+        stream: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run the tool loop, yielding events as they happen.
 
-        # Convert LangChain messages to OpenAI format correctly
-        history_dicts = []
-        for msg in memory_msgs:
-            if isinstance(msg, HumanMessage):
-                history_dicts.append({"role": "user", "content": msg.content})
-            elif isinstance(msg, AIMessage):
-                history_dicts.append({"role": "assistant", "content": msg.content})
-            else:
-                # Fallback for other message types
-                msg_type = getattr(msg, 'type', 'user')
-                role = "user" if msg_type == "human" else "assistant" if msg_type == "ai" else "user"
-                history_dicts.append({"role": role, "content": msg.content})
+        ``{"event": "token", "content": ...}`` for each content delta,
+        ``{"event": "tool_call", "id", "name"}`` for each requested tool, then
+        ``{"event": "tool_result", "id", "name", "ok", "seconds"}`` as each one
+        finishes (tools of one turn run concurrently), and finally
+        ``{"event": "final", "response": {...}}`` with what generate_response
+        returns. Tokens of a completion that ends in tool calls are narration
+        ("Let me check...") that the final answer does not include; consumers
+        discard them on ``tool_call``. With ``stream=False`` each completion
+        arrives whole, so only tool and final events are yielded.
+        """
+
+        # This conversation's history (rolling summary + recent turns), already in OpenAI format
+        history_dicts, history_stats = await self.sessions.load(conversation_id)
 
         # Compose initial messages
         # Determine threshold
@@ -82,9 +127,10 @@ Rules:
         # web_search for Nebius queries when relevance is low.
         tools_schema = SUPPORT_TOOLS
 
+        context_text, context_stats = self._build_context(context, retrieved_docs, doc_retrieval_limit)
         user_prompt = (
             f"Question: {query}\n\n"
-            f"Context:\n{self._build_context(context, retrieved_docs)}\n\n"
+            f"Context:\n{context_text}\n\n"
             f"Telemetry: avg_vector_relevance={avg_vector_relevance:.3f}, min_vector_relevance_threshold={relevance_threshold:.3f}, web_search_limit={web_search_limit if web_search_limit is not None else 'auto'}\n\n"
             f"User Email: {user_email or 'Not provided.'}\n\n"
             "Provide the best help you can. If this question is not about Nebius, reply that it's out of scope and do not call any tool. If it is about Nebius and relevance is low, you may consider web_search per policy."
@@ -94,14 +140,15 @@ Rules:
             {"role": "user", "content": user_prompt},
         ]
 
+        prompt_tokens = self._prompt_tokens(messages, tools_schema)
+
         start = time.time()
-        tool_blocks: list[str] = []
-        tools_used: list[str] = []
-        search_results_count: int = 0
-        web_sources: list[dict[str, str]] = []
+        first_token_time = None
+        usage = self._new_usage()
+        tool_timings: list[dict[str, Any]] = []
 
         while True:
-            chat = self.client.chat.completions.create(
+            request = dict(
                 model=self.model,
                 messages=messages,
                 temperature=temperature,
@@ -109,135 +156,255 @@ Rules:
                 tools=tools_schema,
                 tool_choice="auto",
             )
+            if stream:
+                content_parts: list[str] = []
+                tool_calls: list[dict[str, str]] = []
+                response_stream = await self.client.chat.completions.create(stream=True, **request)
+                try:
+                    async for chunk in response_stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        if first_token_time is None and (delta.content or delta.tool_calls):
+                            first_token_time = time.time() - start
+                        if delta.content:
+                            content_parts.append(delta.content)
+                            yield {"event": "token", "content": delta.content}
+                        for part in delta.tool_calls or []:
+                            # Tool calls arrive as fragments keyed by index: id and name first, then argument pieces
+                            while len(tool_calls) <= part.index:
+                                tool_calls.append({"id": "", "name": "", "arguments": ""})
+                            if part.id:
+                                tool_calls[part.index]["id"] = part.id
+                            if part.function and part.function.name:
+                                tool_calls[part.index]["name"] += part.function.name
+                            if part.function and part.function.arguments:
+                                tool_calls[part.index]["arguments"] += part.function.arguments
+                finally:
+                    await response_stream.close()
+                content = "".join(content_parts) or None
+            else:
+                chat = await self.client.chat.completions.create(**request)
+                assistant = chat.choices[0].message
+                if first_token_time is None:
+                    first_token_time = time.time() - start
+                content = assistant.content
+                tool_calls = [
+                    {"id": call.id, "name": call.function.name, "arguments": call.function.arguments}
+                    for call in assistant.tool_calls or []
+                ]
 
-            assistant = chat.choices[0].message
             self.last_generation_time = time.time() - start
 
-            if not assistant.tool_calls:  # Final answer
-                # Append current user and assistant response to memory
-                final_response = (assistant.content or "")
-                self.memory.save_context({"input": query}, {"output": final_response})
+            if not tool_calls:  # Final answer
+                # Append current user and assistant response to this conversation's memory
+                final_response = (content or "")
+                self.sessions.save_turn(conversation_id, query, final_response)
 
-                return {
+                yield {"event": "final", "response": {
                     "content": final_response,
                     "query": query,
-                    "tool_calls_made": bool(tool_blocks),
-                    "tools_used": tools_used,
-                    "search_results_count": search_results_count,
-                    "web_sources": web_sources,
+                    "tool_calls_made": bool(usage["tool_blocks"]),
+                    "tools_used": usage["tools_used"],
+                    "search_results_count": usage["search_results_count"],
+                    "web_sources": usage["web_sources"],
+                    "tool_timings": tool_timings,
                     "generation_time": self.last_generation_time,
-                }
+                    "time_to_first_token": first_token_time,
+                    "streamed": stream,
+                    # Size of the first completion request (messages + tool schemas) and the history in it
+                    "prompt_tokens": prompt_tokens,
+                    "history_tokens": history_stats["history_tokens"],
+                    "history_turns": history_stats["history_turns"],
+                    "history_summarized": history_stats["summarized"],
+                    # Retrieved context packed into the prompt (achieved tokens vs CONTEXT_TOKEN_BUDGET)
+                    "context": context_stats,
+                }}
+                return
 
             # Append assistant's message to history (tool call request)
             messages.append({
                 "role": "assistant",
-                "content": assistant.content,
+                "content": content,
                 "tool_calls": [
                     {
-                        "id": call.id,
+                        "id": call["id"],
                         "type": "function",
                         "function": {
-                            "name": call.function.name,
-                            "arguments": call.function.arguments
+                            "name": call["name"],
+                            "arguments": call["arguments"]
                         }
                     }
-                    for call in assistant.tool_calls
+                    for call in tool_calls
                 ]
             })
 
-            # Execute requested tool(s)
-            tool_msgs = []
-            for call in assistant.tool_calls:
-                name = call.function.name
-                args = json.loads(call.function.arguments or "{}")
+            # Execute requested tool(s); calls of one turn can't depend on each other's results
+            for call in tool_calls:
+                yield {"event": "tool_call", "id": call["id"], "name": call["name"]}
+            tool_msgs = [None] * len(tool_calls)
+            async for index, tool_msg, ok, seconds in self._execute_tools(tool_calls, usage):
+                call = tool_calls[index]
+                tool_msgs[index] = tool_msg
+                tool_timings.append({"id": call["id"], "name": call["name"], "ok": ok, "seconds": seconds})
+                yield {"event": "tool_result", "id": call["id"], "name": call["name"], "ok": ok, "seconds": seconds}
+            # Tool messages follow the assistant message in tool_call order, whatever order they finished in
+            messages.extend(tool_msgs)
+
+    @staticmethod
+    def _new_usage() -> Dict[str, Any]:
+        return {"tool_blocks": [], "tools_used": [], "search_results_count": 0, "web_sources": []}
+
+    async def _execute_tools(
+        self, calls: List[Dict[str, str]], usage: Dict[str, Any]
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any], bool, float]]:
+        """Run the tool calls of one assistant turn, yielding (index, tool message, succeeded, seconds) as each finishes.
+
+        Calls run concurrently (unless TOOL_CALLS_PARALLEL is off), each under
+        its own TOOL_CALL_TIMEOUT, except WRITE_TOOLS: those run one after
+        another in call order and without a timeout. When the consumer stops,
+        read-only calls still running are cancelled and write calls not
+        started yet are skipped, but a write call already started is never
+        cancelled: it is awaited to completion, since its request may already
+        have gone through. Usage is merged in call order once all have
+        finished.
+        """
+        call_usage = [self._new_usage() for _ in calls]
+
+        async def run(index: int, previous: asyncio.Task = None):
+            call = calls[index]
+            if previous is not None:
+                await asyncio.wait([previous])
+            start = time.perf_counter()
+            if call["name"] in WRITE_TOOLS:
+                write = asyncio.ensure_future(self._execute_tool(call, call_usage[index]))
                 try:
-                    tool = AVAILABLE_TOOLS[name]
-                except KeyError:
-                    err = f"Tool '{name}' not available."
-                    tool_msgs.append({"role": "tool", "tool_call_id": call.id, "content": err})
-                    tool_blocks.append(f"\n\n❌ {err}")
-                    continue
+                    tool_msg, ok = await asyncio.shield(write)
+                except asyncio.CancelledError:
+                    # The consumer stopped: let the write finish before giving up the turn
+                    await asyncio.wait([write])
+                    raise
+                return index, tool_msg, ok, round(time.perf_counter() - start, 3)
+            try:
+                tool_msg, ok = await asyncio.wait_for(self._execute_tool(call, call_usage[index]), Config.TOOL_CALL_TIMEOUT)
+            except asyncio.TimeoutError:
+                err = f"Tool '{call['name']}' timed out after {Config.TOOL_CALL_TIMEOUT:g}s."
+                print(f"⏱️ {err}")
+                tool_msg, ok = {"role": "tool", "tool_call_id": call["id"], "content": err}, False
+            return index, tool_msg, ok, round(time.perf_counter() - start, 3)
 
+        if Config.TOOL_CALLS_PARALLEL and len(calls) > 1:
+            tasks, last_write = [], None
+            for index, call in enumerate(calls):
+                if call["name"] in WRITE_TOOLS:
+                    # Side-effecting calls are chained: each starts once the previous one finished
+                    last_write = asyncio.create_task(run(index, last_write))
+                    tasks.append(last_write)
+                else:
+                    tasks.append(asyncio.create_task(run(index)))
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    yield await finished
+            finally:
+                # Started write calls wait for their request in run() rather than being cut off
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        else:
+            for index in range(len(calls)):
+                yield await run(index)
+
+        for part in call_usage:
+            usage["tool_blocks"].extend(part["tool_blocks"])
+            usage["tools_used"].extend(part["tools_used"])
+            usage["search_results_count"] += part["search_results_count"]
+            usage["web_sources"].extend(part["web_sources"])
+
+    async def _execute_tool(self, call: Dict[str, str], usage: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Run one requested tool; returns (tool message for the model, succeeded)"""
+        name = call["name"]
+        try:
+            tool = AVAILABLE_TOOLS[name]
+        except KeyError:
+            err = f"Tool '{name}' not available."
+            usage["tool_blocks"].append(f"\n\n❌ {err}")
+            return {"role": "tool", "tool_call_id": call["id"], "content": err}, False
+        try:
+            args = json.loads(call["arguments"] or "{}")
+        except json.JSONDecodeError as e:
+            err = f"Tool '{name}' was called with invalid JSON arguments ({e}). Call it again with a valid JSON object."
+            return {"role": "tool", "tool_call_id": call["id"], "content": err}, False
+
+        try:
+            if hasattr(tool, 'ainvoke') and asyncio.iscoroutinefunction(getattr(tool, 'ainvoke')):
+                result = await tool.ainvoke(args)
+            else:
+                result = await asyncio.to_thread(tool.invoke, args)
+            usage["tools_used"].append(name)
+            # Aggregate web search result counts for UI analytics and collect sources
+            if name == "web_search":
                 try:
-                    if hasattr(tool, 'ainvoke') and asyncio.iscoroutinefunction(getattr(tool, 'ainvoke')):
-                        result = await tool.ainvoke(args)
+                    if isinstance(result, list):
+                        arr = result
+                    elif isinstance(result, dict):
+                        # common shapes: {"results": [...]} or {"items": [...]}
+                        arr = next((result[key] for key in ("results", "items") if isinstance(result.get(key), list)), [])
                     else:
-                        result = await asyncio.to_thread(tool.invoke, args)
-                    tool_msgs.append({"role": "tool", "tool_call_id": call.id, "content": json.dumps(result)})
-                    tools_used.append(name)
-                    # Aggregate web search result counts for UI analytics and collect sources
-                    if name == "web_search":
-                        try:
-                            if isinstance(result, list):
-                                search_results_count += len(result)
-                                for r in result:
-                                    title = (r.get("title") or "Source").strip()
-                                    url = r.get("url") or ""
-                                    if url:
-                                        web_sources.append({"title": title, "url": url})
-                            elif isinstance(result, dict):
-                                # common shapes: {"results": [...]} or {"items": [...]}
-                                if "results" in result and isinstance(result["results"], list):
-                                    arr = result["results"]
-                                    search_results_count += len(arr)
-                                    for r in arr:
-                                        title = (r.get("title") or "Source").strip()
-                                        url = r.get("url") or ""
-                                        if url:
-                                            web_sources.append({"title": title, "url": url})
-                                elif "items" in result and isinstance(result["items"], list):
-                                    arr = result["items"]
-                                    search_results_count += len(arr)
-                                    for r in arr:
-                                        title = (r.get("title") or "Source").strip()
-                                        url = r.get("url") or ""
-                                        if url:
-                                            web_sources.append({"title": title, "url": url})
-                        except Exception:
-                            pass
-                except ValidationError as e:
-                    err_msg = f"Tool call failed due to missing arguments. Details: {e.errors()}. Please ask the user for the missing information and then try calling the tool again."
-                    tool_msgs.append({"role": "tool", "tool_call_id": call.id, "content": err_msg})
-                except Exception as exc:
-                    err = f"{type(exc).__name__}: {exc}"
-                    tool_msgs.append({"role": "tool", "tool_call_id": call.id, "content": err})
-
-            # Append tool results to message history
-            messages.extend(tool_msgs)
+                        arr = []
+                    usage["search_results_count"] += len(arr)
+                    for r in arr:
+                        title = (r.get("title") or "Source").strip()
+                        url = r.get("url") or ""
+                        if url:
+                            usage["web_sources"].append({"title": title, "url": url})
+                except Exception:
+                    pass
+            return {"role": "tool", "tool_call_id": call["id"], "content": json.dumps(result)}, True
+        except ValidationError as e:
+            err_msg = f"Tool call failed due to missing arguments. Details: {e.errors()}. Please ask the user for the missing information and then try calling the tool again."
+            return {"role": "tool", "tool_call_id": call["id"], "content": err_msg}, False
+        except Exception as exc:
+            err = f"{type(exc).__name__}: {exc}"
+            if name in WRITE_TOOLS and isinstance(exc, httpx.TimeoutException) and not isinstance(exc, httpx.ConnectTimeout):
+                # The request was sent; only the response is missing
+                err += ". The request may have succeeded: do not call this tool again, ask the user to check first."
+            return {"role": "tool", "tool_call_id": call["id"], "content": err}, False
 
-    def _build_context(self, search: List[Dict[str, Any]] | None, docs: List[Dict[str, Any]] | None) -> str:
-        """Helper method to build context string from search results and documents."""
-        if not search and not docs:
-            return "No additional context."
-        
-        context_parts = []
-        
-        if search:
-            context_parts.append("Search results:")
-            for i, result in enumerate(search[:3], 1):
-                title = result.get('title', 'Untitled')
-                content = result.get('content', '')[:200] + "..." if len(result.get('content', '')) > 200 else result.get('content', '')
-                context_parts.append(f"{i}. {title}: {content}")
-        
-        if docs:
-            context_parts.append("\nRetrieved documents:")
-            for i, doc in enumerate(docs[:3], 1):
-                title = doc.get('title', doc.get('filename', 'Untitled'))
-                content = doc.get('content', '')[:200] + "..." if len(doc.get('content', '')) > 200 else doc.get('content', '')
-                context_parts.append(f"{i}. {title}: {content}")
-        
-        return "\n".join(context_parts) if context_parts else "No additional context."
+    def _build_context(
+        self, search: List[Dict[str, Any]] | None, docs: List[Dict[str, Any]] | None, limit: int | None = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Pack retrieved documents (most relevant first) and search results into CONTEXT_TOKEN_BUDGET tokens."""
+        return pack_context(docs, search, limit=limit)
 
     # Removed hardcoded Nebius keyword detector; scope is decided contextually by the LLM per system prompt.
 
-    def clear_memory(self):
-        """Clear conversation memory."""
-        self.memory.clear()
+    def _prompt_tokens(self, messages: List[Dict[str, Any]], tools_schema: List[Dict[str, Any]]) -> int:
+        if self._tools_tokens is None:
+            self._tools_tokens = self.sessions.count_tokens(json.dumps(tools_schema))
+        return self._tools_tokens + sum(self.sessions.count_tokens(m["content"] or "") for m in messages)
 
-    def get_memory_summary(self):
-        """Get a summary of current conversation history."""
-        try:
-            memory_vars = self.memory.load_memory_variables({})
-            return len(memory_vars.get("history", []))
-        except Exception:
-            return 0
+    async def _summarize(self, summary: str, turns: List[Tuple[str, str]]) -> str:
+        """Fold the oldest turns of a conversation into its rolling summary"""
+        transcript = "\n\n".join(f"User: {user}\nAssistant: {assistant}" for user, assistant in turns)
+        chat = await self.client.chat.completions.create(
+            model=Config.SESSION_SUMMARY_MODEL or self.model,
+            messages=[
+                {"role": "system", "content": (
+                    "Update the running summary of a support conversation. Keep the user's goal, facts they gave "
+                    "(names, emails, ids, errors), answers already given, tickets or bookings made and open questions. "
+                    "Write plain sentences, no preamble."
+                )},
+                {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+            ],
+            temperature=0.2,
+            max_tokens=self.sessions.summary_tokens,
+        )
+        return chat.choices[0].message.content or ""
+
+    def clear_memory(self, conversation_id: str | None = None):
+        """Clear one conversation's memory, or every conversation's."""
+        self.sessions.clear(conversation_id)
+
+    def get_memory_summary(self, conversation_id: str | None = None):
+        """Number of verbatim turns kept for a conversation."""
+        return self.sessions.turns(conversation_id)
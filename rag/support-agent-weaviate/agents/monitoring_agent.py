@@ -4,10 +4,12 @@ from typing import Dict, Any, List
 from config import Config
 
 class MonitoringAgent:
-    def __init__(self):
+    def __init__(self, http_client: httpx.AsyncClient = None):
         self.api_key = Config.KEYWORDS_AI_API_KEY
         self.base_url = "https://api.keywordsai.co/api/request-logs/create/"
         self.enabled = bool(self.api_key)
+        # Shared pooled client injected by RAGWorkflow; None falls back to a per-call client
+        self.http_client = http_client
     
     async def log_request(
         self, 
@@ -52,15 +54,23 @@ class MonitoringAgent:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response_obj = await client.post(
+            if self.http_client is not None:
+                response_obj = await self.http_client.post(
                     self.base_url,
                     headers=headers,
                     json=payload,
                     timeout=30.0
                 )
-                response_obj.raise_for_status()
-                return True
+            else:
+                async with httpx.AsyncClient() as client:
+                    response_obj = await client.post(
+                        self.base_url,
+                        headers=headers,
+                        json=payload,
+                        timeout=30.0
+                    )
+            response_obj.raise_for_status()
+            return True
         except Exception as e:
             print(f"Monitoring logging failed: {e}")
             return False
@@ -0,0 +1,109 @@
+import atexit
+import mmap
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from config import Config
+
+SUPPORTED_EXTS = [".txt", ".pdf", ".docx", ".md"]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+# Same metadata keys SimpleDirectoryReader hides from embeddings/LLM prompts
+EXCLUDED_FILE_METADATA = ["file_name", "file_type", "file_size", "creation_date", "last_modified_date", "last_accessed_date"]
+
+
+def _parse_pdf(path: str) -> List[Dict[str, Any]]:
+    """One payload per page via pypdf, mirroring LlamaIndex's PDFReader output.
+
+    The file is memory-mapped, so pypdf seeks over page-cache pages instead of
+    a private copy of the whole PDF.
+    """
+    import pypdf
+    from llama_index.core.readers.file.base import default_file_metadata_func
+
+    base = default_file_metadata_func(path)
+    payloads = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        reader = pypdf.PdfReader(mapped)
+        for number, page in enumerate(reader.pages, start=1):
+            text = page.extract_text() or ""
+            if not text.strip():
+                continue
+            payloads.append({
+                "text": text,
+                "metadata": {"page_label": str(number), **base},
+                "excluded_embed_metadata_keys": list(EXCLUDED_FILE_METADATA),
+                "excluded_llm_metadata_keys": list(EXCLUDED_FILE_METADATA),
+            })
+    return payloads
+
+
+def parse_file(path: str) -> List[Dict[str, Any]]:
+    """Parse one file into plain payloads (runs in a worker process).
+
+    Returns one ``{"text", "metadata", "excluded_embed_metadata_keys",
+    "excluded_llm_metadata_keys"}`` dict per document (one per PDF page),
+    which pickles far cheaper than Document objects. PDFs are read with
+    pypdf directly; other formats go through SimpleDirectoryReader.
+    """
+    if path.lower().endswith(".pdf"):
+        return _parse_pdf(path)
+
+    from llama_index.core import SimpleDirectoryReader
+
+    documents = SimpleDirectoryReader(input_files=[path], required_exts=SUPPORTED_EXTS).load_data(show_progress=False)
+    return [
+        {
+            "text": doc.text,
+            "metadata": dict(doc.metadata),
+            "excluded_embed_metadata_keys": list(doc.excluded_embed_metadata_keys),
+            "excluded_llm_metadata_keys": list(doc.excluded_llm_metadata_keys),
+        }
+        for doc in documents
+    ]
+
+
+def payloads_to_documents(payloads: List[Dict[str, Any]]) -> List:
+    """Rebuild LlamaIndex Documents from parse_file() payloads"""
+    from llama_index.core import Document
+
+    return [
+        Document(
+            text=p["text"],
+            metadata=p["metadata"],
+            excluded_embed_metadata_keys=p["excluded_embed_metadata_keys"],
+            excluded_llm_metadata_keys=p["excluded_llm_metadata_keys"],
+        )
+        for p in payloads
+    ]
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Process-wide parsing pool (None when PARSE_WORKERS <= 0, i.e. parse in a thread)"""
+    global _pool
+    if Config.PARSE_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Not "fork": the parent runs the background loop and HTTP pools, and a forked child can inherit a held lock
+            method = Config.PARSE_START_METHOD
+            if method not in multiprocessing.get_all_start_methods():
+                method = "spawn"
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.PARSE_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+            )
+            atexit.register(shutdown_parse_pool)
+        return _pool
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -1,12 +1,12 @@
 import streamlit as st
-import asyncio
 from dotenv import load_dotenv
 from typing import Dict, Any
 from config import Config
 from graph.workflow import RAGWorkflow
-from services.vector_service import VectorService
+from services.uploads import discard_uploads, spool_upload
 from PIL import Image
 import base64
+import uuid
 from pathlib import Path
 
 load_dotenv()
@@ -75,12 +75,12 @@ def render_retrieval_settings_sidebar():
                 )
             # Relevance gating threshold
             _min_rel = st.slider(
-                "Vector relevance threshold",
+                "Relevance threshold",
                 min_value=0.0,
                 max_value=1.0,
                 value=float(st.session_state.min_vector_relevance),
                 step=0.01,
-                help="If avg vector relevance is below this threshold, the model may call web_search."
+                help=f"If avg relevance ({Config.RETRIEVAL_MODE} retrieval) is below this threshold, the model may call web_search."
             )
             if _web_limit != st.session_state.web_search_limit:
                 st.session_state.web_search_limit = _web_limit
@@ -89,6 +89,45 @@ def render_retrieval_settings_sidebar():
             if _min_rel != st.session_state.min_vector_relevance:
                 st.session_state.min_vector_relevance = _min_rel
 
+def stream_chat_response(prompt: str) -> Dict[str, Any]:
+    """Run the chat workflow with streaming, rendering the answer as it arrives; returns the final state"""
+    workflow = st.session_state.workflow
+    placeholder = st.empty()
+    placeholder.markdown("🧠 Thinking…")
+    text, result_state, running = "", {}, {}
+    events = workflow.iterate_sync(
+        workflow.run_workflow(
+            query=prompt,
+            uploaded_files=[],
+            user_email=st.session_state.user_email,
+            conversation_id=st.session_state.conversation_id,
+            web_search_limit=st.session_state.web_search_limit,
+            doc_retrieval_limit=st.session_state.doc_retrieval_limit,
+            min_vector_relevance=st.session_state.min_vector_relevance,
+            run_reason="chat",
+            stream=True,
+        )
+    )
+    for event in events:
+        if event["event"] == "token":
+            text += event["content"]
+            placeholder.markdown(text + "▌")
+        elif event["event"] in ("tool_call", "tool_result"):
+            # Tools of one turn run concurrently: show every one still running
+            if event["event"] == "tool_call":
+                # Text before a tool call is narration; the answer starts after the tools ran
+                text = ""
+                running[event["id"]] = event["name"]
+            else:
+                running.pop(event["id"], None)
+            if running:
+                names = ", ".join(f"`{name}`" for name in running.values())
+                placeholder.markdown(f"{text}\n\n🔧 Running {names}…")
+        elif event["event"] == "done":
+            result_state = event["state"]
+    placeholder.empty()
+    return result_state
+
 def display_message_with_stats(message: Dict[str, Any], message_index: int):
     """Display a message with enhanced statistics and support information"""
     with st.chat_message(message["role"]):
@@ -127,11 +166,32 @@ def display_message_with_stats(message: Dict[str, Any], message_index: int):
                         help="Number of AI tools automatically triggered"
                     )
                 
+                if stats.get("time_to_first_token") is not None:
+                    st.caption(f"⏱️ First token after {stats['time_to_first_token']:.2f}s of generation")
+                if stats.get("prompt_tokens"):
+                    summarized = " + summary" if stats.get("history_summarized") else ""
+                    st.caption(
+                        f"📏 Prompt {stats['prompt_tokens']:,} tokens, of which conversation history "
+                        f"{stats.get('history_tokens', 0):,} ({stats.get('history_turns', 0)} turns{summarized})"
+                    )
+                context_stats = stats.get("context") or {}
+                if context_stats.get("chunks_used"):
+                    st.caption(
+                        f"📚 Context {context_stats['tokens']:,} / {context_stats['budget']:,} tokens from "
+                        f"{context_stats['chunks_used']} of {context_stats['candidates']} chunks "
+                        f"({context_stats['duplicate_sentences']} duplicate sentences skipped)"
+                    )
+                
                 # Tool details if any were used
                 if tools_used:
                     st.markdown("**🔧 Automated Tools:**")
                     for tool in tools_used:
                         st.badge(tool)
+                    tool_timings = stats.get("tool_timings", [])
+                    if tool_timings:
+                        st.caption(" · ".join(
+                            f"{'✅' if t['ok'] else '❌'} {t['name']} {t['seconds']:.2f}s" for t in tool_timings
+                        ))
                 
                 # Show effective limits used for this run
                 limit_col1, limit_col2 = st.columns(2)
@@ -154,7 +214,7 @@ def display_message_with_stats(message: Dict[str, Any], message_index: int):
                     st.metric(
                         "📏 Avg vector relevance",
                         f"{stats.get('avg_vector_relevance', 0.0):.2f}",
-                        help="Average relevance computed from vector DB (1 - distance)"
+                        help="Average relevance of retrieved docs: fused hybrid score, or 1 - distance for vector-only retrieval"
                     )
                 with rel_col2:
                     st.metric(
@@ -747,6 +807,9 @@ def main():
     # Initialize session state
     if 'messages' not in st.session_state:
         st.session_state.messages = []
+    # Conversation memory key for this browser session
+    if 'conversation_id' not in st.session_state:
+        st.session_state.conversation_id = f"streamlit:{uuid.uuid4().hex}"
     if 'user_email' not in st.session_state:
         st.session_state.user_email = ""
     # Retrieval settings (RAG): defaults from config
@@ -756,7 +819,9 @@ def main():
         st.session_state.doc_retrieval_limit = getattr(Config, 'DEFAULT_DOCS_RETRIEVAL', getattr(Config, 'DEFAULT_SEARCH_RESULTS', 5))
     # Relevance threshold default
     if 'min_vector_relevance' not in st.session_state:
-        st.session_state.min_vector_relevance = getattr(Config, 'DEFAULT_MIN_VECTOR_RELEVANCE', 0.7)
+        st.session_state.min_vector_relevance = (
+            Config.DEFAULT_MIN_HYBRID_RELEVANCE if Config.RETRIEVAL_MODE == "hybrid" else Config.DEFAULT_MIN_VECTOR_RELEVANCE
+        )
     
     # Render retrieval settings early so current run uses updated values
     render_retrieval_settings_sidebar()
@@ -781,19 +846,23 @@ def main():
         
         # Generate response
         with st.chat_message("assistant"):
-            with st.spinner("🧠 Processing your request with intelligent support assessment..."):
+            with st.container() if Config.LLM_STREAMING else st.spinner("🧠 Processing your request with intelligent support assessment..."):
                 try:
-                    result_state = asyncio.run(
-                        st.session_state.workflow.run_workflow(
-                            query=prompt,
-                            uploaded_files=[],
-                            user_email=st.session_state.user_email,
-                            web_search_limit=st.session_state.web_search_limit,
-                            doc_retrieval_limit=st.session_state.doc_retrieval_limit,
-                            min_vector_relevance=st.session_state.min_vector_relevance,
-                            run_reason="chat",
+                    if Config.LLM_STREAMING:
+                        result_state = stream_chat_response(prompt)
+                    else:
+                        result_state = st.session_state.workflow.run_sync(
+                            st.session_state.workflow.run_workflow(
+                                query=prompt,
+                                uploaded_files=[],
+                                user_email=st.session_state.user_email,
+                                conversation_id=st.session_state.conversation_id,
+                                web_search_limit=st.session_state.web_search_limit,
+                                doc_retrieval_limit=st.session_state.doc_retrieval_limit,
+                                min_vector_relevance=st.session_state.min_vector_relevance,
+                                run_reason="chat",
+                            )
                         )
-                    )
                     
                     # Extract and display response
                     if hasattr(result_state, 'final_response'):
@@ -822,7 +891,7 @@ def main():
                     # Auto-create support ticket for errors
                     if st.session_state.user_email:
                         try:
-                            support_result = asyncio.run(
+                            support_result = st.session_state.workflow.run_sync(
                                 st.session_state.workflow.llm_agent.handle_support_request(
                                     user_request="System error occurred, need assistance",
                                     original_query=prompt,
@@ -864,31 +933,32 @@ def main():
             
             if st.button("🚀 Process Documents", type="primary", disabled=not uploaded_files, use_container_width=True):
                 with st.spinner("⚙️ Processing documents..."):
+                    file_data = []
                     try:
-                        file_data = []
+                        # Spool each upload to disk once; the workflow only carries paths
                         for file in uploaded_files:
-                            file_data.append({"filename": file.name, "content": file.read()})
+                            file.seek(0)
+                            file_data.append(spool_upload(file, file.name))
                         
-                        result_state = asyncio.run(
-                            st.session_state.workflow.run_workflow(
-                                query="Process uploaded documents",
+                        # Ingestion-only graph: no retrieval or LLM completion for uploads
+                        result_state = st.session_state.workflow.run_sync(
+                            st.session_state.workflow.run_ingestion(
                                 uploaded_files=file_data,
                                 chunk_size=chunk_size,
                                 chunk_overlap=chunk_overlap,
                                 user_email=st.session_state.user_email,
-                                web_search_limit=st.session_state.web_search_limit,
-                                doc_retrieval_limit=st.session_state.doc_retrieval_limit,
-                                min_vector_relevance=st.session_state.min_vector_relevance,
                                 run_reason="ingestion",
                             )
                         )
                         
-                        if hasattr(result_state, 'error_message') and result_state.error_message:
-                            st.error(f"❌ Processing failed: {result_state.error_message}")
+                        if result_state.get("error_message"):
+                            st.error(f"❌ Processing failed: {result_state['error_message']}")
                         else:
-                            st.success("✅ Documents processed successfully!")
-                            if hasattr(result_state, 'processed_docs'):
-                                processed_info = result_state.processed_docs
+                            st.success(
+                                f"✅ Documents processed successfully in {result_state['stats'].get('ingestion_time', 0):.1f}s!"
+                            )
+                            processed_info = result_state.get("processed_docs") or {}
+                            if processed_info:
                                 col_a, col_b = st.columns(2)
                                 with col_a:
                                     st.metric("📄 Documents", processed_info.get("total_documents", 0))
@@ -902,7 +972,7 @@ def main():
                         if st.session_state.user_email:
                             with st.spinner("Creating support ticket..."):
                                 try:
-                                    support_result = asyncio.run(
+                                    support_result = st.session_state.workflow.run_sync(
                                         st.session_state.workflow.llm_agent.handle_support_request(
                                             user_request="Document processing failed",
                                             original_query="Document upload",
@@ -913,6 +983,8 @@ def main():
                                     st.info(f"🎫 Support ticket created: {support_result}")
                                 except:
                                     pass
+                    finally:
+                        discard_uploads(file_data)
         
         # System Status Section
         with st.expander("🔧 System Status", expanded=False):
@@ -921,7 +993,7 @@ def main():
 LLM Model: {Config.LLM_MODEL}
 Embedding: {Config.EMBEDDING_MODEL}
 Search: Exa.ai
-Vector DB: Weaviate
+Vector DB: {Config.VECTOR_BACKEND}
 Support: Always Active
             """)
             
@@ -940,7 +1012,7 @@ Support: Always Active
             if st.button("📊 Get Stats", use_container_width=True):
                 with st.spinner("Fetching database statistics..."):
                     try:
-                        vector_service = VectorService()
+                        vector_service = st.session_state.workflow.vector_service
                         stats = vector_service.get_stats()
                         if "error" not in stats:
                             st.metric("📚 Total Documents", stats.get("total_documents", 0))
@@ -955,13 +1027,17 @@ Support: Always Active
                 if st.button("🗑️ Clear DB", type="secondary", use_container_width=True):
                     with st.spinner("Clearing database..."):
                         try:
-                            VectorService().wipe_collection()
+                            st.session_state.workflow.vector_service.wipe_collection()
+                            st.session_state.workflow.retrieval_cache.invalidate()
+                            if st.session_state.workflow.deduplicator is not None:
+                                st.session_state.workflow.deduplicator.clear()
                             st.success("✅ Database cleared")
                         except Exception as e:
                             st.error(f"❌ Error: {str(e)}")
             with col2:
                 if st.button("💬 Clear Chat", type="secondary", use_container_width=True):
                     st.session_state.messages = []
+                    st.session_state.workflow.llm_agent.clear_memory(st.session_state.conversation_id)
                     st.success("✅ Chat cleared")
                     st.rerun()
         
@@ -1020,18 +1096,17 @@ The system continuously learns and improves support delivery.
                                 "filename": "system_documentation.md",
                                 "content": sample_content.encode('utf-8')
                             }]
-                            asyncio.run(
-                                st.session_state.workflow.run_workflow(
-                                    query="Process system documentation",
+                            result_state = st.session_state.workflow.run_sync(
+                                st.session_state.workflow.run_ingestion(
                                     uploaded_files=sample_files,
                                     user_email=st.session_state.user_email,
-                                    min_vector_relevance=st.session_state.min_vector_relevance,
-                                    web_search_limit=st.session_state.web_search_limit,
-                                    doc_retrieval_limit=st.session_state.doc_retrieval_limit,
                                     run_reason="sample_ingestion",
                                 )
                             )
-                            st.success("✅ Sample document added!")
+                            if result_state.get("error_message"):
+                                st.error(f"❌ Error: {result_state['error_message']}")
+                            else:
+                                st.success("✅ Sample document added!")
                         except Exception as e:
                             st.error(f"❌ Error: {str(e)}")
             
@@ -1040,7 +1115,7 @@ The system continuously learns and improves support delivery.
                 if st.button("🆘 Request Support", type="primary", use_container_width=True):
                     with st.spinner("Creating support request..."):
                         try:
-                            support_result = asyncio.run(
+                            support_result = st.session_state.workflow.run_sync(
                                 st.session_state.workflow.llm_agent.handle_support_request(
                                     user_request="Manual support request from user",
                                     original_query="Direct support request",
@@ -0,0 +1,150 @@
+"""
+Duplicate chunks found and signature cost of the pre-embedding dedup stage.
+
+Runs chunks through a DedupSession (services.dedup) backed by a fresh
+signature index, as DocumentAgent.process_documents does between chunking
+and embedding, for DEDUP_MAX_HAMMING = -1 (exact only) and 0..3. Dropped
+near-duplicates are checked against their original with word 3-shingle
+Jaccard similarity, so false positives show up as a low minimum.
+
+Two corpora:
+
+  data      – chunks of data/10k + data/whitepapers, plus a second export
+              of the same PDFs with a few words edited per chunk (re-uploaded
+              revisions), as a persistent-index pass after the first
+  boilerplate – --docs generated support articles sharing legal/footer
+              paragraphs and re-published with small edits
+
+    uv run python benchmarks/chunk_dedup.py --docs 500
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+DATA_ROOT = PROJECT_ROOT.parent.parent / "data"
+
+from benchmarks.hybrid_fallback import load_chunks  # noqa: E402
+
+WORD_RE = re.compile(r"\w+")
+
+LEGAL = (
+    "This document is provided for informational purposes only and does not constitute a warranty of any kind. "
+    "Features described may change without notice. All trademarks are the property of their respective owners. "
+    "Contact support if you need help configuring your workspace, billing or single sign-on."
+)
+
+
+def edit(text: str, rng: random.Random, every: int = 60) -> str:
+    words = text.split(" ")
+    for i in range(rng.randrange(every), len(words), every):
+        words[i] = rng.choice(["updated", "new", "the", "now"])
+    return " ".join(words)
+
+
+def data_corpus():
+    chunks = []
+    for directory in ("10k", "whitepapers"):
+        chunks.extend(load_chunks(DATA_ROOT / directory))
+    rng = random.Random(0)
+    revised = [{"content": edit(c["content"], rng), "source": "v2/" + c["source"]} for c in chunks]
+    return chunks, revised
+
+
+def boilerplate_corpus(docs: int):
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    chunks = []
+    for d in range(docs):
+        body = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(150, 400)))
+        chunks.append({"content": f"Article {d}. {body}", "source": f"kb/{d}.md"})
+        chunks.append({"content": LEGAL, "source": f"kb/{d}.md"})
+    republished = [{"content": edit(c["content"], rng), "source": "v2/" + c["source"]} for c in chunks[: len(chunks) // 2]]
+    return chunks, republished
+
+
+def shingles(text: str):
+    words = WORD_RE.findall(text.lower())
+    return {tuple(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+def run_pass(session, chunks, offset: int, by_id):
+    from services.vector_backends import chunk_id, content_hash
+
+    documents, ids = [], []
+    for i, chunk in enumerate(chunks):
+        chunk_hash = content_hash(chunk["content"])
+        documents.append({**chunk, "content_hash": chunk_hash})
+        ids.append(chunk_id(f"{chunk['source']}#{offset + i}", chunk_hash))
+    start = time.perf_counter()
+    kept_documents, kept_ids, dropped = session.filter(documents, ids)
+    session.commit(kept_ids)
+    elapsed = time.perf_counter() - start
+    by_id.update(zip(ids, documents))
+    return elapsed, dropped
+
+
+def measure(first, second, max_distance: int):
+    from services.dedup import ChunkDeduplicator, SignatureIndex
+
+    with tempfile.TemporaryDirectory() as directory:
+        deduplicator = ChunkDeduplicator(SignatureIndex(f"{directory}/signatures.sqlite3", "bench"), max_distance)
+        by_id = {}
+        # First upload dedups within the run, the revision against the persistent index
+        t1, dropped1 = run_pass(deduplicator.session(), first, 0, by_id)
+        session = deduplicator.session()
+        t2, dropped2 = run_pass(session, second, len(first), by_id)
+        deduplicator.close()
+    similarities = [
+        len(shingles(by_id[d]["content"]) & shingles(by_id[o]["content"]))
+        / max(1, len(shingles(by_id[d]["content"]) | shingles(by_id[o]["content"])))
+        for d, o in {**dropped1, **dropped2}.items()
+    ]
+    total = len(first) + len(second)
+    skipped = len(dropped1) + len(dropped2)
+    return {
+        "max_hamming": max_distance,
+        "first_upload_skipped": len(dropped1),
+        "revision_skipped": len(dropped2),
+        "revision_exact": session.stats["exact"],
+        "revision_near": session.stats["near"],
+        "embeddings_avoided_pct": round(100 * skipped / total, 1),
+        "min_jaccard": round(min(similarities), 3) if similarities else None,
+        "us_per_chunk": round((t1 + t2) / total * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=["data", "boilerplate", "both"], default="both")
+    parser.add_argument("--docs", type=int, default=500, help="Articles in the boilerplate corpus")
+    args = parser.parse_args()
+
+    corpora = {}
+    if args.corpus in ("data", "both"):
+        corpora["data"] = data_corpus()
+    if args.corpus in ("boilerplate", "both"):
+        corpora["boilerplate"] = boilerplate_corpus(args.docs)
+
+    report = {}
+    for name, (first, second) in corpora.items():
+        print(f"\n{name}: {len(first)} chunks, then a revision of {len(second)} chunks")
+        print(f"{'hamming':>8}{'run 1':>8}{'rev':>7}{'exact':>7}{'near':>6}{'avoided':>9}{'min J':>7}{'us/chunk':>10}")
+        rows = []
+        for max_distance in (-1, 0, 1, 2, 3):
+            r = measure(first, second, max_distance)
+            rows.append(r)
+            print(f"{r['max_hamming']:>8}{r['first_upload_skipped']:>8}{r['revision_skipped']:>7}{r['revision_exact']:>7}"
+                  f"{r['revision_near']:>6}{str(r['embeddings_avoided_pct']) + '%':>9}{str(r['min_jaccard']):>7}{r['us_per_chunk']:>10}")
+        report[name] = {"chunks": len(first), "revision_chunks": len(second), "results": rows}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Chunking throughput and memory: LlamaIndex SentenceSplitter vs OffsetChunker.
+
+Parses the bundled PDFs (data/10k, data/whitepapers) once, then chunks the
+same documents with both engines using DocumentAgent's settings. Reports
+chunks/s and MB/s of source text (best of --repeat runs), plus tracemalloc
+figures: the peak allocated while chunking and what the returned chunk list
+keeps alive on top of the parsed documents.
+
+    uv run python benchmarks/chunker.py --chunk-size 1000 --chunk-overlap 200
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+DATA_ROOT = PROJECT_ROOT.parent.parent / "data"
+
+
+def load_documents():
+    from agents.document_agent import DocumentAgent
+    from agents.parsing import parse_file, payloads_to_documents
+
+    paths = sorted(DATA_ROOT.glob("10k/*.pdf")) + sorted(DATA_ROOT.glob("whitepapers/*.pdf"))
+    documents = []
+    for path in paths:
+        documents.extend(payloads_to_documents(parse_file(str(path))))
+    return paths, DocumentAgent._attach_metadata(documents)
+
+
+def engines(chunk_size: int, chunk_overlap: int):
+    from llama_index.core.node_parser import SentenceSplitter
+    from services.chunker import OffsetChunker
+
+    splitter = SentenceSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        paragraph_separator="\n\n",
+        secondary_chunking_regex="[.!?]+\\s+",
+    )
+    chunker = OffsetChunker(chunk_size, chunk_overlap)
+    return {
+        "sentence_splitter": lambda docs: splitter.get_nodes_from_documents(docs, show_progress=False),
+        "offset": chunker.chunk_documents,
+    }
+
+
+def measure(chunk, documents, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        chunks = chunk(documents)
+        timings.append(time.perf_counter() - start)
+        del chunks
+
+    gc.collect()
+    tracemalloc.start()
+    chunks = chunk(documents)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, min(timings), retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        paths, documents = load_documents()
+        runners = engines(args.chunk_size, args.chunk_overlap)
+        from services.tokenizer import get_token_counter
+        counter = get_token_counter()
+    source_mb = sum(len(d.text) for d in documents) / 1024 / 1024
+
+    results = []
+    for name, chunk in runners.items():
+        chunks, wall, retained, peak = measure(chunk, documents, args.repeat)
+        sizes = counter.count_batch([c.text for c in chunks])
+        results.append({
+            "engine": name,
+            "chunks": len(chunks),
+            "wall_s": round(wall, 3),
+            "chunks_per_s": round(len(chunks) / wall),
+            "mb_per_s": round(source_mb / wall, 2),
+            "mean_tokens": round(sum(sizes) / len(sizes)),
+            "max_tokens": max(sizes),
+            "retained_mb": round(retained / 1024 / 1024, 2),
+            "peak_mb": round(peak / 1024 / 1024, 2),
+        })
+        del chunks
+
+    print(f"{len(paths)} PDFs, {len(documents)} pages, {source_mb:.1f} MB text, tokenizer={counter.name}, "
+          f"chunk_size={args.chunk_size}, overlap={args.chunk_overlap}")
+    print(f"{'engine':<19}{'chunks':>7}{'wall s':>8}{'chunks/s':>10}{'MB/s':>7}{'tokens':>8}{'max':>6}{'kept MB':>9}{'peak MB':>9}")
+    for r in results:
+        print(f"{r['engine']:<19}{r['chunks']:>7}{r['wall_s']:>8}{r['chunks_per_s']:>10}{r['mb_per_s']:>7}"
+              f"{r['mean_tokens']:>8}{r['max_tokens']:>6}{r['retained_mb']:>9}{r['peak_mb']:>9}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
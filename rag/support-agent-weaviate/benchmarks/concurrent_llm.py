@@ -0,0 +1,135 @@
+"""
+Concurrency benchmark for whole chat workflows against a local mock LLM.
+
+Starts N RAGWorkflow.run_workflow calls at once on the shared runtime loop
+(retrieval from an empty local store, a fake /embeddings endpoint, and a
+fake /chat/completions server from benchmarks/llm_streaming.py with
+--latency per completion). Two LLM client modes:
+
+  blocking  – legacy behaviour: the synchronous OpenAI client called inside
+              the async tool loop, so every completion stalls the event loop
+              and workflows finish one after another (~N x latency)
+  async     – AsyncOpenAI on the shared "llm" connection pool; completions
+              overlap (~1 x latency)
+
+Also reports the worst event-loop stall seen by a 10 ms ticker while the
+workflows run, i.e. how long anything else on the loop (Slack handlers,
+retrievals, ingestion) would have waited.
+
+    uv run python benchmarks/concurrent_llm.py --workflows 8 --latency 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.ingestion_suite import FakeEmbeddingsServer  # noqa: E402
+from benchmarks.llm_streaming import FakeChatServer  # noqa: E402
+
+
+class BlockingCompletions:
+    """The pre-AsyncOpenAI call pattern: a sync client awaited from async code"""
+
+    def __init__(self, client):
+        self._client = client
+
+    async def create(self, **kwargs):
+        return self._client.chat.completions.create(**kwargs)
+
+
+class BlockingClient:
+    def __init__(self, base_url: str, api_key: str):
+        from openai import OpenAI
+
+        sync_client = OpenAI(base_url=base_url, api_key=api_key)
+        self.chat = type("Chat", (), {"completions": BlockingCompletions(sync_client)})()
+
+
+async def run_all(workflow, count: int):
+    latencies, stalls = [], []
+    running = True
+
+    async def ticker():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stalls.append(time.perf_counter() - start - 0.01)
+
+    async def one(i: int):
+        start = time.perf_counter()
+        state = await workflow.run_workflow(f"How do I rotate API key {i}?", search_limit=2)
+        latencies.append(time.perf_counter() - start)
+        return state
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    states = await asyncio.gather(*(one(i) for i in range(count)))
+    wall = time.perf_counter() - start
+    running = False
+    await tick
+    return wall, latencies, stalls, states
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workflows", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per chat completion")
+    parser.add_argument("--tokens", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("VECTOR_BACKEND", "local")
+    from config import Config
+
+    report = {"workflows": args.workflows, "completion_latency_s": args.latency, "results": []}
+    with tempfile.TemporaryDirectory() as directory, \
+            FakeChatServer(args.tokens, 0.0, args.latency) as chat, \
+            FakeEmbeddingsServer(8, 0.005, 0.0, 0.0) as embeddings:
+        Config.VECTOR_BACKEND = "local"
+        Config.LOCAL_VECTOR_STORE_DIR = directory
+        Config.CACHE_DIR = directory
+        Config.EMBEDDING_CACHE_ENABLED = False
+        Config.RETRIEVAL_CACHE_TTL = 0
+        Config.DEDUP_ENABLED = False
+        Config.KEYWORDS_AI_API_KEY = ""
+        Config.NEBIUS_BASE_URL = chat.base_url
+        Config.NEBIUS_API_KEY = Config.NEBIUS_API_KEY or "fake"
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            from graph.workflow import RAGWorkflow
+
+            workflow = RAGWorkflow()
+            workflow.embedding_agent.base_url = embeddings.base_url
+            async_client = workflow.llm_agent.client
+
+        for mode in ("blocking", "async"):
+            workflow.llm_agent.client = BlockingClient(chat.base_url, Config.NEBIUS_API_KEY) if mode == "blocking" else async_client
+            with contextlib.redirect_stdout(io.StringIO()):
+                wall, latencies, stalls, states = workflow.run_sync(run_all(workflow, args.workflows))
+            failed = sum(bool(s.get("error_message")) or not s.get("final_response", "").startswith("word") for s in states)
+            result = {
+                "mode": mode,
+                "wall_s": round(wall, 3),
+                "sum_of_latencies_s": round(sum(latencies), 3),
+                "slowest_s": round(max(latencies), 3),
+                "max_loop_stall_ms": round(max(stalls, default=0) * 1000, 1),
+                "failed": failed,
+            }
+            report["results"].append(result)
+            print(f"{mode:<9} wall {result['wall_s']:>6}s  slowest {result['slowest_s']:>6}s  "
+                  f"sum {result['sum_of_latencies_s']:>7}s  max loop stall {result['max_loop_stall_ms']:>7} ms  failed {failed}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            workflow.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Concurrency benchmark for VectorService.similarity_search against a local stub.
+
+The stub mimics Weaviate with a fixed per-query latency. Three modes issue N
+retrievals at once with asyncio.gather:
+
+  blocking  – legacy behaviour: the sync client's near_vector called inside
+              an async def, so queries run back to back (~N x latency)
+  thread    – sync client, call moved off the loop with asyncio.to_thread
+  async     – native async client; queries overlap (~1 x latency)
+
+    uv run python benchmarks/concurrent_retrieval.py --queries 8 --latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def fake_response(limit: int):
+    objects = [
+        SimpleNamespace(
+            properties={"content": f"chunk {i}", "source": "stub.md", "document_id": "stub", "chunk_index": i, "file_type": "md"},
+            metadata=SimpleNamespace(distance=0.1 + i * 0.01),
+        )
+        for i in range(limit)
+    ]
+    return SimpleNamespace(objects=objects)
+
+
+class StubSyncClient:
+    def __init__(self, latency: float):
+        def near_vector(**kwargs):
+            time.sleep(latency)
+            return fake_response(kwargs.get("limit", 5))
+
+        collection = SimpleNamespace(query=SimpleNamespace(near_vector=near_vector))
+        self.collections = SimpleNamespace(get=lambda name: collection, exists=lambda name: True)
+
+
+class StubAsyncClient:
+    def __init__(self, latency: float):
+        async def near_vector(**kwargs):
+            await asyncio.sleep(latency)
+            return fake_response(kwargs.get("limit", 5))
+
+        collection = SimpleNamespace(query=SimpleNamespace(near_vector=near_vector))
+        self.collections = SimpleNamespace(get=lambda name: collection)
+
+    def is_connected(self):
+        return True
+
+
+async def run_mode(mode: str, queries: int, latency: float) -> dict:
+    from services.vector_service import VectorService
+
+    sync_client = StubSyncClient(latency)
+    service = VectorService(client=sync_client, async_client=StubAsyncClient(latency) if mode == "async" else None)
+
+    async def legacy_search(embedding):
+        # Pre-async code path: blocking call inside the coroutine
+        collection = sync_client.collections.get(service.collection_name)
+        response = collection.query.near_vector(near_vector=embedding, limit=5)
+        return [{**o.properties, "distance": o.metadata.distance} for o in response.objects]
+
+    search = legacy_search if mode == "blocking" else (lambda e: service.similarity_search(e, limit=5))
+    start = time.perf_counter()
+    results = await asyncio.gather(*[search([0.1] * 8) for _ in range(queries)])
+    wall = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "queries": queries,
+        "latency_s": latency,
+        "wall_s": round(wall, 3),
+        "serial_s": round(queries * latency, 3),
+        "overlap": round(queries * latency / wall, 2),
+        "results_ok": all(len(r) == 5 for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):  # silence per-query logging
+        results = [asyncio.run(run_mode(m, args.queries, args.latency)) for m in ("blocking", "thread", "async")]
+
+    print(f"{'mode':<10}{'wall s':>8}{'serial s':>10}{'overlap x':>11}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['wall_s']:>8}{r['serial_s']:>10}{r['overlap']:>11}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Prompt context size vs evidence kept: legacy _build_context vs the token-budgeted packer.
+
+Chunks a corpus into a LocalVectorStore (hashed-trigram stand-in
+embeddings, as in benchmarks/hybrid_fallback.py), retrieves --limit chunks
+per exact-term query ("What does the paper say about <rare term>?") with
+hybrid search, and builds the prompt context two ways:
+
+  legacy  – first 3 retrieved chunks cut to 200 characters each
+  packed  – services.context_packer.pack_context at each --budgets value
+
+For each it reports the achieved context tokens (CHUNK_TOKENIZER), how
+often the query term reaches the context when the chunk containing it was
+retrieved (evidence recall), duplicate sentences dropped and packing time.
+
+    uv run python benchmarks/context_packing.py --data-dir ../../data/whitepapers --limit 5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.hybrid_fallback import DEFAULT_DATA_DIR, build_queries, hash_embed, load_chunks  # noqa: E402
+
+
+def legacy_context(docs):
+    """The previous LLMAgent._build_context (documents part)"""
+    if not docs:
+        return "No additional context."
+    parts = ["\nRetrieved documents:"]
+    for i, doc in enumerate(docs[:3], 1):
+        title = doc.get('title', doc.get('filename', 'Untitled'))
+        content = doc.get('content', '')[:200] + "..." if len(doc.get('content', '')) > 200 else doc.get('content', '')
+        parts.append(f"{i}. {title}: {content}")
+    return "\n".join(parts)
+
+
+async def retrieve(chunks, queries, limit):
+    from services.local_vector_store import LocalVectorStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(directory=tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            store.store_documents_sync(
+                [{**c, "document_id": str(i), "chunk_index": i, "file_type": "pdf"} for i, c in enumerate(chunks)],
+                hash_embed([c["content"] for c in chunks]),
+            )
+        results = []
+        for (query, _), vector in zip(queries, hash_embed([q for q, _ in queries])):
+            with contextlib.redirect_stdout(io.StringIO()):
+                results.append(await store.hybrid_search(query, vector, limit=limit))
+        store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=5, help="doc_retrieval_limit")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    args = parser.parse_args()
+
+    from services.context_packer import pack_context
+    from services.tokenizer import get_token_counter
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        counter = get_token_counter()
+    chunks = load_chunks(args.data_dir)
+    queries = build_queries(chunks, args.queries)["exact-term"]
+    retrieved = asyncio.run(retrieve(chunks, queries, args.limit))
+    terms = [query[len("What does the paper say about "):-1] for query, _ in queries]
+    # Only queries whose evidence was retrieved: recall then measures what the context builder keeps of it
+    answerable = [i for i, docs in enumerate(retrieved) if any(terms[i] in d["content"] for d in docs)]
+
+    def measure(name, build):
+        tokens, recall, duplicates, elapsed = [], 0, 0, 0.0
+        for i in answerable:
+            start = time.perf_counter()
+            text, stats = build(retrieved[i])
+            elapsed += time.perf_counter() - start
+            tokens.append(stats["tokens"] if stats else counter.count(text))
+            recall += terms[i] in text
+            duplicates += stats.get("duplicate_sentences", 0) if stats else 0
+        return {
+            "context": name,
+            "mean_tokens": round(float(np.mean(tokens))),
+            "max_tokens": int(max(tokens)),
+            "evidence_recall": round(recall / len(answerable), 3),
+            "duplicate_sentences_per_query": round(duplicates / len(answerable), 2),
+            "ms_per_query": round(elapsed / len(answerable) * 1000, 2),
+        }
+
+    rows = [measure("legacy", lambda docs: (legacy_context(docs), None))]
+    for budget in args.budgets:
+        rows.append(measure(f"packed {budget}", lambda docs: pack_context(docs, token_budget=budget, limit=args.limit, counter=counter)))
+
+    print(f"{len(chunks)} chunks, {len(answerable)}/{len(queries)} queries with the evidence chunk retrieved (k={args.limit}), tokenizer {counter.name}")
+    print(f"{'context':<14}{'mean tok':>9}{'max tok':>9}{'recall':>8}{'dup sent':>10}{'ms':>7}")
+    for r in rows:
+        print(f"{r['context']:<14}{r['mean_tokens']:>9}{r['max_tokens']:>9}{r['evidence_recall']:>8}"
+              f"{r['duplicate_sentences_per_query']:>10}{r['ms_per_query']:>7}")
+    print(json.dumps({"chunks": len(chunks), "queries": len(answerable), "limit": args.limit,
+                      "tokenizer": counter.name, "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Peak-memory benchmark for carrying embeddings through the ingestion path.
+
+Compares the legacy representation (JSON float lists -> List[List[float]]
+zipped into prepared_documents tuples) with the current one (base64 response
+decoded into a contiguous float32 matrix). Each mode runs in a fresh
+subprocess so peak RSS is not shared. The embeddings endpoint is faked with
+httpx.MockTransport, so no API key is needed.
+
+    uv run python benchmarks/embedding_memory.py --dims 4096
+"""
+import argparse
+import asyncio
+import base64
+import gc
+import json
+import resource
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+DEFAULT_DATA_DIR = PROJECT_ROOT.parent.parent / "data" / "whitepapers"
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def fake_transport(dims: int):
+    import httpx
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        vectors = rng.standard_normal((len(body["input"]), dims), dtype=np.float32)
+        if body.get("encoding_format") == "base64":
+            data = [
+                {"index": i, "embedding": base64.b64encode(v.tobytes()).decode("ascii")}
+                for i, v in enumerate(vectors)
+            ]
+        else:
+            data = [{"index": i, "embedding": v.tolist()} for i, v in enumerate(vectors)]
+        return httpx.Response(200, json={"data": data})
+
+    return httpx.MockTransport(handler)
+
+
+def load_chunks(data_dir: Path, copies: int):
+    from agents.document_agent import DocumentAgent
+
+    files = sorted(str(p) for p in data_dir.glob("*.pdf"))
+    agent = DocumentAgent.__new__(DocumentAgent)  # parsing/chunking only, no embedding agent needed
+    documents = agent.load_documents_with_llamaindex(files)
+    nodes = agent.create_chunks(documents, 1000, 200)
+    texts = [node.text for node in nodes] * copies
+    return files, texts
+
+
+async def run_lists(texts, dims):
+    """Pre-NumPy path: JSON floats, batches of 10, zipped tuples, unzipped for storage"""
+    import httpx
+
+    client = httpx.AsyncClient(transport=fake_transport(dims))
+    embeddings = []
+    for i in range(0, len(texts), 10):
+        response = await client.post("http://fake/embeddings", json={"model": "fake", "input": texts[i:i + 10]})
+        embeddings.extend(item["embedding"] for item in response.json()["data"])
+    prepared = [({"content": t, "chunk_index": i}, e) for i, (t, e) in enumerate(zip(texts, embeddings))]
+    del embeddings
+    docs, vectors = zip(*prepared)
+    return list(docs), list(vectors)
+
+
+async def run_numpy(texts, dims):
+    """Current path: base64 response decoded into one float32 matrix"""
+    import httpx
+    from config import Config
+    from agents.embedding_agent import EmbeddingAgent
+
+    Config.EMBEDDING_CACHE_ENABLED = False
+    Config.EMBEDDING_ENCODING_FORMAT = "base64"
+    agent = EmbeddingAgent(http_client=httpx.AsyncClient(transport=fake_transport(dims)))
+    agent.base_url = "http://fake"
+    matrix = await agent.generate_embeddings_batch(texts)
+    docs = [{"content": t, "chunk_index": i} for i, t in enumerate(texts)]
+    return docs, matrix
+
+
+def worker(mode: str, data_dir: Path, dims: int, copies: int):
+    files, texts = load_chunks(data_dir, copies)
+    gc.collect()
+    baseline_rss = current_rss_mb()
+    baseline_peak = peak_rss_mb()
+
+    runner = run_lists if mode == "lists" else run_numpy
+    docs, vectors = asyncio.run(runner(texts, dims))
+    gc.collect()
+    held_rss = current_rss_mb()
+
+    print(json.dumps({
+        "mode": mode,
+        "files": len(files),
+        "chunks": len(docs),
+        "dims": dims,
+        "raw_float32_mb": round(len(docs) * dims * 4 / 2**20, 1),
+        "rss_before_embedding_mb": round(baseline_rss, 1),
+        "rss_holding_embeddings_mb": round(held_rss, 1),
+        "embeddings_resident_mb": round(held_rss - baseline_rss, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_rss_during_parse_mb": round(baseline_peak, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--dims", type=int, default=4096)
+    parser.add_argument("--copies", type=int, default=1, help="Repeat the chunk list to simulate a larger corpus")
+    parser.add_argument("--mode", choices=["lists", "numpy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        worker(args.mode, args.data_dir, args.dims, args.copies)
+        return
+
+    results = []
+    for mode in ("lists", "numpy"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--data-dir", str(args.data_dir),
+             "--dims", str(args.dims), "--copies", str(args.copies)],
+            capture_output=True, text=True, check=True, cwd=PROJECT_ROOT,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'mode':<8}{'chunks':>8}{'raw MB':>9}{'resident MB':>13}{'peak RSS MB':>13}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['chunks']:>8}{r['raw_float32_mb']:>9}{r['embeddings_resident_mb']:>13}{r['peak_rss_mb']:>13}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
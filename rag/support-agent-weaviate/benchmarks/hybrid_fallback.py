@@ -0,0 +1,176 @@
+"""
+Web-search fallback rate: vector-only vs hybrid (BM25 + vector, RRF) retrieval.
+
+Chunks a corpus into a LocalVectorStore and runs three query sets through
+both retrieval modes, applying the same relevance gate as
+RAGWorkflow._retrieve_docs_node:
+
+  exact-term  – "What does the paper say about <term>?" for rare identifiers
+                (model names, numbers, acronyms) that occur in 1-3 chunks
+  natural     – the opening words of a random chunk
+  off-topic   – questions the corpus cannot answer (fallback is correct here)
+
+For each mode it reports how often the fallback fires, hit@k (the chunk the
+query was built from is retrieved) and search latency.
+
+By default embeddings come from a deterministic character-trigram hashing
+model so the run is offline; absolute vector-only relevance then sits far
+below what a real embedding model produces. Use --embeddings nebius (needs
+NEBIUS_API_KEY) for representative numbers.
+
+    uv run python benchmarks/hybrid_fallback.py --data-dir ../../data/whitepapers
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import re
+import sys
+import tempfile
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+DEFAULT_DATA_DIR = PROJECT_ROOT.parent.parent / "data" / "whitepapers"
+
+OFF_TOPIC = [
+    "What is the weather in Paris tomorrow?",
+    "Who won the football world cup in 2018?",
+    "How do I bake sourdough bread at home?",
+    "What are good hiking trails near Denver?",
+    "How do I reset my car's tire pressure light?",
+    "Recommend a romantic comedy movie for tonight",
+    "What is the capital of Australia?",
+    "How many calories are in a banana?",
+    "Best way to learn to play the guitar?",
+    "When does the next train leave for Berlin?",
+]
+
+TERM_RE = re.compile(r"\b(?:[A-Za-z]+[-]?\d[\w.-]*|[A-Z][a-z]+[A-Z]\w*|[A-Z]{3,}\w*)\b")
+
+
+def hash_embed(texts, dims: int = 512) -> np.ndarray:
+    """Offline stand-in embedding: hashed character trigrams, L2-normalised"""
+    matrix = np.zeros((len(texts), dims), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f"  {text.lower()}  "
+        for i in range(len(padded) - 2):
+            matrix[row, zlib.crc32(padded[i:i + 3].encode()) % dims] += 1.0
+    matrix = np.log1p(matrix)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def load_chunks(data_dir: Path):
+    from agents.document_agent import DocumentAgent
+
+    files = sorted(str(p) for p in data_dir.iterdir() if p.suffix in (".pdf", ".md", ".txt", ".docx"))
+    agent = DocumentAgent.__new__(DocumentAgent)  # parsing/chunking only
+    with contextlib.redirect_stdout(io.StringIO()):
+        documents = agent.load_documents_with_llamaindex(files)
+        nodes = agent.create_chunks(documents, 1000, 200)
+    return [{"content": n.text, "source": n.metadata.get("source", "unknown")} for n in nodes]
+
+
+def build_queries(chunks, count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    occurrences = Counter()
+    first_chunk = {}
+    for i, chunk in enumerate(chunks):
+        for term in set(TERM_RE.findall(chunk["content"])):
+            occurrences[term] += 1
+            first_chunk.setdefault(term, i)
+    rare = sorted(t for t, n in occurrences.items() if 1 <= n <= 3 and len(t) >= 3)
+    picked = rng.choice(len(rare), size=min(count, len(rare)), replace=False)
+    exact = [(f"What does the paper say about {rare[i]}?", first_chunk[rare[i]]) for i in picked]
+
+    natural = []
+    for i in rng.choice(len(chunks), size=min(count, len(chunks)), replace=False):
+        words = chunks[i]["content"].split()[:12]
+        natural.append((" ".join(words), int(i)))
+
+    return {"exact-term": exact, "natural": natural, "off-topic": [(q, None) for q in OFF_TOPIC]}
+
+
+async def embed(texts, backend: str) -> np.ndarray:
+    if backend == "hash":
+        return hash_embed(texts)
+    from agents.embedding_agent import EmbeddingAgent
+    return await EmbeddingAgent().generate_embeddings_batch(texts)
+
+
+async def run(args):
+    from config import Config
+    from services.local_vector_store import LocalVectorStore
+
+    chunks = load_chunks(args.data_dir)
+    queries = build_queries(chunks, args.queries)
+    embeddings = await embed([c["content"] for c in chunks], args.embeddings)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(directory=tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            store.store_documents_sync(
+                [{**c, "document_id": str(i), "chunk_index": i, "file_type": "pdf"} for i, c in enumerate(chunks)],
+                embeddings,
+            )
+
+        gates = {"vector": Config.DEFAULT_MIN_VECTOR_RELEVANCE, "hybrid": Config.DEFAULT_MIN_HYBRID_RELEVANCE}
+        results = []
+        for name, items in queries.items():
+            query_vectors = await embed([q for q, _ in items], args.embeddings)
+            for mode, threshold in gates.items():
+                fallbacks = hits = 0
+                latencies = []
+                for (query, target), vector in zip(items, query_vectors):
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        if mode == "hybrid":
+                            docs = await store.hybrid_search(query, vector, limit=args.limit, alpha=args.alpha)
+                        else:
+                            docs = await store.similarity_search(vector, limit=args.limit)
+                    latencies.append(time.perf_counter() - start)
+                    relevances = [max(0.0, 1.0 - float(d["distance"])) for d in docs]
+                    avg_rel = sum(relevances) / len(relevances) if relevances else 0.0
+                    fallbacks += avg_rel < threshold
+                    hits += target is not None and any(d["chunk_index"] == target for d in docs)
+                results.append({
+                    "queries": name,
+                    "mode": mode,
+                    "n": len(items),
+                    "threshold": threshold,
+                    "fallback_rate": round(fallbacks / len(items), 3),
+                    "hit_at_k": round(hits / len(items), 3) if name != "off-topic" else None,
+                    "p50_ms": round(float(np.median(latencies)) * 1000, 2),
+                })
+        store.close()
+    return {"chunks": len(chunks), "embeddings": args.embeddings, "limit": args.limit, "alpha": args.alpha, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--queries", type=int, default=40, help="Queries per generated set")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--alpha", type=float, default=0.5)
+    parser.add_argument("--embeddings", choices=["hash", "nebius"], default="hash")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"{report['chunks']} chunks, embeddings={report['embeddings']}, k={report['limit']}, alpha={report['alpha']}")
+    print(f"{'queries':<12}{'mode':<8}{'n':>4}{'gate':>7}{'fallback':>10}{'hit@k':>8}{'p50 ms':>9}")
+    for r in report["results"]:
+        hit = "-" if r["hit_at_k"] is None else f"{r['hit_at_k']:.2f}"
+        print(f"{r['queries']:<12}{r['mode']:<8}{r['n']:>4}{r['threshold']:>7.2f}{r['fallback_rate']:>10.2f}{hit:>8}{r['p50_ms']:>9}")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Peak memory and wall time of DocumentAgent's streaming ingestion pipeline.
+
+Runs N PDFs through parse → chunk → embed → store in two modes, each in a
+fresh subprocess so peak RSS is not shared:
+
+  collect  – no store callback: every chunk and one embedding matrix for the
+             whole upload are held until the end (the old phase-by-phase
+             memory profile)
+  stream   – store callback: each file is handed to storage as soon as it is
+             embedded, so only INGEST_QUEUE_SIZE files are in flight per stage
+
+The embeddings endpoint is faked with httpx.MockTransport (fixed latency per
+request) and the store is a remote-like sink that only counts objects after
+a fixed latency, so no API keys are needed and RSS reflects the pipeline
+rather than a local index.
+
+    uv run python benchmarks/ingestion_pipeline.py --files 1 3 5 --dims 4096
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+DATA_ROOT = PROJECT_ROOT.parent.parent / "data"
+
+from benchmarks.embedding_memory import current_rss_mb, fake_transport, peak_rss_mb  # noqa: E402
+
+
+def corpus(count: int):
+    files = sorted(DATA_ROOT.glob("10k/*.pdf")) + sorted(DATA_ROOT.glob("whitepapers/*.pdf"))
+    return [files[i % len(files)] for i in range(count)]
+
+
+def latency_transport(dims: int, latency: float):
+    import httpx
+
+    inner = fake_transport(dims)
+
+    class SlowTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            await asyncio.sleep(latency)
+            return inner.handle_request(request)
+
+    return SlowTransport()
+
+
+async def ingest(mode: str, paths, dims: int, latency: float):
+    import httpx
+    from config import Config
+    from agents.document_agent import DocumentAgent
+    from agents.embedding_agent import EmbeddingAgent
+    from services.vector_backends import ingestion_report
+
+    Config.EMBEDDING_CACHE_ENABLED = False
+    embedding_agent = EmbeddingAgent(http_client=httpx.AsyncClient(transport=latency_transport(dims, latency)))
+    embedding_agent.base_url = "http://fake"
+    agent = DocumentAgent(embedding_agent=embedding_agent)
+
+    # Index prefix keeps repeated PDFs distinct sources
+    uploads = [{"filename": f"{i}_{p.name}", "content": p.read_bytes()} for i, p in enumerate(paths)]
+
+    async def remote_store(documents, embeddings, ids):
+        await asyncio.sleep(latency)
+        return ingestion_report(stored=len(documents), failed=0, total_bytes=int(embeddings.nbytes), elapsed=latency)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return await agent.process_documents(
+            uploads, 1000, 200, store=remote_store if mode == "stream" else None
+        )
+
+
+def worker(mode: str, count: int, dims: int, latency: float):
+    paths = corpus(count)
+    gc.collect()
+    baseline = current_rss_mb()
+    start = time.perf_counter()
+    result = asyncio.run(ingest(mode, paths, dims, latency))
+    print(json.dumps({
+        "mode": mode,
+        "files": count,
+        "chunks": result["total_chunks"],
+        "wall_s": round(time.perf_counter() - start, 2),
+        "overlap": result["pipeline"]["overlap"],
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_over_baseline_mb": round(peak_rss_mb() - baseline, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--dims", type=int, default=4096)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake embeddings request latency (s)")
+    parser.add_argument("--mode", choices=["collect", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--count", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        worker(args.mode, args.count, args.dims, args.latency)
+        return
+
+    results = []
+    for count in args.files:
+        for mode in ("collect", "stream"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--count", str(count),
+                 "--dims", str(args.dims), "--latency", str(args.latency)],
+                capture_output=True, text=True, check=True, cwd=PROJECT_ROOT,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'mode':<9}{'files':>6}{'chunks':>8}{'wall s':>8}{'overlap':>9}{'peak MB':>9}{'+baseline':>11}")
+    for r in results:
+        print(f"{r['mode']:<9}{r['files']:>6}{r['chunks']:>8}{r['wall_s']:>8}{r['overlap']:>9}{r['peak_rss_mb']:>9}{r['peak_over_baseline_mb']:>11}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
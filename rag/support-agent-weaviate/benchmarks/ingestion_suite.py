@@ -0,0 +1,280 @@
+"""
+End-to-end ingestion benchmark with local stand-ins for Nebius and Weaviate.
+
+Drives DocumentAgent.process_documents with the vector backend's
+store_documents as the sink, exactly as RAGWorkflow does, against:
+
+  - a fake OpenAI-compatible POST /embeddings server on 127.0.0.1 (real
+    HTTP through the pooled httpx client; --latency/--jitter per request,
+    --dims, optional --error-rate of 429s to exercise backoff)
+  - a LocalVectorStore in a temp directory (or --vector-backend weaviate to
+    point at the configured, e.g. local Docker, Weaviate)
+
+The corpus is the repo's data/ PDFs plus --generated synthetic text files.
+The JSON report has per-stage throughput (files/s, chunks/s, embeddings/s,
+inserts/s, both end to end and per busy second of each stage), peak RSS, and
+latency percentiles for files, embedding requests and store calls. Write it
+with --output to track regressions across commits.
+
+    uv run python benchmarks/ingestion_suite.py --latency 0.05 --dims 4096 --output ingestion.json
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+DATA_ROOT = PROJECT_ROOT.parent.parent / "data"
+
+from benchmarks.embedding_memory import peak_rss_mb  # noqa: E402
+
+WORDS = (
+    "account agent answer api billing cache chunk client cluster config customer database deploy document "
+    "embedding error export feature gateway index invoice key latency limit model network notion payment "
+    "permission pipeline plan query quota region replica request response retry schema search server "
+    "session slack storage support team tenant ticket token upload user vector webhook workflow"
+).split()
+
+
+class FakeEmbeddingsServer:
+    """OpenAI-compatible /embeddings endpoint returning random unit vectors"""
+
+    def __init__(self, dims: int, latency: float, jitter: float, error_rate: float, seed: int = 0):
+        self.stats = {"requests": 0, "texts": 0, "rejected": 0}
+        stats, lock = self.stats, threading.Lock()
+        rng = random.Random(seed)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+                with lock:
+                    stats["requests"] += 1
+                    reject = rng.random() < error_rate
+                    stats["rejected"] += reject
+                    if not reject:
+                        stats["texts"] += len(body["input"])
+                if reject:
+                    return self._send(429, {"error": "rate limited"}, {"Retry-After": "0"})
+                vectors = np.random.default_rng(len(body["input"])).standard_normal((len(body["input"]), dims), dtype=np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                if body.get("encoding_format") == "base64":
+                    data = [{"index": i, "embedding": base64.b64encode(v.tobytes()).decode("ascii")} for i, v in enumerate(vectors)]
+                else:
+                    data = [{"index": i, "embedding": v.tolist()} for i, v in enumerate(vectors)]
+                self._send(200, {"object": "list", "data": data, "model": body.get("model")})
+
+            def _send(self, status, payload, headers=None):
+                raw = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentiles(samples):
+    if not samples:
+        return {"n": 0}
+    ms = np.asarray(samples) * 1000
+    return {
+        "n": len(samples),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p90_ms": round(float(np.percentile(ms, 90)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def build_corpus(generated: int, generated_kb: int, seed: int = 0):
+    rng = random.Random(seed)
+    uploads = []
+    for path in sorted(DATA_ROOT.glob("10k/*.pdf")) + sorted(DATA_ROOT.glob("whitepapers/*.pdf")):
+        uploads.append({"filename": path.name, "content": path.read_bytes()})
+    for i in range(generated):
+        paragraphs, size = [], 0
+        while size < generated_kb * 1024:
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24))).capitalize() + "."
+                for _ in range(rng.randint(3, 8))
+            ]
+            paragraphs.append(" ".join(sentences))
+            size += len(paragraphs[-1]) + 2
+        uploads.append({"filename": f"generated_{i:04d}.txt", "content": "\n\n".join(paragraphs).encode()})
+    return uploads
+
+
+async def run(args, base_url: str, store_dir: str):
+    import httpx
+    from config import Config
+    from agents.document_agent import DocumentAgent
+    from agents.embedding_agent import EmbeddingAgent
+    from services.vector_backends import create_vector_service
+
+    Config.EMBEDDING_CACHE_ENABLED = False
+    Config.LOCAL_VECTOR_STORE_DIR = store_dir
+    request_latencies, store_latencies, file_latencies = [], [], []
+
+    class TimedTransport(httpx.AsyncHTTPTransport):
+        async def handle_async_request(self, request):
+            start = time.perf_counter()
+            response = await super().handle_async_request(request)
+            await response.aread()
+            request_latencies.append(time.perf_counter() - start)
+            return response
+
+    limits = httpx.Limits(max_connections=Config.HTTP_MAX_CONNECTIONS, max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS)
+    http_client = httpx.AsyncClient(transport=TimedTransport(limits=limits))
+    embedding_agent = EmbeddingAgent(http_client=http_client)
+    embedding_agent.base_url = base_url
+    agent = DocumentAgent(embedding_agent=embedding_agent)
+    vector_service = create_vector_service(args.vector_backend)
+    await vector_service.connect()
+
+    parse_file = agent.parse_file
+
+    async def timed_parse(path, batch_id=None):
+        start = time.perf_counter()
+        try:
+            return await parse_file(path, batch_id)
+        finally:
+            file_latencies.append(time.perf_counter() - start)
+
+    async def timed_store(documents, embeddings, ids):
+        start = time.perf_counter()
+        try:
+            return await vector_service.store_documents(documents, embeddings, ids)
+        finally:
+            store_latencies.append(time.perf_counter() - start)
+
+    agent.parse_file = timed_parse
+    uploads = build_corpus(args.generated, args.generated_kb)
+    corpus = {
+        "files": len(uploads),
+        "pdf_files": sum(u["filename"].endswith(".pdf") for u in uploads),
+        "generated_files": args.generated,
+        "bytes": sum(len(u["content"]) for u in uploads),
+    }
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await agent.process_documents(uploads, args.chunk_size, args.chunk_overlap, store=timed_store)
+        wall = time.perf_counter() - start
+    finally:
+        await vector_service.aclose()
+        await http_client.aclose()
+
+    stages = result["pipeline"]["stages"]
+    units = {"parse": "files", "chunk": "files", "dedup": "chunks", "embed": "embeddings", "store": "inserts"}
+    storage = result.get("storage") or {}
+    return {
+        "corpus": corpus,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "throughput": {
+            "files_per_s": round(result["files_processed"] / wall, 3),
+            "chunks_per_s": round(result["total_chunks"] / wall, 1),
+            "embeddings_per_s": round(result["chunks_embedded"] / wall, 1),
+            "inserts_per_s": round(storage.get("stored", 0) / wall, 1),
+        },
+        "stages": {
+            stage: {
+                **info,
+                "unit": units[stage],
+                "per_busy_s": round(info["items"] / info["busy_s"], 1) if info["busy_s"] else None,
+            }
+            for stage, info in stages.items()
+        },
+        "overlap": result["pipeline"]["overlap"],
+        "latency": {
+            "file_parse": percentiles(file_latencies),
+            "embedding_request": percentiles(request_latencies),
+            "store_call": percentiles(store_latencies),
+        },
+        "totals": {
+            "files_processed": result["files_processed"],
+            "chunks": result["total_chunks"],
+            "embedded": result["chunks_embedded"],
+            "stored": storage.get("stored", 0),
+            "failed": storage.get("failed", 0),
+            "file_errors": result.get("file_errors", []),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generated", type=int, default=20, help="Synthetic text files added to the PDFs")
+    parser.add_argument("--generated-kb", type=int, default=64)
+    parser.add_argument("--dims", type=int, default=4096)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake /embeddings latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--vector-backend", choices=["local", "weaviate"], default="local")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    from config import Config
+
+    with tempfile.TemporaryDirectory() as store_dir, \
+            FakeEmbeddingsServer(args.dims, args.latency, args.jitter, args.error_rate) as server:
+        report = asyncio.run(run(args, server.base_url, store_dir))
+        report["embedding_server"] = dict(server.stats)
+
+    report["config"] = {
+        "dims": args.dims,
+        "latency_s": args.latency,
+        "jitter_s": args.jitter,
+        "error_rate": args.error_rate,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "vector_backend": args.vector_backend,
+        "parse_workers": Config.PARSE_WORKERS,
+        "ingest_queue_size": Config.INGEST_QUEUE_SIZE,
+        "embedding_max_concurrency": Config.EMBEDDING_MAX_CONCURRENCY,
+        "embedding_batch_size": Config.EMBEDDING_BATCH_SIZE,
+        "cpu_count": os.cpu_count(),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Time to first token vs full completion for LLMAgent, streamed and not.
+
+Runs LLMAgent.stream_response against a local OpenAI-compatible
+/chat/completions server that waits --prefill seconds, then produces
+--tokens content tokens at --token-delay each (GLM-4.5-like pacing), as
+one response or as server-sent events. With --tool-turn the first
+completion requests a tool call (an unknown tool, so nothing leaves the
+machine) before the answer, like a web_search turn.
+
+Reports when the first token and the final answer were available to the
+caller, and how many Slack chat.update calls the coalescing in slack_bot.py
+would make per answer at SLACK_STREAM_UPDATE_INTERVAL.
+
+    uv run python benchmarks/llm_streaming.py --tokens 400 --token-delay 0.02 --prefill 0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+class FakeChatServer:
+    """OpenAI-compatible /chat/completions endpoint with configurable prefill latency and token pacing"""
+
+    def __init__(self, tokens: int, token_delay: float, prefill: float, tool_turn: bool = False,
+                 tool_names: tuple = ("lookup_status",)):
+        self.stats = {"requests": 0, "streamed": 0}
+        stats, lock = self.stats, threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with lock:
+                    stats["requests"] += 1
+                    stats["streamed"] += bool(body.get("stream"))
+                wants_tool = tool_turn and not any(m.get("role") == "tool" for m in body["messages"])
+                time.sleep(prefill)
+                if body.get("stream"):
+                    return self._stream(body, wants_tool)
+                if not wants_tool:
+                    time.sleep(tokens * token_delay)
+                message = {"role": "assistant", "content": None if wants_tool else "word " * tokens}
+                if wants_tool:
+                    message["tool_calls"] = self._tool_calls()
+                self._send_json({
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                    "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if wants_tool else "stop"}],
+                })
+
+            def _tool_calls(self):
+                return [
+                    {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": "{}"}}
+                    for i, name in enumerate(tool_names)
+                ]
+
+            def _stream(self, body, wants_tool):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                def event(delta, finish=None):
+                    chunk = {
+                        "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": body["model"], "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+
+                if wants_tool:
+                    calls = self._tool_calls()
+                    for i, call in enumerate(calls):
+                        event({"role": "assistant", "tool_calls": [{"index": i, **call, "function": {"name": call["function"]["name"], "arguments": ""}}]})
+                        event({"tool_calls": [{"index": i, "function": {"arguments": "{}"}}]}, "tool_calls" if i == len(calls) - 1 else None)
+                else:
+                    for _ in range(tokens):
+                        time.sleep(token_delay)
+                        event({"content": "word "})
+                    event({}, "stop")
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _send_json(self, payload):
+                raw = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+async def answer(agent, stream: bool, interval: float):
+    start = time.perf_counter()
+    first_visible, updates, next_update = None, 0, 0.0
+    response = {}
+    async for event in agent.stream_response("How do I rotate my API key?", stream=stream):
+        now = time.perf_counter() - start
+        if event["event"] == "token":
+            if first_visible is None:
+                first_visible = now
+            # Same coalescing as slack_bot.StreamingMessage
+            if now >= next_update:
+                updates += 1
+                next_update = now + interval
+        elif event["event"] == "final":
+            response = event["response"]
+    done = time.perf_counter() - start
+    return {
+        "mode": "stream" if stream else "blocking",
+        "first_visible_s": round(first_visible if first_visible is not None else done, 3),
+        "answer_s": round(done, 3),
+        "time_to_first_token_s": round(response["time_to_first_token"], 3),
+        "slack_updates": updates + 1,  # + the final chat_update with sources
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds per generated token")
+    parser.add_argument("--prefill", type=float, default=0.5, help="Seconds before the first token")
+    parser.add_argument("--tool-turn", action="store_true", help="First completion is a tool call")
+    parser.add_argument("--interval", type=float, help="Slack update interval (SLACK_STREAM_UPDATE_INTERVAL)")
+    args = parser.parse_args()
+
+    from agents.llm_agent import LLMAgent
+    from config import Config
+
+    interval = Config.SLACK_STREAM_UPDATE_INTERVAL if args.interval is None else args.interval
+    results = []
+    with FakeChatServer(args.tokens, args.token_delay, args.prefill, args.tool_turn) as server:
+        Config.NEBIUS_BASE_URL = server.base_url
+        for stream in (False, True):
+            with contextlib.redirect_stdout(io.StringIO()):
+                agent = LLMAgent()
+                result = asyncio.run(answer(agent, stream, interval))
+            results.append(result)
+            print(f"{result['mode']:<9} first visible {result['first_visible_s']:>6}s  answer {result['answer_s']:>6}s  "
+                  f"TTFT {result['time_to_first_token_s']:>6}s  slack updates {result['slack_updates']}")
+    print(json.dumps({"tokens": args.tokens, "token_delay": args.token_delay, "prefill": args.prefill,
+                      "tool_turn": args.tool_turn, "slack_interval": interval, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Turn latency when one assistant message requests several tools.
+
+Runs LLMAgent.generate_response against the local fake /chat/completions
+server from benchmarks/llm_streaming.py, whose first completion asks for
+all tools given by --tools at once (like web_search + notion_append_entry).
+The tools are stand-ins registered in AVAILABLE_TOOLS that sleep for their
+latency, so nothing leaves the machine. Compares TOOL_CALLS_PARALLEL off
+(one after another) and on, and with --hang also one tool that never
+returns, to show TOOL_CALL_TIMEOUT bounding the turn.
+
+    uv run python benchmarks/parallel_tools.py --tools web_search=0.8 notion_append_entry=0.5 cal_create_booking=0.3
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.llm_streaming import FakeChatServer  # noqa: E402
+
+
+def fake_tool(name: str, latency: float):
+    from langchain_core.tools import StructuredTool
+
+    async def run() -> dict:
+        await asyncio.sleep(latency)
+        return {"tool": name, "status": "ok"}
+
+    return StructuredTool.from_function(coroutine=run, name=name, description=f"Fake {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", nargs="+", default=["web_search=0.8", "notion_append_entry=0.5", "cal_create_booking=0.3"],
+                        help="name=seconds for each tool requested in the turn")
+    parser.add_argument("--prefill", type=float, default=0.2, help="Seconds per completion before its answer")
+    parser.add_argument("--hang", action="store_true", help="Add a tool that never returns")
+    parser.add_argument("--timeout", type=float, default=2.0, help="TOOL_CALL_TIMEOUT for the run")
+    args = parser.parse_args()
+
+    from agents.llm_agent import LLMAgent
+    from config import Config
+    from tools import support_tools
+
+    latencies = {name: float(seconds) for name, seconds in (item.split("=") for item in args.tools)}
+    if args.hang:
+        latencies["hung_tool"] = 3600.0
+    for name, latency in latencies.items():
+        support_tools.AVAILABLE_TOOLS[name] = fake_tool(name, latency)
+
+    Config.TOOL_CALL_TIMEOUT = args.timeout
+    results = []
+    with FakeChatServer(10, 0.0, args.prefill, tool_turn=True, tool_names=tuple(latencies)) as server:
+        Config.NEBIUS_BASE_URL = server.base_url
+        for parallel in (False, True):
+            Config.TOOL_CALLS_PARALLEL = parallel
+            with contextlib.redirect_stdout(io.StringIO()):
+                agent = LLMAgent()
+                response = asyncio.run(agent.generate_response("Search the docs, file a ticket and book a call"))
+            timings = {t["name"]: t["seconds"] for t in response["tool_timings"]}
+            result = {
+                "mode": "parallel" if parallel else "serial",
+                "turn_s": round(response["generation_time"], 3),
+                "tools_s": round(sum(timings.values()), 3),
+                "slowest_tool": max(timings, key=timings.get),
+                "failed": [t["name"] for t in response["tool_timings"] if not t["ok"]],
+                "tool_timings": timings,
+            }
+            results.append(result)
+            print(f"{result['mode']:<9} turn {result['turn_s']:>6}s  tool time {result['tools_s']:>6}s  "
+                  f"slowest {result['slowest_tool']}  failed {result['failed']}")
+    print(json.dumps({"tools": latencies, "prefill": args.prefill, "tool_call_timeout": args.timeout,
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Wall-clock scaling of document parsing with PARSE_WORKERS, plus event-loop lag.
+
+Parses every PDF in data/10k and data/whitepapers through
+DocumentAgent.parse_file with 0 (a thread in this process), 1, 2, 4, ...
+worker processes, up to the machine's core count. While parsing, a ticker
+coroutine measures how late the event loop wakes up. That lag is what
+concurrent Slack/Streamlit requests feel during a large upload. Each setting
+runs in a fresh subprocess.
+
+    uv run python benchmarks/parse_scaling.py
+    uv run python benchmarks/parse_scaling.py --workers 0 1 2 4 8
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+DATA_ROOT = PROJECT_ROOT.parent.parent / "data"
+
+
+def default_workers():
+    cores = os.cpu_count() or 1
+    counts, n = [0, 1], 2
+    while n <= cores:
+        counts.append(n)
+        n *= 2
+    if cores not in counts:
+        counts.append(cores)
+    return counts
+
+
+async def parse_all(paths, workers: int):
+    from agents.document_agent import DocumentAgent
+
+    agent = DocumentAgent.__new__(DocumentAgent)  # parsing only
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker(interval: float = 0.01):
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    tick = asyncio.create_task(ticker())
+    queue = list(paths)
+
+    async def worker():
+        while queue:
+            await agent.parse_file(str(queue.pop()))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*[worker() for _ in range(max(1, workers))])
+    wall = time.perf_counter() - start
+    done.set()
+    await tick
+    lags.sort()
+    return {
+        "wall_s": round(wall, 2),
+        "loop_lag_p99_ms": round(lags[int(len(lags) * 0.99) - 1] * 1000, 1) if lags else 0.0,
+        "loop_lag_max_ms": round(lags[-1] * 1000, 1) if lags else 0.0,
+    }
+
+
+def run_worker(workers: int):
+    from agents.parsing import get_parse_pool, shutdown_parse_pool
+
+    paths = sorted(DATA_ROOT.glob("10k/*.pdf")) + sorted(DATA_ROOT.glob("whitepapers/*.pdf"))
+    pool = get_parse_pool()
+    if pool is not None:
+        # Start the worker processes before timing
+        list(pool.map(abs, range(workers)))
+    result = asyncio.run(parse_all(paths, workers))
+    shutdown_parse_pool()
+    print(json.dumps({"workers": workers, "files": len(paths), **result}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        run_worker(args.run)
+        return
+
+    results = []
+    for workers in args.workers:
+        out = subprocess.run(
+            [sys.executable, __file__, "--run", str(workers)],
+            capture_output=True, text=True, check=True, cwd=PROJECT_ROOT,
+            env={**os.environ, "PARSE_WORKERS": str(workers)},
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    baseline = next((r["wall_s"] for r in results if r["workers"] == 1), results[0]["wall_s"])
+    print(f"cores={os.cpu_count()}")
+    print(f"{'workers':>8}{'wall s':>8}{'speedup':>9}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for r in results:
+        label = "thread" if r["workers"] == 0 else str(r["workers"])
+        print(f"{label:>8}{r['wall_s']:>8}{baseline / r['wall_s']:>9.2f}{r['loop_lag_p99_ms']:>12}{r['loop_lag_max_ms']:>12}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
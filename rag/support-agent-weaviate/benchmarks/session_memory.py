@@ -0,0 +1,90 @@
+"""
+Prompt size per request with shared vs per-conversation, token-budgeted memory.
+
+Plays --conversations interleaved support conversations of --turns turns
+each through LLMAgent.generate_response against the local fake
+/chat/completions server from benchmarks/llm_streaming.py (answers of
+--answer-tokens words; summaries come from the same server). Two memory
+layouts:
+
+  shared    – legacy behaviour: every conversation in one unbounded history
+              (one conversation id, no budget), resent with each request
+  sessions  – one history per conversation id under SESSION_TOKEN_BUDGET,
+              older turns folded into a rolling summary
+
+Reports prompt tokens of the first and last request and the max over the
+run, plus the summaries written.
+
+    uv run python benchmarks/session_memory.py --conversations 5 --turns 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.llm_streaming import FakeChatServer  # noqa: E402
+
+TOPICS = ["API key rotation", "GPU quota", "billing export", "SSO setup", "object storage latency", "Kubernetes upgrade"]
+
+
+async def play(agent, conversations: int, turns: int, shared: bool):
+    rng = random.Random(0)
+    prompt_tokens = []
+    for turn in range(turns):
+        for c in range(conversations):
+            topic = TOPICS[c % len(TOPICS)]
+            question = f"Follow-up {turn} on {topic}: " + " ".join(rng.choice(["why", "does", "the", "limit", "apply", "to", "my", "project", "region", "again"]) for _ in range(25))
+            response = await agent.generate_response(question, conversation_id="shared" if shared else f"conversation-{c}")
+            prompt_tokens.append(response["prompt_tokens"])
+    return prompt_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=20, help="Turns per conversation")
+    parser.add_argument("--answer-tokens", type=int, default=150)
+    parser.add_argument("--budget", type=int, help="SESSION_TOKEN_BUDGET (default from config)")
+    args = parser.parse_args()
+
+    from agents.llm_agent import LLMAgent
+    from config import Config
+
+    if args.budget is not None:
+        Config.SESSION_TOKEN_BUDGET = args.budget
+    results = []
+    with FakeChatServer(args.answer_tokens, 0.0, 0.0) as server:
+        Config.NEBIUS_BASE_URL = server.base_url
+        for layout in ("shared", "sessions"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                agent = LLMAgent()
+                if layout == "shared":
+                    agent.sessions.token_budget = 10 ** 9
+                prompt_tokens = asyncio.run(play(agent, args.conversations, args.turns, layout == "shared"))
+            stats = agent.sessions.get_stats()
+            result = {
+                "layout": layout,
+                "requests": len(prompt_tokens),
+                "first_prompt_tokens": prompt_tokens[0],
+                "last_prompt_tokens": prompt_tokens[-1],
+                "max_prompt_tokens": max(prompt_tokens),
+                "mean_prompt_tokens": round(sum(prompt_tokens) / len(prompt_tokens)),
+                "history_tokens_held": stats["tokens"],
+                "summaries_written": stats["compactions"],
+            }
+            results.append(result)
+            print(f"{layout:<9} prompt tokens first {result['first_prompt_tokens']:>6}  last {result['last_prompt_tokens']:>6}  "
+                  f"max {result['max_prompt_tokens']:>6}  mean {result['mean_prompt_tokens']:>6}  summaries {result['summaries_written']}")
+    print(json.dumps({"conversations": args.conversations, "turns": args.turns, "answer_tokens": args.answer_tokens,
+                      "token_budget": Config.SESSION_TOKEN_BUDGET, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
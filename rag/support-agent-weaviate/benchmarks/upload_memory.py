@@ -0,0 +1,118 @@
+"""
+Peak RSS of handing a large upload to ingestion: bytes copies vs spooled file.
+
+Builds a PDF of --size-mb (the text of data/whitepapers/attention.pdf plus an
+incompressible embedded file, like a scanned attachment) and reads it as a
+stream, the way an upload body arrives, in two modes (each in a fresh
+subprocess):
+
+  bytes    – file.read() into {"filename", "content"}, hash the bytes,
+             DocumentAgent.save_uploaded_files writes a temp copy, parse it
+  spooled  – services.uploads.spool_upload streams the upload to disk once
+             (hashing on the way) and only {"filename", "path"} travels on;
+             DocumentAgent uses the file in place, parse it
+
+Both modes parse with agents.parsing.parse_file (pypdf over mmap) in-process
+and report peak RSS above the post-import baseline.
+
+    uv run python benchmarks/upload_memory.py --size-mb 200
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+SOURCE_PDF = PROJECT_ROOT.parent.parent / "data" / "whitepapers" / "attention.pdf"
+
+from benchmarks.embedding_memory import current_rss_mb, peak_rss_mb  # noqa: E402
+
+
+def build_pdf(path: Path, size_mb: int):
+    import pypdf
+
+    writer = pypdf.PdfWriter(clone_from=str(SOURCE_PDF))
+    padding = max(0, size_mb * 1024 * 1024 - SOURCE_PDF.stat().st_size)
+    writer.add_attachment("scan.bin", os.urandom(padding))
+    writer.write(str(path))
+
+
+def worker(mode: str, pdf: Path):
+    from agents.document_agent import DocumentAgent
+    from agents.parsing import parse_file
+    from services.uploads import discard_uploads, spool_upload, upload_sha256
+
+    upload = open(pdf, "rb")
+    gc.collect()
+    baseline = current_rss_mb()
+    agent = DocumentAgent.__new__(DocumentAgent)  # upload handling/parsing only
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as temp_dir, contextlib.redirect_stdout(io.StringIO()):
+        if mode == "bytes":
+            state = {"uploaded_files": [{"filename": pdf.name, "content": upload.read()}]}
+        else:
+            state = {"uploaded_files": [spool_upload(upload, pdf.name)]}
+        file_data = state["uploaded_files"][0]
+        upload_sha256(file_data)
+        path = agent.save_uploaded_files([file_data], temp_dir)[0]
+        pages = len(parse_file(path))
+        discard_uploads(state["uploaded_files"])
+    upload.close()
+
+    print(json.dumps({
+        "mode": mode,
+        "size_mb": round(pdf.stat().st_size / 1024 / 1024),
+        "pages": pages,
+        "wall_s": round(time.perf_counter() - start, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_over_baseline_mb": round(peak_rss_mb() - baseline, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--mode", choices=["bytes", "spooled"], help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--build", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build:
+        build_pdf(args.pdf, args.size_mb)
+        return
+    if args.mode:
+        worker(args.mode, args.pdf)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = Path(tmp) / "large_upload.pdf"
+        # Built in its own process: children inherit the parent's peak RSS across fork/exec
+        subprocess.run(
+            [sys.executable, __file__, "--build", "--pdf", str(pdf), "--size-mb", str(args.size_mb)],
+            check=True, cwd=PROJECT_ROOT,
+        )
+        for mode in ("bytes", "spooled"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--pdf", str(pdf)],
+                capture_output=True, text=True, check=True, cwd=PROJECT_ROOT,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'mode':<9}{'size MB':>8}{'pages':>7}{'wall s':>8}{'peak MB':>9}{'+baseline':>11}")
+    for r in results:
+        print(f"{r['mode']:<9}{r['size_mb']:>8}{r['pages']:>7}{r['wall_s']:>8}{r['peak_rss_mb']:>9}{r['peak_over_baseline_mb']:>11}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
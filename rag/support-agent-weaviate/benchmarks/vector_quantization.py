@@ -0,0 +1,161 @@
+"""
+Recall@k, search latency and bytes per vector for compressed vector storage.
+
+Loads the same vectors into a LocalVectorStore once per storage setting
+(VECTOR_DIMS truncation x VECTOR_PRECISION float32/int8/binary x
+VECTOR_RESCORE_FACTOR) and runs the same queries through
+similarity_search. Recall@k is measured against exact full-precision
+float32 search; bytes/vector is what the index holds per chunk (the
+full-precision copy used for rescoring stays on disk).
+
+Two corpora:
+
+  data       – chunks of data/10k + data/whitepapers, embedded with the
+               hashed-trigram stand-in (or --embeddings nebius), queried with
+               the opening words of random chunks
+  synthetic  – --rows clustered vectors whose variance decays over the
+               dimensions, like a Matryoshka-trained model, queried with
+               noisy copies of stored vectors
+
+The hashed-trigram stand-in (mean-centred) is not Matryoshka-trained, so
+truncation recall on the data corpus is a lower bound; use --embeddings
+nebius for Qwen3-Embedding numbers.
+
+    uv run python benchmarks/vector_quantization.py --dims 4096 --rows 10000 --k 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+DATA_ROOT = PROJECT_ROOT.parent.parent / "data"
+
+from benchmarks.hybrid_fallback import build_queries, hash_embed, load_chunks  # noqa: E402
+
+
+def data_corpus(dims: int, queries: int, embeddings: str):
+    chunks = []
+    for directory in ("10k", "whitepapers"):
+        chunks.extend(load_chunks(DATA_ROOT / directory))
+    texts = [q for q, _ in build_queries(chunks, queries)["natural"]]
+    if embeddings == "hash":
+        # Trigram counts are all non-negative; centre them like a real embedding space so sign bits mean something
+        vectors, queries = hash_embed([c["content"] for c in chunks], dims), hash_embed(texts, dims)
+        mean = vectors.mean(axis=0)
+        return vectors - mean, queries - mean
+    from agents.embedding_agent import EmbeddingAgent
+
+    agent = EmbeddingAgent()
+    return (
+        asyncio.run(agent.generate_embeddings_batch([c["content"] for c in chunks])),
+        asyncio.run(agent.generate_embeddings_batch(texts)),
+    )
+
+
+def synthetic_corpus(rows: int, dims: int, queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # Leading dimensions carry most of the variance, as in Matryoshka-trained embeddings
+    spectrum = (1.0 + np.arange(dims, dtype=np.float32)) ** -0.5
+    centers = rng.standard_normal((max(1, rows // 50), dims), dtype=np.float32) * spectrum
+    vectors = centers[rng.integers(0, len(centers), rows)]
+    vectors += 0.8 * rng.standard_normal((rows, dims), dtype=np.float32) * spectrum
+    picks = rng.choice(rows, size=queries, replace=False)
+    query_vectors = vectors[picks] + 0.5 * rng.standard_normal((queries, dims), dtype=np.float32) * spectrum
+    return vectors, query_vectors
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    from services.quantization import normalize
+
+    scores = normalize(queries) @ normalize(vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def measure(vectors, queries, truth, k: int, precision: str, dims: int, factor: int):
+    from config import Config
+    from services.local_vector_store import LocalVectorStore
+
+    Config.VECTOR_PRECISION, Config.VECTOR_DIMS, Config.VECTOR_RESCORE_FACTOR = precision, dims, factor
+    documents = [{"content": "", "source": "bench", "chunk_index": i} for i in range(len(vectors))]
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        store = LocalVectorStore(directory=directory, index="exact")
+        store.store_documents_sync(documents, vectors)
+        asyncio.run(store.similarity_search(queries[0], k))  # warm the page cache
+
+        async def search_all():
+            latencies, hits = [], 0
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                results = await store.similarity_search(query, k)
+                latencies.append(time.perf_counter() - start)
+                hits += len({r["chunk_index"] for r in results} & set(expected.tolist()))
+            return latencies, hits
+
+        latencies, hits = asyncio.run(search_all())
+        stats = store.get_stats()
+        store.close()
+    ms = np.asarray(latencies) * 1000
+    return {
+        "precision": precision,
+        "dims": stats["index_dim"],
+        "rescore_factor": factor if store.compressed else 1,
+        "bytes_per_vector": stats["vector_bytes"] // len(vectors),
+        "compression": round(len(vectors) * vectors.shape[1] * 4 / stats["vector_bytes"], 1),
+        f"recall@{k}": round(hits / (len(queries) * k), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def settings(full_dim: int):
+    truncations = [0] + [d for d in (full_dim // 4, full_dim // 16) if d >= 32]
+    for dims in truncations:
+        for precision in ("float32", "int8", "binary"):
+            compressed = precision != "float32" or dims
+            for factor in ((1, 4) if compressed else (1,)):
+                yield precision, dims, factor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=["data", "synthetic", "both"], default="both")
+    parser.add_argument("--dims", type=int, default=4096, help="Embedding dims (hash and synthetic corpora)")
+    parser.add_argument("--rows", type=int, default=10000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--embeddings", choices=["hash", "nebius"], default="hash")
+    args = parser.parse_args()
+
+    corpora = {}
+    if args.corpus in ("data", "both"):
+        corpora["data"] = data_corpus(args.dims, args.queries, args.embeddings)
+    if args.corpus in ("synthetic", "both"):
+        corpora["synthetic"] = synthetic_corpus(args.rows, args.dims, args.queries)
+
+    report = {}
+    for name, (vectors, queries) in corpora.items():
+        vectors = np.asarray(vectors, dtype=np.float32)
+        truth = exact_top_k(vectors, queries, args.k)
+        print(f"\n{name}: {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+        print(f"{'precision':<10}{'dims':>6}{'rescore':>9}{'bytes/vec':>11}{'ratio':>7}{'recall':>8}{'p50 ms':>8}{'p99 ms':>8}")
+        rows = []
+        for precision, dims, factor in settings(vectors.shape[1]):
+            r = measure(vectors, queries, truth, args.k, precision, dims, factor)
+            rows.append(r)
+            print(f"{r['precision']:<10}{r['dims']:>6}{'x' + str(r['rescore_factor']):>9}{r['bytes_per_vector']:>11}"
+                  f"{r['compression']:>7}{r[f'recall@{args.k}']:>8}{r['p50_ms']:>8}{r['p99_ms']:>8}")
+        report[name] = {"vectors": len(vectors), "dims": int(vectors.shape[1]), "queries": len(queries), "results": rows}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,11 @@ class Config:
     LLM_MODEL = "zai-org/GLM-4.5"
     EMBEDDING_MODEL = "Qwen/Qwen3-Embedding-8B"
     
+    # Stream answers token by token to Slack and Streamlit (the workflow's stream=True mode)
+    LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+    # Minimum seconds between chat.update calls on a streamed Slack reply (chat.update is rate limited per workspace)
+    SLACK_STREAM_UPDATE_INTERVAL = float(os.getenv("SLACK_STREAM_UPDATE_INTERVAL", 1.5))
+    
     # External APIs
     EXA_API_KEY = os.getenv("EXA_API_KEY")
     KEYWORDS_AI_API_KEY = os.getenv("KEYWORDS_AI_API_KEY", "")
@@ -28,23 +33,132 @@ class Config:
     WEAVIATE_API_KEY = os.getenv("WEAVIATE_API_KEY")
     WEAVIATE_CLASS_NAME = "Documents"
     
+    # Use Weaviate's native async client for searches/inserts (falls back to the sync client in worker threads)
+    WEAVIATE_USE_ASYNC = os.getenv("WEAVIATE_USE_ASYNC", "true").lower() == "true"
+    # Weaviate ingestion: batch size, concurrent insert batches and retries for failed objects
+    WEAVIATE_INSERT_BATCH_SIZE = int(os.getenv("WEAVIATE_INSERT_BATCH_SIZE", 200))
+    WEAVIATE_INSERT_CONCURRENCY = int(os.getenv("WEAVIATE_INSERT_CONCURRENCY", 4))
+    WEAVIATE_INSERT_MAX_RETRIES = int(os.getenv("WEAVIATE_INSERT_MAX_RETRIES", 3))
+    
+    # Vector backend: "weaviate", "local" (in-process, offline) or "replica" (local read replica in front of Weaviate)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "weaviate")
+    LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "vector_store"))
+    # Local index: "exact" (NumPy brute force), "hnsw" (needs hnswlib) or "ivf"
+    LOCAL_VECTOR_INDEX = os.getenv("LOCAL_VECTOR_INDEX", "exact")
+    LOCAL_HNSW_EF = int(os.getenv("LOCAL_HNSW_EF", 64))
+    LOCAL_IVF_NPROBE = int(os.getenv("LOCAL_IVF_NPROBE", 8))
+    LOCAL_IVF_MIN_ROWS = int(os.getenv("LOCAL_IVF_MIN_ROWS", 5000))
+    
     # Processing Configuration
     DEFAULT_CHUNK_SIZE = 1000
     DEFAULT_CHUNK_OVERLAP = 200
+    # "sentence_splitter" (LlamaIndex nodes) or opt-in "offset" (token-sized chunks as offsets into the parsed text;
+    # different boundaries, so switching re-chunks and re-embeds existing documents)
+    CHUNKER = os.getenv("CHUNKER", "sentence_splitter")
+    # Tokenizer for chunk sizes: cl100k_base (bundled, offline), model / auto (embedding model's, downloaded from the
+    # Hugging Face hub; auto falls back to cl100k_base), estimate
+    CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "cl100k_base")
+    # Worker processes for PDF/DOCX parsing (0 = parse in a thread of the main process)
+    PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+    # "forkserver" (or "spawn") starts workers from a clean process; "fork" copies the threaded parent and can deadlock
+    PARSE_START_METHOD = os.getenv("PARSE_START_METHOD", "forkserver")
+    # Where uploads are spooled to disk before parsing (empty = system temp dir)
+    UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "")
+    # Files embedded concurrently by the ingestion pipeline (each uses up to EMBEDDING_MAX_CONCURRENCY requests)
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 1))
+    # Files in flight between ingestion stages (parse → chunk → embed → store); bounds peak memory
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 2))
+    # Opt-in incremental ingestion: skip unchanged files/chunks, upsert by deterministic id and delete stale chunks
+    # (chunks stored before it, without a source_hash, are kept and reported rather than deleted)
+    INCREMENTAL_INGESTION = os.getenv("INCREMENTAL_INGESTION", "false").lower() == "true"
     DEFAULT_SEARCH_RESULTS = 5
     # New granular defaults (fallback to DEFAULT_SEARCH_RESULTS if not overridden)
     DEFAULT_WEB_RESULTS = int(os.getenv("DEFAULT_WEB_RESULTS", DEFAULT_SEARCH_RESULTS))
     DEFAULT_DOCS_RETRIEVAL = int(os.getenv("DEFAULT_DOCS_RETRIEVAL", DEFAULT_SEARCH_RESULTS))
-    EMBEDDING_BATCH_SIZE = 10
+    # Embedding batching: batches are sized by estimated tokens, capped at EMBEDDING_BATCH_SIZE items
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 10))
+    EMBEDDING_BATCH_TOKEN_BUDGET = int(os.getenv("EMBEDDING_BATCH_TOKEN_BUDGET", 8000))
+    EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", 4))
+    # "float" (JSON lists, what every OpenAI-compatible server returns); opt-in "base64" ships packed float32 bytes
+    # (decoded straight into a NumPy matrix) on servers that support it, and breaks ingestion on those that reject it
+    EMBEDDING_ENCODING_FORMAT = os.getenv("EMBEDDING_ENCODING_FORMAT", "float")
+    EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", 5))
+    EMBEDDING_RETRY_BASE_DELAY = float(os.getenv("EMBEDDING_RETRY_BASE_DELAY", 0.5))
+    # USD per million input tokens for EMBEDDING_MODEL, used by ingest_dir.py --dry-run estimates
+    EMBEDDING_PRICE_PER_MILLION_TOKENS = float(os.getenv("EMBEDDING_PRICE_PER_MILLION_TOKENS", 0.01))
+    # Embedding cache (on-disk, keyed by embedding model + text hash)
+    CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CACHE_DIR, "embeddings.sqlite3"))
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 200000))
+    # Checkpoints of resumable bulk ingestion jobs (ingest_jobs.py)
+    INGESTION_JOBS_PATH = os.getenv("INGESTION_JOBS_PATH", os.path.join(CACHE_DIR, "ingestion_jobs.sqlite3"))
+    # Opt-in: drop exact and near-duplicate chunks (SimHash within DEDUP_MAX_HAMMING <= 3 bits, -1 = exact only) before
+    # embedding, including duplicates of already-ingested chunks of any source tracked in DEDUP_INDEX_PATH
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() == "true"
+    DEDUP_MAX_HAMMING = int(os.getenv("DEDUP_MAX_HAMMING", 3))
+    DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", os.path.join(CACHE_DIR, "chunk_signatures.sqlite3"))
+    # Vector storage: "float32", "int8" or "binary" per kept dimension (Weaviate: SQ / BQ compression)
+    VECTOR_PRECISION = os.getenv("VECTOR_PRECISION", "float32").lower()
+    # Matryoshka truncation: index only the first N embedding dimensions (0 = all)
+    VECTOR_DIMS = int(os.getenv("VECTOR_DIMS", 0))
+    # Compressed searches fetch this many candidates per result and rescore them at full precision (1 = off)
+    VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", 4))
+    # Full-precision side store for rescoring truncated Weaviate vectors
+    FULL_VECTOR_STORE_PATH = os.getenv("FULL_VECTOR_STORE_PATH", os.path.join(CACHE_DIR, "full_vectors.sqlite3"))
+    # Retrieval results cache (in-memory, cleared on ingestion); TTL <= 0 disables it.
+    # A semantic threshold > 0 also reuses results for queries whose embedding is that cosine-close to a cached one
+    RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", 300))
+    RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", 1024))
+    RETRIEVAL_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("RETRIEVAL_CACHE_SEMANTIC_THRESHOLD", 0))
+    # Shared HTTP connection pools (one per upstream, owned by RAGWorkflow)
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 10))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60.0))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 60.0))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10.0))
+    # Chat completions (LLMAgent, AsyncOpenAI on the "llm" pool): read timeout covers a whole non-streamed answer
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 300.0))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+    # Retrieved context packed into each prompt (whole sentences, most relevant chunks first), in tokens
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 4000))
+    # Share of that budget left unused: it is counted with CHUNK_TOKENIZER, which only approximates LLM_MODEL's tokenizer
+    CONTEXT_TOKEN_MARGIN = float(os.getenv("CONTEXT_TOKEN_MARGIN", 0.1))
+    # Conversation memory per Slack thread / Streamlit session: history resent with each request is kept under
+    # SESSION_TOKEN_BUDGET tokens by folding the oldest turns into a rolling summary of at most
+    # SESSION_SUMMARY_MAX_TOKENS (written by SESSION_SUMMARY_MODEL, default LLM_MODEL)
+    SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", 3000))
+    SESSION_SUMMARY_MAX_TOKENS = int(os.getenv("SESSION_SUMMARY_MAX_TOKENS", 500))
+    SESSION_SUMMARY_MODEL = os.getenv("SESSION_SUMMARY_MODEL", "")
+    # Sessions idle for SESSION_TTL seconds are dropped; beyond SESSION_MAX_SESSIONS the least recently used go first
+    SESSION_TTL = float(os.getenv("SESSION_TTL", 86400))
+    SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 1000))
+    # Tool calls requested in one assistant turn run concurrently; each gets its own timeout (seconds).
+    # Side-effecting tools (tools.support_tools.WRITE_TOOLS) run one at a time and without that timeout
+    TOOL_CALLS_PARALLEL = os.getenv("TOOL_CALLS_PARALLEL", "true").lower() == "true"
+    TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", 60.0))
+    # HTTP/2 is used when enabled and the optional `h2` package is installed
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
     # Retrieval gating
     DEFAULT_MIN_VECTOR_RELEVANCE = float(os.getenv("DEFAULT_MIN_VECTOR_RELEVANCE", 0.7))
+    # Retrieval: "vector" (near_vector, the default) or opt-in "hybrid" (BM25 + vector fused with reciprocal-rank fusion, one round trip)
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()
+    # Weight of the vector side in hybrid fusion (0 = keyword only, 1 = vector only)
+    HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", 0.5))
+    # The vector side of hybrid search only contributes hits within this cosine distance
+    HYBRID_MAX_VECTOR_DISTANCE = float(os.getenv("HYBRID_MAX_VECTOR_DISTANCE", 1.0 - DEFAULT_MIN_VECTOR_RELEVANCE))
+    # Gate on the fused hybrid score: 1.0 = ranked first by both searches; with HYBRID_ALPHA=0.5 a hit
+    # found by only one side scores ~0.4-0.5, and an empty result scores 0
+    DEFAULT_MIN_HYBRID_RELEVANCE = float(os.getenv("DEFAULT_MIN_HYBRID_RELEVANCE", 0.35))
     
     @classmethod
     def validate_config(cls) -> Dict[str, bool]:
         """Validate required environment variables"""
+        # Weaviate credentials are not needed when running fully local
+        weaviate_optional = cls.VECTOR_BACKEND.lower() == "local"
         return {
             "nebius_api_key": bool(cls.NEBIUS_API_KEY),
             "exa_api_key": bool(cls.EXA_API_KEY),
-            "weaviate_url": bool(cls.WEAVIATE_URL),
-            "weaviate_api_key": bool(cls.WEAVIATE_API_KEY)
+            "weaviate_url": bool(cls.WEAVIATE_URL) or weaviate_optional,
+            "weaviate_api_key": bool(cls.WEAVIATE_API_KEY) or weaviate_optional
         }
@@ -0,0 +1,98 @@
+import atexit
+import threading
+from config import Config
+from services.background_loop import BackgroundLoop
+from services.dedup import ChunkDeduplicator
+from services.embedding_cache import EmbeddingCache
+from services.http_clients import HTTPClients
+from services.ingestion_jobs import IngestionJobStore
+from services.retrieval_cache import RetrievalCache
+from services.vector_backends import VectorBackend, create_vector_service
+
+
+class WorkflowRuntime:
+    """Process-wide resources shared by every RAGWorkflow.
+
+    Holds the long-lived event loop, the pooled HTTP clients, the vector
+    backend (one Weaviate connection per process) and the retrieval cache
+    that fronts it, plus the SQLite-backed stores (embedding cache, chunk
+    dedup index, ingestion job checkpoints), so workflows created per
+    Streamlit session share one handle each. Everything loop-bound is
+    opened on ``self.loop`` in startup() and must only be used from it.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, vector_service: VectorBackend = None):
+        self.loop = BackgroundLoop()
+        self.http_clients = HTTPClients()
+        self.vector_service = vector_service or create_vector_service()
+        self.retrieval_cache = RetrievalCache()
+        # retrieval mode -> {"queries": n, "fallbacks": m} for the relevance gate
+        self.gate_counters = {}
+        self.embedding_cache = self._open_embedding_cache()
+        self.deduplicator = ChunkDeduplicator() if Config.DEDUP_ENABLED else None
+        self._job_store = None
+        self._job_store_lock = threading.Lock()
+        self.closed = False
+        self.loop.run(self.startup())
+
+    @staticmethod
+    def _open_embedding_cache():
+        if not Config.EMBEDDING_CACHE_ENABLED:
+            return None
+        try:
+            return EmbeddingCache()
+        except Exception as e:
+            print(f"⚠️ Embedding cache disabled: {e}")
+            return None
+
+    @property
+    def job_store(self) -> IngestionJobStore:
+        """Checkpoint store for resumable ingestion jobs (opened on first use)"""
+        with self._job_store_lock:
+            if self._job_store is None:
+                self._job_store = IngestionJobStore()
+            return self._job_store
+
+    @classmethod
+    def shared(cls) -> "WorkflowRuntime":
+        """Return the process-wide runtime, creating it on first use"""
+        with cls._shared_lock:
+            if cls._shared is None or cls._shared.closed:
+                cls._shared = cls()
+                atexit.register(cls._shared.close)
+            return cls._shared
+
+    async def startup(self):
+        await self.http_clients.startup()
+        await self.vector_service.connect()
+
+    async def shutdown(self):
+        await self.vector_service.aclose()
+        await self.http_clients.aclose()
+
+    def run(self, coro, timeout: float = None):
+        return self.loop.run(coro, timeout)
+
+    def iterate(self, iterator, timeout: float = None):
+        return self.loop.iterate(iterator, timeout)
+
+    def close(self):
+        """Close connections and stop the loop (idempotent)"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.loop.run(self.shutdown(), timeout=10)
+        except Exception as e:
+            print(f"⚠️ Runtime shutdown failed: {e}")
+        try:
+            self.vector_service.close()
+        except Exception as e:
+            print(f"⚠️ Vector backend close failed: {e}")
+        for store in (self.embedding_cache, self.deduplicator, self._job_store):
+            if store is not None:
+                store.close()
+        self.loop.stop()
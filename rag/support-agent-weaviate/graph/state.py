@@ -7,10 +7,14 @@ class WorkflowState(TypedDict):
     query: str
     uploaded_files: List[Dict[str, Any]]
     user_email: Optional[str]
+    # Conversation memory key (Slack channel + thread, Streamlit session)
+    conversation_id: Optional[str]
     
     # Processing options
     chunk_size: int
     chunk_overlap: int
+    incremental: bool
+    job_id: Optional[str]
     search_limit: int
     web_search_limit: int
     doc_retrieval_limit: int
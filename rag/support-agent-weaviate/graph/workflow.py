@@ -1,6 +1,9 @@
+import asyncio
+import os
 import uuid
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Union
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 from graph.state import WorkflowState
 from agents.search_agent import SearchAgent
@@ -8,17 +11,54 @@ from agents.embedding_agent import EmbeddingAgent
 from agents.llm_agent import LLMAgent
 from agents.document_agent import DocumentAgent
 from agents.monitoring_agent import MonitoringAgent
-from services.vector_service import VectorService
+from graph.runtime import WorkflowRuntime
+from services.ingestion_jobs import FILE_DONE_STATES, FILE_FAILED, IngestionJobStore
+from services.vector_backends import search_error
+from tools.tools_notion_and_cal import set_http_clients
+from config import Config
 
 class RAGWorkflow:
-    def __init__(self):
+    def __init__(self, runtime: WorkflowRuntime = None):
+        # Event loop, pooled HTTP clients and vector backend are shared process-wide
+        self.runtime = runtime or WorkflowRuntime.shared()
+        self.http_clients = self.runtime.http_clients
+        self.vector_service = self.runtime.vector_service
+        self.retrieval_cache = self.runtime.retrieval_cache
         self.search_agent = SearchAgent()
-        self.embedding_agent = EmbeddingAgent()
-        self.llm_agent = LLMAgent()
-        self.document_agent = DocumentAgent()
-        self.monitoring_agent = MonitoringAgent()
-        self.vector_service = VectorService()
+        self.embedding_agent = EmbeddingAgent(cache=self.runtime.embedding_cache, http_client=self.http_clients.get("nebius"))
+        self.llm_agent = LLMAgent(http_client=self.http_clients.get("llm"))
+        # SQLite-backed stores are process-wide (one handle each, closed with the runtime)
+        self.deduplicator = self.runtime.deduplicator
+        self.document_agent = DocumentAgent(embedding_agent=self.embedding_agent, deduplicator=self.deduplicator)
+        self.monitoring_agent = MonitoringAgent(http_client=self.http_clients.get("keywordsai"))
+        set_http_clients(self.http_clients)
         self.graph = self._build_graph()
+        self.ingestion_graph = self._build_ingestion_graph()
+    
+    async def startup(self):
+        """Open shared resources on the workflow's event loop"""
+        await self.runtime.startup()
+    
+    async def shutdown(self):
+        """Release shared resources (HTTP pools, Weaviate async connection)"""
+        await self.runtime.shutdown()
+    
+    def run_sync(self, coro, timeout: float = None):
+        """Run a workflow coroutine from synchronous code (Slack handlers, Streamlit)"""
+        return self.runtime.run(coro, timeout)
+    
+    def iterate_sync(self, iterator: AsyncIterator, timeout: float = None):
+        """Consume a workflow async iterator (run_workflow(stream=True)) from synchronous code"""
+        return self.runtime.iterate(iterator, timeout)
+    
+    def close(self):
+        """Shut down pooled clients and shared stores, close the vector backend and stop the background loop"""
+        self.runtime.close()
+    
+    @property
+    def job_store(self) -> IngestionJobStore:
+        """Checkpoint store for resumable ingestion jobs (process-wide, opened on first use)"""
+        return self.runtime.job_store
     
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph workflow"""
@@ -44,24 +84,60 @@ class RAGWorkflow:
         
         return graph.compile()
     
-    async def _process_documents_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Process uploaded documents"""
+    def _build_ingestion_graph(self) -> StateGraph:
+        """Build the upload-only graph: parse/chunk/embed/store, no retrieval or LLM call"""
+        graph = StateGraph(WorkflowState)
+        graph.add_node("process_documents", self._process_documents_node)
+        graph.set_entry_point("process_documents")
+        graph.add_edge("process_documents", END)
+        return graph.compile()
+    
+    async def _process_documents_node(self, state: Dict[str, Any], config: RunnableConfig = None) -> Dict[str, Any]:
+        """Process uploaded documents (config["configurable"]["progress"] receives per-file progress events)"""
         uploaded_files = state.get("uploaded_files", [])
         if not uploaded_files:
             return {"processed_docs": {}}
         
         print(f"📄 Processing {len(uploaded_files)} uploaded files...")
         try:
+            incremental = state.get("incremental")
+            if incremental is None:
+                incremental = Config.INCREMENTAL_INGESTION
+            existing_chunks = None
+            if incremental:
+                sources = [DocumentAgent.source_name(f) for f in uploaded_files]
+                existing_chunks = await self.vector_service.get_source_chunks(sources)
+            
+            if self.deduplicator is not None:
+                await self._sync_dedup_index()
+            
+            job_id = state.get("job_id")
+            # Each file is upserted as soon as it is embedded (streaming pipeline)
             result = await self.document_agent.process_documents(
                 uploaded_files,
                 state.get('chunk_size', 1000),
-                state.get('chunk_overlap', 200)
+                state.get('chunk_overlap', 200),
+                existing_chunks=existing_chunks,
+                store=self.vector_service.store_documents,
+                checkpoint=self.job_store.job(job_id) if job_id else None,
+                progress=((config or {}).get("configurable") or {}).get("progress")
             )
             
-            # Store documents if processing was successful
-            if result.get("success") and result.get("prepared_documents"):
-                docs, embeddings = zip(*result["prepared_documents"])
-                await self.vector_service.store_documents(list(docs), list(embeddings))
+            storage = result.get("storage")
+            if storage and storage.get("failed"):
+                print(f"⚠️ {storage['failed']} chunks could not be stored: {storage.get('errors')}")
+            # New chunks are stored before stale ones are dropped so the source is never missing
+            if result.get("success") and result.get("stale_ids"):
+                if result.get("storage", {}).get("failed"):
+                    print("⚠️ Keeping stale chunks because some new chunks failed to store")
+                elif self.deduplicator is not None and not await self._restore_duplicates(result["stale_ids"], result):
+                    print("⚠️ Keeping stale chunks because chunks of other sources that duplicate them could not be stored")
+                else:
+                    result["deleted"] = await self.vector_service.delete_objects(result["stale_ids"])
+                    if self.deduplicator is not None:
+                        await asyncio.to_thread(self.deduplicator.forget, result["stale_ids"])
+            if result.get("storage", {}).get("stored") or result.get("deleted"):
+                self.retrieval_cache.invalidate()
             
             return {
                 "processed_docs": result, 
@@ -75,56 +151,125 @@ class RAGWorkflow:
                 "error_message": str(e)
             }
 
+    async def _restore_duplicates(self, stale_ids: List[str], result: Dict[str, Any]) -> bool:
+        """Store the chunks of other sources that were dropped as duplicates of chunks about to be deleted.
+
+        Returns False when they could not be stored (the stale chunks must then stay).
+        """
+        dependants = await asyncio.to_thread(self.deduplicator.dependants, stale_ids)
+        if not dependants:
+            return True
+        ids = [object_id for object_id, _ in dependants]
+        documents = [document for _, document in dependants]
+        try:
+            embeddings = await self.document_agent.embedding_agent.generate_embeddings_batch([d["content"] for d in documents])
+            report = await self.vector_service.store_documents(documents, embeddings, ids=ids)
+        except Exception as e:
+            print(f"❌ Re-storing duplicate chunks failed: {e}")
+            return False
+        if report.get("failed"):
+            return False
+        await asyncio.to_thread(self.deduplicator.adopt, documents, ids)
+        result["dedup_restored"] = len(ids)
+        print(f"🧬 Stored {len(ids)} chunks of other sources that duplicated deleted chunks")
+        return True
+
+    async def _sync_dedup_index(self):
+        """Forget chunk signatures when the collection was emptied outside this workflow"""
+        if await asyncio.to_thread(self.deduplicator.index.count) == 0:
+            return
+        stats = await asyncio.to_thread(self.vector_service.get_stats)
+        if stats.get("total_documents") == 0:
+            print("🧹 Vector collection is empty; clearing chunk dedup signatures")
+            await asyncio.to_thread(self.deduplicator.clear)
+
     async def _retrieve_docs_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Retrieve relevant documents from vector database"""
         query = state.get("query", "")
         # Prefer granular limit; fall back to legacy search_limit
         search_limit = state.get("doc_retrieval_limit", state.get("search_limit", 5))
         
+        retrieval_mode = Config.RETRIEVAL_MODE
+        
         print("🔎 Retrieving relevant documents from vector database...")
-        print(f"   ↳ doc_retrieval_limit (node): {search_limit}")
+        print(f"   ↳ doc_retrieval_limit (node): {search_limit}, mode: {retrieval_mode}")
         try:
-            # Generate query embedding
-            query_embeddings = await self.embedding_agent.generate_embeddings([query])
-            if query_embeddings:
+            # Identical questions skip the embedding call and the search entirely
+            retrieved_docs = self.retrieval_cache.get(query, search_limit)
+            cache_result = "hit"
+            if retrieved_docs is None:
+                # Generate query embedding
+                query_embeddings = await self.embedding_agent.generate_embeddings([query])
+                if not len(query_embeddings):
+                    print("❌ Failed to generate query embedding")
+                    # If we cannot embed, leave docs empty and avg relevance 0.0
+                    return {"retrieved_docs": [], "avg_vector_relevance": 0.0}
                 query_embedding = query_embeddings[0]
                 
-                # Search for similar documents
-                retrieved_docs = await self.vector_service.similarity_search(
-                    query_embedding, 
-                    limit=search_limit
-                )
-                # Compute average relevance from distances if available
-                relevances = []
-                for d in retrieved_docs:
-                    dist = d.get("distance")
-                    if dist is not None:
-                        try:
-                            rel = max(0.0, 1.0 - float(dist))
-                        except Exception:
-                            rel = 0.0
-                        relevances.append(rel)
-                avg_rel = sum(relevances) / len(relevances) if relevances else 0.0
-                threshold = state.get("min_vector_relevance")
-                if threshold is None:
-                    from config import Config
-                    threshold = Config.DEFAULT_MIN_VECTOR_RELEVANCE
-                need_web = avg_rel < threshold
-                print(f"📏 Vector relevance: avg={avg_rel:.3f}, threshold={threshold:.3f} -> need_web_search={need_web}")
+                retrieved_docs = self.retrieval_cache.get_semantic(query_embedding, search_limit)
+                cache_result = "semantic_hit"
+                if retrieved_docs is None:
+                    cache_result = "miss"
+                    self.retrieval_cache.record_miss()
+                    # Search for similar documents (hybrid: keyword + vector in one request)
+                    if retrieval_mode == "hybrid":
+                        retrieved_docs = await self.vector_service.hybrid_search(
+                            query,
+                            query_embedding,
+                            limit=search_limit
+                        )
+                    else:
+                        retrieved_docs = await self.vector_service.similarity_search(
+                            query_embedding, 
+                            limit=search_limit
+                        )
+                    # An empty or failed search is not cached: the next identical question searches again
+                    if retrieved_docs and not search_error(retrieved_docs):
+                        self.retrieval_cache.put(query, search_limit, query_embedding, retrieved_docs)
+            print(f"🗃️ Retrieval cache: {cache_result}")
+            
+            # Compute average relevance from distances if available (1 - fused relevance for hybrid hits)
+            relevances = []
+            for d in retrieved_docs:
+                dist = d.get("distance")
+                if dist is not None:
+                    try:
+                        rel = max(0.0, 1.0 - float(dist))
+                    except Exception:
+                        rel = 0.0
+                    relevances.append(rel)
+            avg_rel = sum(relevances) / len(relevances) if relevances else 0.0
+            threshold = state.get("min_vector_relevance")
+            if threshold is None:
+                threshold = Config.DEFAULT_MIN_HYBRID_RELEVANCE if retrieval_mode == "hybrid" else Config.DEFAULT_MIN_VECTOR_RELEVANCE
+            need_web = avg_rel < threshold
+            print(f"📏 Vector relevance ({retrieval_mode}): avg={avg_rel:.3f}, threshold={threshold:.3f} -> need_web_search={need_web}")
+            
+            # How often the web-search fallback fires, per retrieval mode (process lifetime)
+            gate = self.runtime.gate_counters.setdefault(retrieval_mode, {"queries": 0, "fallbacks": 0})
+            gate["queries"] += 1
+            gate["fallbacks"] += int(need_web)
 
-                return {
-                    "retrieved_docs": retrieved_docs,
-                    "avg_vector_relevance": avg_rel,
-                }
-            else:
-                print("❌ Failed to generate query embedding")
-                # If we cannot embed, leave docs empty and avg relevance 0.0
-                return {"retrieved_docs": [], "avg_vector_relevance": 0.0}
-                
+            return {
+                "retrieved_docs": retrieved_docs,
+                "avg_vector_relevance": avg_rel,
+                "min_vector_relevance": threshold,
+                "stats": {
+                    **state.get("stats", {}),
+                    "retrieval_cache": {"result": cache_result, **self.retrieval_cache.get_stats()},
+                    "retrieval_mode": retrieval_mode,
+                    "web_fallback": {
+                        "triggered": need_web,
+                        **gate,
+                        "rate": gate["fallbacks"] / gate["queries"],
+                    },
+                },
+            }
+            
         except Exception as e:
             print(f"❌ Document retrieval failed: {e}")
             return {"retrieved_docs": [], "avg_vector_relevance": 0.0}
-    async def _generate_response_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def _generate_response_node(self, state: Dict[str, Any], config: RunnableConfig = None) -> Dict[str, Any]:
         """Generate final response with automatic tool access"""
         query = state.get("query", "")
         search_results = state.get("search_results", [])
@@ -133,29 +278,57 @@ class RAGWorkflow:
         min_vector_relevance = state.get("min_vector_relevance")
         web_search_limit = state.get("web_search_limit", state.get("search_limit", 2))
         user_email = state.get("user_email")  # Add user email to state
+        conversation_id = state.get("conversation_id")
+        
+        # Set by run_workflow(stream=True): receives the LLM's token/tool events as they happen
+        emit = ((config or {}).get("configurable") or {}).get("emit")
         
         print("🤖 Generating response with automatic support tools...")
         try:
-            response_data = await self.llm_agent.generate_response(
+            request = dict(
                 query=query,
                 context=search_results,
                 retrieved_docs=retrieved_docs,
                 avg_vector_relevance=avg_vector_relevance,
                 min_vector_relevance=min_vector_relevance,
                 web_search_limit=web_search_limit,
-                user_email=user_email
+                user_email=user_email,
+                conversation_id=conversation_id,
+                doc_retrieval_limit=state.get("doc_retrieval_limit", state.get("search_limit", 5)),
             )
+            if emit is None or not Config.LLM_STREAMING:
+                response_data = await self.llm_agent.generate_response(**request) or {}
+            else:
+                response_data = {}
+                async for event in self.llm_agent.stream_response(**request):
+                    if event["event"] == "final":
+                        response_data = event["response"]
+                    else:
+                        emit(event)
             
             # Extract response content  
             final_response = response_data.get("content", "No response generated")
             
-            # Calculate statistics including tool usage
+            # Calculate statistics including tool usage (keeps what earlier nodes recorded)
             stats = {
+                **state.get("stats", {}),
                 "search_results_count": response_data.get("search_results_count", 0),
                 "retrieved_docs_count": len(retrieved_docs),
                 "generation_time": response_data.get("generation_time", 0),
+                "time_to_first_token": response_data.get("time_to_first_token"),
+                "streamed": response_data.get("streamed", False),
                 "tool_calls_made": response_data.get("tool_calls_made", False),
                 "tools_used": response_data.get("tools_used", []),
+                # Wall time of each tool call ({id, name, ok, seconds}, in completion order)
+                "tool_timings": response_data.get("tool_timings", []),
+                # Prompt size of this request and the conversation history it carried
+                "prompt_tokens": response_data.get("prompt_tokens", 0),
+                "history_tokens": response_data.get("history_tokens", 0),
+                "history_turns": response_data.get("history_turns", 0),
+                "history_summarized": response_data.get("history_summarized", False),
+                "sessions": self.llm_agent.sessions.get_stats(),
+                # Context packing: achieved tokens, chunks used/truncated and duplicate sentences dropped
+                "context": response_data.get("context", {}),
                 "web_sources": response_data.get("web_sources", []),
                 "total_processing_time": 0,
                 # Expose effective limits used in this run
@@ -228,14 +401,27 @@ class RAGWorkflow:
         
         return {}
 
-    async def run_workflow(self, query: str, uploaded_files: List[Dict[str, Any]] = None, **options) -> Dict[str, Any]:
-        """Run the complete RAG workflow"""
+    def run_workflow(
+        self, query: str, uploaded_files: List[Dict[str, Any]] = None, stream: bool = False, **options
+    ) -> Union[Awaitable[Dict[str, Any]], AsyncIterator[Dict[str, Any]]]:
+        """Run the complete RAG workflow.
+
+        Returns a coroutine resolving to the final state, or with ``stream=True``
+        an async iterator of events: ``token`` (content deltas), ``tool_call`` /
+        ``tool_result`` (tool boundaries) and a last ``done`` event carrying the
+        final state. Tokens streamed before a ``tool_call`` are the model's
+        narration of that tool round, not part of the answer: consumers drop
+        them when the tool call arrives. With LLM_STREAMING off only the
+        ``done`` event is yielded. ``conversation_id`` (Slack channel + thread, Streamlit
+        session) selects the conversation memory the answer builds on.
+        """
         # Prepare initial state as dictionary
         run_reason = options.get("run_reason", "chat")
         initial_state = {
             "query": query,
             "uploaded_files": uploaded_files or [],
             "user_email": options.get("user_email"),
+            "conversation_id": options.get("conversation_id"),
             "workflow_id": str(uuid.uuid4()),
             "start_time": datetime.now(),
             "run_reason": run_reason,
@@ -245,6 +431,7 @@ class RAGWorkflow:
             "doc_retrieval_limit": options.get("doc_retrieval_limit", options.get("search_limit", 5)),
             "chunk_size": options.get("chunk_size", 1000),
             "chunk_overlap": options.get("chunk_overlap", 200),
+            "incremental": options.get("incremental", Config.INCREMENTAL_INGESTION),
             # Relevance gating defaults
             "min_vector_relevance": options.get("min_vector_relevance"),
             "avg_vector_relevance": 0.0,
@@ -262,9 +449,14 @@ class RAGWorkflow:
             f"doc_retrieval_limit={initial_state['doc_retrieval_limit']} (legacy search_limit={initial_state['search_limit']})"
         )
         
+        if stream:
+            return self._stream_workflow(initial_state)
+        return self._invoke_workflow(initial_state)
+    
+    async def _invoke_workflow(self, initial_state: Dict[str, Any], config: RunnableConfig = None) -> Dict[str, Any]:
         try:
             # Execute the graph
-            final_state = await self.graph.ainvoke(initial_state)
+            final_state = await self.graph.ainvoke(initial_state, config=config)
             return final_state
             
         except Exception as e:
@@ -278,3 +470,92 @@ class RAGWorkflow:
                 "end_time": datetime.now()
             })
             return initial_state
+    
+    async def _stream_workflow(self, initial_state: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        events: asyncio.Queue = asyncio.Queue()
+        run = asyncio.create_task(
+            self._invoke_workflow(initial_state, config={"configurable": {"emit": events.put_nowait}})
+        )
+        run.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            yield {"event": "done", "state": await run}
+        finally:
+            # The consumer went away mid-answer: stop generating
+            if not run.done():
+                run.cancel()
+
+    async def run_ingestion(self, uploaded_files: List[Dict[str, Any]], **options) -> Dict[str, Any]:
+        """Ingest uploaded files only (parse → chunk → embed → store).
+
+        Skips retrieval, generation and monitoring; the ingestion report is in
+        ``processed_docs`` and failures in ``error_message``. ``progress`` (see
+        DocumentAgent.process_documents) receives per-file progress events.
+        """
+        run_reason = options.get("run_reason", "ingestion")
+        initial_state = {
+            "query": "",
+            "uploaded_files": uploaded_files or [],
+            "user_email": options.get("user_email"),
+            "workflow_id": str(uuid.uuid4()),
+            "start_time": datetime.now(),
+            "chunk_size": options.get("chunk_size", 1000),
+            "chunk_overlap": options.get("chunk_overlap", 200),
+            "incremental": options.get("incremental", Config.INCREMENTAL_INGESTION),
+            "job_id": options.get("job_id"),
+            "processed_docs": {},
+            "error_message": "",
+            "embeddings_generated": False,
+            "stats": {}
+        }
+        print(f"🚦 Ingestion start (reason={run_reason}): {len(initial_state['uploaded_files'])} files")
+        
+        try:
+            # Callables travel in the run config rather than in the (serializable) state
+            final_state = await self.ingestion_graph.ainvoke(
+                initial_state, config={"configurable": {"progress": options.get("progress")}}
+            )
+        except Exception as e:
+            print(f"❌ Ingestion error: {e}")
+            final_state = {**initial_state, "error_message": str(e)}
+        final_state["end_time"] = datetime.now()
+        final_state["stats"] = {
+            **final_state.get("stats", {}),
+            "ingestion_time": (final_state["end_time"] - initial_state["start_time"]).total_seconds(),
+        }
+        return final_state
+
+    async def run_ingestion_job(self, job_id: str, progress: Callable[[str, str, int], None] = None) -> Dict[str, Any]:
+        """Run or resume a checkpointed ingestion job (see services.ingestion_jobs).
+
+        Only files that are not stored yet are processed; chunks embedded by an
+        earlier attempt are reused from the checkpoint instead of re-embedded.
+        """
+        job = self.job_store.get_job(job_id)
+        if job is None:
+            raise Exception(f"Unknown ingestion job: {job_id}")
+        
+        uploads = []
+        for f in self.job_store.get_files(job_id):
+            if f["state"] in FILE_DONE_STATES:
+                continue
+            if not os.path.exists(f["path"]):
+                self.job_store.set_file_state(job_id, f["source"], FILE_FAILED, error=f"File not found: {f['path']}")
+                continue
+            uploads.append({"filename": os.path.basename(f["source"]), "source": f["source"], "path": f["path"]})
+        
+        final_state = {"processed_docs": {}, "error_message": "", "stats": {}}
+        if uploads:
+            print(f"🗂️ Job {job_id}: {len(uploads)} of {job['files_total']} files left")
+            self.job_store.set_status(job_id, "running")
+            final_state = await self.run_ingestion(uploads, job_id=job_id, run_reason="job", progress=progress, **job["options"])
+        
+        pending = [f for f in self.job_store.get_files(job_id) if f["state"] not in FILE_DONE_STATES]
+        if pending:
+            error = final_state.get("error_message") or "; ".join(f"{f['source']}: {f['error'] or f['state']}" for f in pending[:5])
+            self.job_store.set_status(job_id, "failed", error)
+        else:
+            self.job_store.set_status(job_id, "completed")
+        final_state["job"] = self.job_store.get_job(job_id)
+        return final_state
@@ -0,0 +1,298 @@
+"""
+Bulk-ingest a directory tree through the streaming pipeline with live progress.
+
+Every supported file under the given paths becomes one checkpointed ingestion
+job (see ingest_jobs.py), so an interrupted run resumes with
+`python ingest_jobs.py resume <job id>`. Progress (files/s, chunks/s,
+embeddings/s, ETA) is printed every --interval seconds and a JSON throughput
+report is written when the run finishes.
+
+--dry-run parses and chunks everything without embedding or storing and
+estimates tokens, embedding requests and cost (assuming every chunk is new).
+
+    uv run python ingest_dir.py docs/ --parse-workers 4 --embed-workers 2 --embed-concurrency 8
+    uv run python ingest_dir.py docs/ --dry-run
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents.parsing import SUPPORTED_EXTS  # noqa: E402
+from config import Config  # noqa: E402
+from ingest_jobs import collect_files, print_job  # noqa: E402
+
+# Events after which a file needs no more work in this run
+FINAL_EVENTS = ("stored", "unchanged", "failed")
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressTracker:
+    """Counts DocumentAgent progress events and prints a throughput line every `interval` seconds"""
+
+    def __init__(self, files: List[Dict], interval: float = 2.0):
+        # Bound now so progress still shows while pipeline logs are redirected
+        self.stream = sys.stdout
+        self.sizes = {f["source"]: f["size"] for f in files}
+        self.total_bytes = sum(self.sizes.values())
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last_print = self.start
+        self.counts = {"parsed": 0, "chunks": 0, "embedded": 0, "stored": 0, "unchanged": 0, "failed": 0}
+        self.done = set()
+        self.bytes_done = 0
+
+    def __call__(self, event: str, source: str, count: int = 0):
+        if event == "chunked":
+            self.counts["chunks"] += count
+        elif event == "parsed":
+            self.counts["parsed"] += 1
+        elif event == "embedded":
+            self.counts["embedded"] += count
+        elif event == "stored":
+            self.counts["stored"] += count
+        if event in FINAL_EVENTS and source not in self.done:
+            self.done.add(source)
+            self.bytes_done += self.sizes.get(source, 0)
+            if event != "stored":
+                self.counts[event] += 1
+        now = time.perf_counter()
+        if now - self.last_print >= self.interval:
+            self.last_print = now
+            self.print_line()
+
+    def rates(self) -> Dict[str, float]:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "elapsed_s": elapsed,
+            "files_per_s": len(self.done) / elapsed,
+            "chunks_per_s": self.counts["chunks"] / elapsed,
+            "embeddings_per_s": self.counts["embedded"] / elapsed,
+            "mb_per_s": self.bytes_done / 1024 / 1024 / elapsed,
+        }
+
+    def eta(self) -> float:
+        """Seconds left, extrapolated from the bytes of finished files"""
+        elapsed = time.perf_counter() - self.start
+        if not self.bytes_done:
+            return None
+        return (self.total_bytes - self.bytes_done) * elapsed / self.bytes_done
+
+    def print_line(self):
+        rates, eta = self.rates(), self.eta()
+        total = len(self.sizes)
+        print(
+            f"📈 {len(self.done)}/{total} files ({100 * len(self.done) / max(total, 1):.0f}%) | "
+            f"{rates['files_per_s']:.2f} files/s | {rates['chunks_per_s']:.1f} chunks/s | "
+            f"{rates['embeddings_per_s']:.1f} embeddings/s | "
+            f"ETA {format_duration(eta) if eta is not None else '?'}",
+            file=self.stream,
+            flush=True,
+        )
+
+
+def apply_overrides(args):
+    """Concurrency flags override Config before the parse pool and workflow are created"""
+    if args.parse_workers is not None:
+        Config.PARSE_WORKERS = args.parse_workers
+    if args.embed_workers is not None:
+        Config.EMBED_WORKERS = args.embed_workers
+    if args.embed_concurrency is not None:
+        Config.EMBEDDING_MAX_CONCURRENCY = args.embed_concurrency
+    if args.queue_size is not None:
+        Config.INGEST_QUEUE_SIZE = args.queue_size
+
+
+def settings(args) -> Dict:
+    return {
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "chunker": Config.CHUNKER,
+        "parse_workers": Config.PARSE_WORKERS,
+        "embed_workers": Config.EMBED_WORKERS,
+        "embedding_max_concurrency": Config.EMBEDDING_MAX_CONCURRENCY,
+        "embedding_batch_size": Config.EMBEDDING_BATCH_SIZE,
+        "embedding_batch_token_budget": Config.EMBEDDING_BATCH_TOKEN_BUDGET,
+        "ingest_queue_size": Config.INGEST_QUEUE_SIZE,
+        "embedding_model": Config.EMBEDDING_MODEL,
+        "vector_backend": Config.VECTOR_BACKEND,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(report: Dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"📝 Report written to {path}")
+
+
+async def estimate(files: List[Dict], args, tracker: ProgressTracker) -> Dict:
+    """Parse and chunk every file (PARSE_WORKERS at a time) and total up tokens and embedding requests"""
+    from agents.document_agent import DocumentAgent
+    from services.tokenizer import get_token_counter
+
+    agent = DocumentAgent()
+    counter = get_token_counter()
+    semaphore = asyncio.Semaphore(max(1, Config.PARSE_WORKERS))
+    totals = {"documents": 0, "chunks": 0, "tokens": 0, "requests": 0}
+    file_errors = []
+
+    async def one(file_data: Dict):
+        source = file_data["source"]
+        async with semaphore:
+            try:
+                documents = await agent.parse_file(file_data["path"])
+                tracker("parsed", source, len(documents))
+                nodes = await asyncio.to_thread(agent.create_chunks, documents, args.chunk_size, args.chunk_overlap)
+            except Exception as e:
+                file_errors.append(f"{source}: {e}")
+                tracker("failed", source)
+                return
+        texts = [node.text for node in nodes]
+        tokens = counter.count_batch(texts)
+        # Same batching as EmbeddingAgent.generate_embeddings, one call per file
+        batches = agent.embedding_agent.plan_batches(texts)
+        totals["documents"] += len(documents)
+        totals["chunks"] += len(nodes)
+        totals["tokens"] += sum(tokens)
+        totals["requests"] += len(batches)
+        tracker("chunked", source, len(nodes))
+        tracker("stored", source)
+
+    await asyncio.gather(*(one(f) for f in files))
+    return {
+        **totals,
+        "tokenizer": counter.name,
+        "estimated_cost_usd": round(totals["tokens"] / 1e6 * Config.EMBEDDING_PRICE_PER_MILLION_TOKENS, 4),
+        "price_per_million_tokens": Config.EMBEDDING_PRICE_PER_MILLION_TOKENS,
+        "file_errors": file_errors,
+    }
+
+
+def dry_run(files: List[Dict], args) -> int:
+    tracker = ProgressTracker(files, args.interval)
+    with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+        result = asyncio.run(estimate(files, args, tracker))
+    elapsed = time.perf_counter() - tracker.start
+
+    print(f"🧮 Dry run: {len(files)} files, {tracker.total_bytes / 1024 / 1024:.1f} MB")
+    print(f"   {result['documents']} documents → {result['chunks']} chunks, "
+          f"{result['tokens']:,} tokens ({result['tokenizer']})")
+    print(f"   ~{result['requests']} embedding requests with {Config.EMBEDDING_MODEL}")
+    print(f"   ~${result['estimated_cost_usd']:.4f} at ${Config.EMBEDDING_PRICE_PER_MILLION_TOKENS}/M tokens "
+          f"(assumes every chunk is new; unchanged and cached chunks are free)")
+    for error in result["file_errors"]:
+        print(f"   ❌ {error}")
+
+    if args.report:
+        write_report({
+            "mode": "dry_run",
+            "files": len(files),
+            "bytes": tracker.total_bytes,
+            "wall_s": round(elapsed, 3),
+            "estimate": result,
+            "config": settings(args),
+        }, args.report)
+    return 1 if result["file_errors"] else 0
+
+
+def ingest(files: List[Dict], args) -> int:
+    from graph.workflow import RAGWorkflow
+
+    workflow = RAGWorkflow()
+    try:
+        job_id = workflow.job_store.create_job(files, {"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap})
+        print(f"🆕 Job {job_id}: {len(files)} files, {sum(f['size'] for f in files) / 1024 / 1024:.1f} MB")
+        tracker = ProgressTracker(files, args.interval)
+        state = workflow.run_sync(workflow.run_ingestion_job(job_id, progress=tracker))
+    finally:
+        workflow.close()
+
+    tracker.print_line()
+    print_job(state["job"])
+    processed = state.get("processed_docs") or {}
+    storage = processed.get("storage") or {}
+    rates = tracker.rates()
+    report = {
+        "mode": "ingest",
+        "job_id": job_id,
+        "status": state["job"]["status"],
+        "error": state.get("error_message"),
+        "files": len(files),
+        "bytes": tracker.total_bytes,
+        "wall_s": round(rates["elapsed_s"], 3),
+        "throughput": {key: round(value, 3) for key, value in rates.items() if key != "elapsed_s"},
+        "totals": {
+            "files_stored": len(tracker.done) - tracker.counts["unchanged"] - tracker.counts["failed"],
+            "files_unchanged": tracker.counts["unchanged"],
+            "files_failed": tracker.counts["failed"],
+            "chunks": tracker.counts["chunks"],
+            "embedded": tracker.counts["embedded"],
+            "stored": storage.get("stored", tracker.counts["stored"]),
+            "file_errors": processed.get("file_errors", []),
+        },
+        "pipeline": processed.get("pipeline"),
+        "storage": storage,
+        "dedup": processed.get("dedup"),
+        "config": settings(args),
+    }
+    write_report(report, args.report or os.path.join(Config.CACHE_DIR, "ingest_reports", f"{job_id}.json"))
+    if state["job"]["status"] != "completed":
+        print(f"↩️ Resume with: python ingest_jobs.py resume {job_id}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Files and/or directories (walked recursively)")
+    parser.add_argument("--chunk-size", type=int, default=Config.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=Config.DEFAULT_CHUNK_OVERLAP)
+    parser.add_argument("--parse-workers", type=int, help="Parser processes (PARSE_WORKERS)")
+    parser.add_argument("--embed-workers", type=int, help="Files embedded concurrently (EMBED_WORKERS)")
+    parser.add_argument("--embed-concurrency", type=int, help="Embedding requests in flight per file (EMBEDDING_MAX_CONCURRENCY)")
+    parser.add_argument("--queue-size", type=int, help="Files buffered between stages (INGEST_QUEUE_SIZE)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between progress lines")
+    parser.add_argument("--report", help="JSON report path (default: CACHE_DIR/ingest_reports/<job id>.json)")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and chunk only; estimate tokens and cost")
+    parser.add_argument("--verbose", action="store_true", help="Keep per-file pipeline logs in --dry-run")
+    parser.add_argument("--allow-skip", action="store_true", help="Skip files whose source (relative path) repeats instead of failing")
+    args = parser.parse_args()
+
+    apply_overrides(args)
+    try:
+        files = collect_files(args.paths, args.allow_skip)
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+    if not files:
+        print(f"❌ No supported files ({', '.join(SUPPORTED_EXTS)}) found")
+        return 1
+    if args.dry_run:
+        return dry_run(files, args)
+    return ingest(files, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Start, resume and inspect checkpointed ingestion jobs.
+
+    uv run python ingest_jobs.py start docs/ handbook.pdf --chunk-size 1000
+    uv run python ingest_jobs.py resume 3f2a9c1b7d4e
+    uv run python ingest_jobs.py status            # recent jobs
+    uv run python ingest_jobs.py status 3f2a9c1b7d4e --files
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents.parsing import SUPPORTED_EXTS  # noqa: E402
+from config import Config  # noqa: E402
+from services.ingestion_jobs import IngestionJobStore  # noqa: E402
+
+
+def collect_files(paths: List[str], allow_skip: bool = False) -> List[Dict]:
+    """Supported files under the given files/directories.
+
+    A file's source is its path relative to the directory it was found in
+    (its name for files given directly), so same-named files in different
+    subdirectories stay separate. Two files with the same source raise,
+    unless ``allow_skip`` keeps the first and skips the rest.
+    """
+    found, seen, duplicates = [], {}, []
+    for root in paths:
+        if os.path.isdir(root):
+            candidates = sorted(
+                (os.path.join(directory, name), os.path.relpath(os.path.join(directory, name), root))
+                for directory, _, names in os.walk(root)
+                for name in names
+            )
+        else:
+            candidates = [(root, os.path.basename(root))]
+        for path, source in candidates:
+            if os.path.splitext(path)[1].lower() not in SUPPORTED_EXTS or not os.path.isfile(path):
+                continue
+            source = source.replace(os.sep, "/")
+            if source in seen:
+                duplicates.append(f"{path} (same source as {seen[source]})")
+                continue
+            seen[source] = path
+            found.append({"filename": os.path.basename(path), "source": source, "path": os.path.abspath(path), "size": os.path.getsize(path)})
+    if duplicates and not allow_skip:
+        raise Exception(f"{len(duplicates)} files share a source with another file: {'; '.join(duplicates[:5])} (pass --allow-skip to skip them)")
+    for duplicate in duplicates:
+        print(f"⚠️ Skipping {duplicate}")
+    return found
+
+
+def print_job(job: Dict):
+    created = datetime.fromtimestamp(job["created_at"]).strftime("%Y-%m-%d %H:%M")
+    files = ", ".join(f"{state} {count}" for state, count in sorted(job["files"].items())) or "no files"
+    chunks = ", ".join(f"{state} {count}" for state, count in sorted(job["chunks"].items())) or "none"
+    print(f"🗂️ {job['job_id']}  {job['status']:<9} {created}  files: {files}  chunks: {chunks}")
+    if job.get("error"):
+        print(f"   ↳ {job['error']}")
+
+
+def run_job(job_id: str) -> int:
+    from graph.workflow import RAGWorkflow
+
+    workflow = RAGWorkflow()
+    try:
+        state = workflow.run_sync(workflow.run_ingestion_job(job_id))
+    finally:
+        workflow.close()
+    print_job(state["job"])
+    if state["job"]["status"] != "completed":
+        print(f"↩️ Resume with: python ingest_jobs.py resume {job_id}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    start = commands.add_parser("start", help="Create a job for files/directories and run it")
+    start.add_argument("paths", nargs="+")
+    start.add_argument("--chunk-size", type=int, default=Config.DEFAULT_CHUNK_SIZE)
+    start.add_argument("--chunk-overlap", type=int, default=Config.DEFAULT_CHUNK_OVERLAP)
+    start.add_argument("--allow-skip", action="store_true", help="Skip files whose source (relative path) repeats instead of failing")
+    resume = commands.add_parser("resume", help="Continue a failed or interrupted job")
+    resume.add_argument("job_id")
+    status = commands.add_parser("status", help="Show recent jobs or one job")
+    status.add_argument("job_id", nargs="?")
+    status.add_argument("--files", action="store_true", help="List per-file state")
+    args = parser.parse_args()
+
+    store = IngestionJobStore()
+    try:
+        if args.command == "start":
+            try:
+                files = collect_files(args.paths, args.allow_skip)
+            except Exception as e:
+                print(f"❌ {e}")
+                return 1
+            if not files:
+                print(f"❌ No supported files ({', '.join(SUPPORTED_EXTS)}) found")
+                return 1
+            job_id = store.create_job(files, {"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap})
+            print(f"🆕 Job {job_id}: {len(files)} files")
+            return run_job(job_id)
+
+        if args.command == "resume":
+            job = store.get_job(args.job_id)
+            if job is None:
+                print(f"❌ Unknown job {args.job_id}")
+                return 1
+            if job["status"] == "completed":
+                print_job(job)
+                return 0
+            return run_job(args.job_id)
+
+        jobs = [store.get_job(args.job_id)] if args.job_id else store.list_jobs()
+        if not jobs or jobs[0] is None:
+            print("No ingestion jobs")
+            return 0 if not args.job_id else 1
+        for job in jobs:
+            print_job(job)
+            if args.files:
+                for f in store.get_files(job["job_id"]):
+                    error = f"  ({f['error']})" if f["error"] else ""
+                    print(f"   {f['state']:<9} {f['chunks']:>6} chunks  {f['source']}{error}")
+        return 0
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator
+
+
+class BackgroundLoop:
+    """A long-lived event loop running in a daemon thread.
+
+    Synchronous front ends (Slack bolt handlers, Streamlit reruns) submit
+    coroutines here instead of calling asyncio.run() per request, so pooled
+    connections bound to the loop survive between requests.
+    """
+
+    def __init__(self, name: str = "rag-workflow-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Coroutine, timeout: float = None) -> Any:
+        """Run a coroutine on the background loop and block until it finishes"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() called from inside its own loop")
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def iterate(self, iterator: AsyncIterator, timeout: float = None) -> Iterator:
+        """Consume an async iterator on the background loop from synchronous code, item by item"""
+        try:
+            while True:
+                try:
+                    yield self.run(iterator.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Abandoned early (consumer stopped or timed out): let the iterator clean up on its loop
+            if not self.loop.is_closed() and hasattr(iterator, "aclose"):
+                asyncio.run_coroutine_threadsafe(iterator.aclose(), self.loop)
+
+    def stop(self):
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        if not self._thread.is_alive():
+            self.loop.close()
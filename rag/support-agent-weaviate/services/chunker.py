@@ -0,0 +1,152 @@
+import re
+from typing import Any, Dict, List, Tuple
+
+from services.tokenizer import TokenCounter, get_token_counter
+
+PARAGRAPH_RE = re.compile(r"\n\n+")
+SENTENCE_RE = re.compile(r"[.!?]+\s+")
+WORD_RE = re.compile(r"\s+")
+
+# (start, end, tokens, is_sentence) – one indivisible piece of a document's text
+Split = Tuple[int, int, int, bool]
+
+
+class Chunk:
+    """A chunk as a character range of its source document (text is sliced on access)"""
+
+    __slots__ = ("document", "start", "end", "tokens")
+
+    def __init__(self, document, start: int, end: int, tokens: int):
+        self.document = document
+        self.start = start
+        self.end = end
+        self.tokens = tokens
+
+    @property
+    def text(self) -> str:
+        return self.document.text[self.start:self.end]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.document.metadata
+
+
+def _cut(text: str, start: int, end: int, pattern: re.Pattern) -> List[Tuple[int, int]]:
+    """Split text[start:end] after every match of pattern (separators stay with the left piece)"""
+    spans, begin = [], start
+    for match in pattern.finditer(text, start, end):
+        if match.end() > begin and match.end() < end:
+            spans.append((begin, match.end()))
+            begin = match.end()
+    spans.append((begin, end))
+    return spans
+
+
+class OffsetChunker:
+    """Token-sized chunking over character offsets.
+
+    Approximates LlamaIndex's SentenceSplitter as configured in DocumentAgent:
+    paragraphs ("\\n\\n"), then sentences ("[.!?]+\\s+"), then words, then
+    characters, each level only for pieces that exceed chunk_size; pieces are
+    merged greedily up to chunk_size with up to chunk_overlap tokens carried
+    over. Unlike SentenceSplitter it has no punkt sentence level and does not
+    budget node metadata into chunk_size, so boundaries and chunk counts
+    differ (switching CHUNKER re-chunks and re-embeds every document). Token
+    counts come from one batch call per level instead of a call per piece,
+    and chunks are plain offset records instead of TextNodes with copied text
+    and metadata.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, counter: TokenCounter = None):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.counter = counter or get_token_counter()
+
+    def _count(self, text: str, spans: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+        """Fill in token counts (-1 = unknown) with one batch call"""
+        unknown = [i for i, (_, _, tokens) in enumerate(spans) if tokens < 0]
+        counts = self.counter.count_batch([text[spans[i][0]:spans[i][1]] for i in unknown]) if unknown else []
+        spans = list(spans)
+        for i, tokens in zip(unknown, counts):
+            spans[i] = (spans[i][0], spans[i][1], tokens)
+        return spans
+
+    def _split(self, text: str) -> List[Split]:
+        levels = [(PARAGRAPH_RE, True), (SENTENCE_RE, True), (WORD_RE, False)]
+        pending = self._count(text, [(0, len(text), -1)])
+        splits: Dict[int, Split] = {}
+        for pattern, is_sentence in levels:
+            next_pending = []
+            for s, e, tokens in pending:
+                if tokens <= self.chunk_size:
+                    splits[s] = (s, e, tokens, is_sentence)
+                    continue
+                spans = _cut(text, s, e, pattern)
+                # A separator-free span is unchanged at this level; keep its count
+                next_pending.extend([(s, e, tokens)] if len(spans) == 1 else [(a, b, -1) for a, b in spans])
+            pending = self._count(text, next_pending)
+        for s, e, tokens in pending:
+            if tokens <= self.chunk_size:
+                splits[s] = (s, e, tokens, False)
+                continue
+            # A single "word" longer than a chunk (tables, URLs, base64): fall back to characters
+            width = max(1, self.chunk_size)
+            for begin in range(s, e, width):
+                piece_end = min(begin + width, e)
+                splits[begin] = (begin, piece_end, self.counter.count(text[begin:piece_end]), False)
+        return [splits[k] for k in sorted(splits)]
+
+    def _merge(self, splits: List[Split]) -> List[Tuple[int, int, int]]:
+        """SentenceSplitter._merge over offsets; returns (start, end, tokens) per chunk"""
+        chunks: List[Tuple[int, int, int]] = []
+        current: List[Split] = []
+        current_tokens = 0
+        new_chunk = True
+
+        def close_chunk():
+            nonlocal current, current_tokens, new_chunk
+            chunks.append((current[0][0], current[-1][1], current_tokens))
+            last = current
+            current, current_tokens, new_chunk = [], 0, True
+            for split in reversed(last):
+                if current_tokens + split[2] > self.chunk_overlap:
+                    break
+                current.insert(0, split)
+                current_tokens += split[2]
+
+        i = 0
+        while i < len(splits):
+            split = splits[i]
+            if current_tokens + split[2] > self.chunk_size and not new_chunk:
+                close_chunk()
+                continue
+            while new_chunk and current and current_tokens + split[2] > self.chunk_size:
+                current_tokens -= current.pop(0)[2]
+            if split[3] or current_tokens + split[2] <= self.chunk_size or new_chunk:
+                current.append(split)
+                current_tokens += split[2]
+                new_chunk = False
+                i += 1
+            else:
+                close_chunk()
+        if not new_chunk:
+            chunks.append((current[0][0], current[-1][1], current_tokens))
+        return chunks
+
+    def chunk_document(self, document) -> List[Chunk]:
+        text = document.text
+        chunks = []
+        for start, end, tokens in self._merge(self._split(text)):
+            # Trim surrounding whitespace by moving the offsets, not by copying
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                chunks.append(Chunk(document, start, end, tokens))
+        return chunks
+
+    def chunk_documents(self, documents: List) -> List[Chunk]:
+        return [chunk for document in documents for chunk in self.chunk_document(document)]
@@ -0,0 +1,148 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from config import Config
+from services.chunker import PARAGRAPH_RE, SENTENCE_RE
+from services.tokenizer import TokenCounter, get_token_counter
+
+SPACE_RE = re.compile(r"\s+")
+
+# Sentences this short ("Table 2.", "Yes.") are only dropped as exact repeats, never as fragments of earlier text
+MIN_FRAGMENT_WORDS = 5
+
+NO_CONTEXT = "No additional context."
+
+
+def split_sentences(text: str) -> List[str]:
+    """Whole sentences of a chunk, on the same boundaries the chunker cuts at"""
+    sentences = []
+    for paragraph in PARAGRAPH_RE.split(text or ""):
+        begin = 0
+        for match in SENTENCE_RE.finditer(paragraph):
+            sentences.append(paragraph[begin:match.end()])
+            begin = match.end()
+        sentences.append(paragraph[begin:])
+    return [s for s in (SPACE_RE.sub(" ", s).strip() for s in sentences) if s]
+
+
+def _relevance(item: Dict[str, Any]) -> Optional[float]:
+    distance = item.get("distance")
+    if distance is None:
+        return None
+    try:
+        return max(0.0, 1.0 - float(distance))
+    except (TypeError, ValueError):
+        return None
+
+
+def _title(item: Dict[str, Any]) -> str:
+    return item.get("title") or item.get("filename") or item.get("source") or "Untitled"
+
+
+def pack_context(
+    docs: List[Dict[str, Any]] | None,
+    search: List[Dict[str, Any]] | None = None,
+    token_budget: int = None,
+    limit: int = None,
+    counter: TokenCounter = None,
+    margin: float = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Build the prompt context from retrieved chunks (and web results) within a token budget.
+
+    Chunks are ranked most relevant first (``1 - distance``; web results after
+    them) and the top ``limit`` are used. Sentences already packed from another
+    chunk are skipped, which removes chunk overlap and repeated boilerplate;
+    the rest are added whole until the next one would exceed the budget.
+
+    Tokens are counted with ``counter`` (CHUNK_TOKENIZER), not the chat
+    model's tokenizer, so the count is approximate: packing stops at
+    ``token_budget`` less a ``margin`` share (CONTEXT_TOKEN_MARGIN) to leave
+    room for the difference. Returns (context text, stats with the achieved
+    token count).
+    """
+    token_budget = Config.CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    margin = Config.CONTEXT_TOKEN_MARGIN if margin is None else margin
+    counter = counter or get_token_counter()
+    requested_budget = token_budget
+    token_budget = int(token_budget * (1.0 - min(max(margin, 0.0), 0.9)))
+
+    ranked = sorted(docs or [], key=lambda d: -(_relevance(d) if _relevance(d) is not None else -1.0))
+    if limit:
+        ranked = ranked[:limit]
+    sections = [("Retrieved documents:", ranked), ("Search results:", search or [])]
+
+    seen_sentences = set()
+    seen_text: Dict[str, str] = {}
+    # (section heading, [(chunk header, packed sentences)])
+    blocks: List[Tuple[str, List[Tuple[str, List[str]]]]] = []
+    used = 0
+    stats = {
+        "budget": requested_budget,
+        "packing_budget": token_budget,
+        "candidates": sum(len(items) for _, items in sections),
+        "chunks_used": 0,
+        "chunks_truncated": 0,
+        "chunks_duplicate": 0,
+        "sentences": 0,
+        "duplicate_sentences": 0,
+    }
+    full = False
+    for heading, items in sections:
+        section_blocks = []
+        for item in items:
+            if full:
+                break
+            source = item.get("source") or item.get("url") or _title(item)
+            fresh = []
+            for sentence in split_sentences(item.get("content", "")):
+                key = sentence.lower()
+                # Overlap between neighbouring chunks may start mid-sentence: a fragment of text already packed counts too
+                fragment = len(sentence.split()) >= MIN_FRAGMENT_WORDS and key in seen_text.get(source, "")
+                if key in seen_sentences or fragment:
+                    stats["duplicate_sentences"] += 1
+                    continue
+                fresh.append(sentence)
+            if not fresh:
+                stats["chunks_duplicate"] += 1
+                continue
+
+            relevance = _relevance(item)
+            header = f"[{len(section_blocks) + 1}] {_title(item)}" + (f" (relevance {relevance:.2f})" if relevance is not None else "")
+            # +2 for the newlines around the header
+            header_tokens = counter.count(header) + 2 + (counter.count(heading) + 2 if not section_blocks else 0)
+            if used + header_tokens >= token_budget:
+                full = True
+                break
+            kept = []
+            total = used + header_tokens
+            for sentence, tokens in zip(fresh, counter.count_batch(fresh)):
+                # +1 for the space joining it to the previous sentence
+                if total + tokens + 1 > token_budget:
+                    full = True
+                    break
+                kept.append(sentence)
+                total += tokens + 1
+            if not kept:
+                break
+            used = total
+            for sentence in kept:
+                key = sentence.lower()
+                seen_sentences.add(key)
+                seen_text[source] = seen_text.get(source, "") + " " + key
+            stats["chunks_used"] += 1
+            stats["sentences"] += len(kept)
+            stats["chunks_truncated"] += len(kept) < len(fresh)
+            section_blocks.append((header, kept))
+        if section_blocks:
+            blocks.append((heading, section_blocks))
+
+    if not blocks:
+        text = NO_CONTEXT
+    else:
+        parts = []
+        for heading, section_blocks in blocks:
+            parts.append(heading)
+            parts.extend(f"{header}\n{' '.join(sentences)}" for header, sentences in section_blocks)
+        text = "\n\n".join(parts)
+    stats["tokens"] = counter.count(text)
+    stats["tokenizer"] = counter.name
+    return text, stats
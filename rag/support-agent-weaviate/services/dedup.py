@@ -0,0 +1,324 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from config import Config
+
+WORD_RE = re.compile(r"\w+")
+
+# Words per shingle fed into SimHash
+SHINGLE_WORDS = 3
+
+# Chunks with fewer shingles than this are only deduplicated exactly (their SimHash is too unstable)
+MIN_SHINGLES = 8
+
+# 64-bit SimHash split into 4 bands of 16 bits: two signatures within Hamming distance 3
+# agree on at least one band, so band lookups find every near-duplicate candidate
+BANDS = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finaliser, so CRC32 word hashes and their combinations have well-spread 64-bit values"""
+    with np.errstate(over="ignore"):
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over the distinct word 3-shingles (unsigned); None for texts too short to compare fuzzily"""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS + MIN_SHINGLES - 1:
+        return None
+    hashes = _mix(np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words)))
+    with np.errstate(over="ignore"):
+        shingles = hashes[: len(hashes) - SHINGLE_WORDS + 1].copy()
+        for offset in range(1, SHINGLE_WORDS):
+            shingles = shingles * np.uint64(0x9E3779B97F4A7C15) + hashes[offset: len(hashes) - SHINGLE_WORDS + 1 + offset]
+    # Distinct shingles only: repeated table rows or separators would otherwise outvote the rest of the text
+    shingles = np.unique(_mix(shingles))
+    bits = (shingles[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int(np.packbits(votes[::-1] > 0).view(">u8")[0])
+
+
+def _signed(value: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _bands(signature: int) -> List[int]:
+    return [(signature >> (i * BAND_BITS)) & BAND_MASK for i in range(BANDS)]
+
+
+class SignatureIndex:
+    """Persistent chunk signatures (exact content hash + SimHash bands) per collection, in SQLite.
+
+    Also records every chunk dropped as a duplicate (its storage record and
+    the stored chunk it duplicates), so it can be stored after all when that
+    original is deleted.
+    """
+
+    def __init__(self, path: str = None, collection: str = None):
+        self.path = path or Config.DEDUP_INDEX_PATH
+        self.collection = collection or Config.WEAVIATE_CLASS_NAME
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                collection TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                simhash INTEGER,
+                band0 INTEGER, band1 INTEGER, band2 INTEGER, band3 INTEGER,
+                PRIMARY KEY (collection, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_signatures_hash ON signatures(collection, content_hash);
+            CREATE INDEX IF NOT EXISTS idx_signatures_band0 ON signatures(collection, band0);
+            CREATE INDEX IF NOT EXISTS idx_signatures_band1 ON signatures(collection, band1);
+            CREATE INDEX IF NOT EXISTS idx_signatures_band2 ON signatures(collection, band2);
+            CREATE INDEX IF NOT EXISTS idx_signatures_band3 ON signatures(collection, band3);
+            CREATE TABLE IF NOT EXISTS duplicates (
+                collection TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                original_id TEXT NOT NULL,
+                document TEXT NOT NULL,
+                PRIMARY KEY (collection, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_duplicates_original ON duplicates(collection, original_id);
+            CREATE INDEX IF NOT EXISTS idx_duplicates_source ON duplicates(collection, source);
+            """
+        )
+        self._conn.commit()
+
+    def find_exact(self, content_hash: str, exclude_id: str, retired: Set[str] = frozenset()) -> Optional[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM signatures WHERE collection = ? AND content_hash = ?",
+                (self.collection, content_hash),
+            ).fetchall()
+        return next((object_id for object_id, in rows if object_id != exclude_id and object_id not in retired), None)
+
+    def find_near(self, signature: int, max_distance: int, exclude_id: str, retired: Set[str] = frozenset()) -> Optional[str]:
+        bands = _bands(signature)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, simhash FROM signatures WHERE collection = ? "
+                "AND (band0 = ? OR band1 = ? OR band2 = ? OR band3 = ?)",
+                (self.collection, *bands),
+            ).fetchall()
+        for object_id, other in rows:
+            if object_id == exclude_id or object_id in retired or other is None:
+                continue
+            if ((other & ((1 << 64) - 1)) ^ signature).bit_count() <= max_distance:
+                return object_id
+        return None
+
+    def add_many(self, rows: Sequence[Tuple[str, str, str, Optional[int]]]):
+        """Register stored chunks as (chunk_id, source, content_hash, simhash)"""
+        records = []
+        for object_id, source, chunk_hash, signature in rows:
+            bands = _bands(signature) if signature is not None else [None] * BANDS
+            records.append((
+                self.collection, object_id, source, chunk_hash,
+                _signed(signature) if signature is not None else None, *bands,
+            ))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO signatures (collection, chunk_id, source, content_hash, simhash, "
+                "band0, band1, band2, band3) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            self._conn.commit()
+
+    def remove_many(self, ids: Sequence[str]):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM signatures WHERE collection = ? AND chunk_id = ?",
+                [(self.collection, object_id) for object_id in ids],
+            )
+            self._conn.commit()
+
+    def replace_duplicates(self, source: str, rows: Sequence[Tuple[str, str, Dict[str, Any]]]):
+        """Record the chunks of ``source`` dropped as duplicates as (chunk_id, original_id, document), replacing its previous ones"""
+        with self._lock:
+            self._conn.execute("DELETE FROM duplicates WHERE collection = ? AND source = ?", (self.collection, source))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO duplicates (collection, chunk_id, source, original_id, document) VALUES (?, ?, ?, ?, ?)",
+                [(self.collection, object_id, source, original, json.dumps(document)) for object_id, original, document in rows],
+            )
+            self._conn.commit()
+
+    def duplicates_of(self, original_ids: Sequence[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        """(chunk_id, document) of dropped chunks that duplicate any of ``original_ids``"""
+        rows = []
+        original_ids = list(original_ids)
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(original_ids), 500):
+                batch = original_ids[start:start + 500]
+                rows.extend(self._conn.execute(
+                    f"SELECT chunk_id, document FROM duplicates WHERE collection = ? AND original_id IN ({','.join('?' * len(batch))})",
+                    (self.collection, *batch),
+                ).fetchall())
+        return [(object_id, json.loads(document)) for object_id, document in rows]
+
+    def remove_duplicates(self, ids: Sequence[str]):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM duplicates WHERE collection = ? AND chunk_id = ?",
+                [(self.collection, object_id) for object_id in ids],
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM signatures WHERE collection = ?", (self.collection,))
+            self._conn.execute("DELETE FROM duplicates WHERE collection = ?", (self.collection,))
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM signatures WHERE collection = ?", (self.collection,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DedupSession:
+    """Deduplication state of one process_documents run.
+
+    Chunks kept earlier in the run count as originals right away; they are
+    written to the persistent index only once stored, so a failed store never
+    leaves a signature without a stored chunk behind it. ``retired`` ids (the
+    current chunks of re-uploaded sources, which may be deleted as stale at
+    the end of the run) never count as originals.
+    """
+
+    def __init__(self, index: SignatureIndex, max_distance: int, retired: Set[str] = None):
+        self.index = index
+        self.max_distance = max_distance
+        self.retired = set(retired or ())
+        self._hashes: Dict[str, str] = {}
+        self._bands: List[Dict[int, List[str]]] = [{} for _ in range(BANDS)]
+        self._signatures: Dict[str, Tuple[str, str, Optional[int]]] = {}
+        # dropped id -> (original id, document), until recorded per source
+        self._dropped: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self.stats = {"exact": 0, "near": 0}
+
+    def _find_exact(self, chunk_hash: str, object_id: str) -> Optional[str]:
+        original = self._hashes.get(chunk_hash)
+        if original is not None and original != object_id:
+            return original
+        return self.index.find_exact(chunk_hash, object_id, self.retired)
+
+    def _find_near(self, signature: int, object_id: str) -> Optional[str]:
+        for band, value in zip(self._bands, _bands(signature)):
+            for other_id in band.get(value, ()):
+                other = self._signatures[other_id][2]
+                if other_id != object_id and (other ^ signature).bit_count() <= self.max_distance:
+                    return other_id
+        return self.index.find_near(signature, self.max_distance, object_id, self.retired)
+
+    def filter(self, documents: List[Dict[str, Any]], ids: List[str]) -> Tuple[List[Dict[str, Any]], List[str], Dict[str, str]]:
+        """Drop chunks that duplicate a stored chunk or one kept earlier in this run.
+
+        Returns (kept documents, kept ids, {dropped id: original id}).
+        """
+        kept_documents, kept_ids, dropped = [], [], {}
+        for document, object_id in zip(documents, ids):
+            chunk_hash = document.get("content_hash")
+            signature = None
+            original, kind = self._find_exact(chunk_hash, object_id), "exact"
+            if original is None and self.max_distance >= 0:
+                signature = simhash(document["content"])
+                if signature is not None:
+                    original, kind = self._find_near(signature, object_id), "near"
+            if original is not None:
+                dropped[object_id] = original
+                self._dropped[object_id] = (original, document)
+                self.stats[kind] += 1
+                continue
+            kept_documents.append(document)
+            kept_ids.append(object_id)
+            self._hashes.setdefault(chunk_hash, object_id)
+            self._signatures[object_id] = (document.get("source", ""), chunk_hash, signature)
+            if signature is not None:
+                for band, value in zip(self._bands, _bands(signature)):
+                    band.setdefault(value, []).append(object_id)
+        return kept_documents, kept_ids, dropped
+
+    def keep(self, ids: Sequence[str]):
+        """Retired chunks that turned out unchanged stay stored and can be originals again"""
+        self.retired.difference_update(ids)
+
+    def commit(self, ids: Sequence[str]):
+        """Persist the signatures of chunks that reached the vector store"""
+        rows = [(object_id, *self._signatures[object_id]) for object_id in ids if object_id in self._signatures]
+        if rows:
+            self.index.add_many(rows)
+
+    def record(self, source: str):
+        """Persist which chunks of a processed source were dropped and what they duplicate (replacing its earlier record)"""
+        rows = [
+            (object_id, original, document)
+            for object_id, (original, document) in self._dropped.items()
+            if document.get("source") == source
+        ]
+        for object_id, _, _ in rows:
+            del self._dropped[object_id]
+        self.index.replace_duplicates(source, rows)
+
+
+class ChunkDeduplicator:
+    """Exact and near-duplicate (SimHash) chunk detection against everything already ingested"""
+
+    def __init__(self, index: SignatureIndex = None, max_distance: int = None):
+        self.index = index or SignatureIndex()
+        self.max_distance = Config.DEDUP_MAX_HAMMING if max_distance is None else max_distance
+
+    def session(self, retired: Set[str] = None) -> DedupSession:
+        return DedupSession(self.index, self.max_distance, retired)
+
+    def forget(self, ids: Sequence[str]):
+        """Chunks were deleted from the vector store"""
+        if ids:
+            self.index.remove_many(ids)
+
+    def dependants(self, ids: Sequence[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        """(chunk_id, document) of chunks that were dropped as duplicates of ``ids`` and so exist only through them"""
+        return self.index.duplicates_of(ids) if ids else []
+
+    def adopt(self, documents: List[Dict[str, Any]], ids: List[str]):
+        """Dropped duplicates were stored after all: they become originals themselves"""
+        self.index.add_many([
+            (object_id, document.get("source", ""), document.get("content_hash"), simhash(document["content"]))
+            for document, object_id in zip(documents, ids)
+        ])
+        self.index.remove_duplicates(ids)
+
+    def clear(self):
+        self.index.clear()
+
+    def close(self):
+        self.index.close()
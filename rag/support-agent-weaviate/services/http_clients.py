@@ -0,0 +1,56 @@
+import importlib.util
+import httpx
+from typing import Dict
+from config import Config
+
+# The `h2` package enables HTTP/2 support in httpx
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Upstreams that get their own connection pool ("llm": Nebius chat completions, kept apart from
+# embedding batches so long generations never hold the connections ingestion needs)
+UPSTREAMS = ("nebius", "llm", "keywordsai", "notion", "calendly")
+
+
+class HTTPClients:
+    """One pooled, keep-alive httpx.AsyncClient per upstream.
+
+    Owned by RAGWorkflow and injected into agents/tools so connections are
+    reused across requests instead of paying a TCP+TLS handshake per call.
+    Clients must be used from a single, long-lived event loop.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.http2 = Config.HTTP2_ENABLED and HTTP2_AVAILABLE
+
+    def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=Config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(Config.HTTP_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT),
+        )
+
+    def get(self, upstream: str) -> httpx.AsyncClient:
+        """Return the shared client for an upstream, creating it on first use"""
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            client = self._create_client()
+            self._clients[upstream] = client
+        return client
+
+    async def startup(self):
+        for upstream in UPSTREAMS:
+            self.get(upstream)
+        print(f"🔌 HTTP pools ready for {', '.join(UPSTREAMS)} (http2={self.http2})")
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"⚠️ Failed to close HTTP client: {e}")
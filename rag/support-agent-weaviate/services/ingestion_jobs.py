@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from config import Config
+
+# File states, in pipeline order; "stored" and "unchanged" are final
+FILE_PENDING = "pending"
+FILE_PARSED = "parsed"
+FILE_CHUNKED = "chunked"
+FILE_STORED = "stored"
+FILE_UNCHANGED = "unchanged"
+FILE_FAILED = "failed"
+FILE_DONE_STATES = (FILE_STORED, FILE_UNCHANGED)
+
+# Chunk states: vectors are kept until the chunk is stored, then dropped
+CHUNK_EMBEDDED = "embedded"
+CHUNK_STORED = "stored"
+
+
+class IngestionJobStore:
+    """SQLite checkpoints for bulk ingestion jobs.
+
+    A job is a list of files on disk plus chunking options. Each file moves
+    through pending → parsed → chunked → stored (or unchanged/failed), and
+    each chunk's embedding is checkpointed as soon as it arrives, so an
+    interrupted job resumes without re-parsing finished files or
+    re-embedding finished chunks.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.INGESTION_JOBS_PATH
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                options TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_files (
+                job_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT,
+                state TEXT NOT NULL,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, source)
+            );
+            CREATE TABLE IF NOT EXISTS job_chunks (
+                job_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                state TEXT NOT NULL,
+                vector BLOB,
+                PRIMARY KEY (job_id, chunk_id)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def create_job(self, files: Sequence[Dict[str, Any]], options: Dict[str, Any] = None) -> str:
+        """Register files ({"filename", "path", "size"}, optionally "source") for a new job; returns its id"""
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, options, created_at, updated_at) VALUES (?, 'pending', ?, ?, ?)",
+                (job_id, json.dumps(options or {}), now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_files (job_id, source, path, size, sha256, state, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (job_id, f.get("source") or os.path.basename(f["filename"]), f["path"], f.get("size", 0), f.get("sha256"), FILE_PENDING, now)
+                    for f in files
+                ],
+            )
+            self._conn.commit()
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job row with per-state file counts and checkpointed chunk counts"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, status, options, error, created_at, updated_at FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            files = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM job_files WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall())
+            chunks = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM job_chunks WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall())
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "options": json.loads(row[2]),
+            "error": row[3],
+            "created_at": row[4],
+            "updated_at": row[5],
+            "files": files,
+            "files_total": sum(files.values()),
+            "chunks": chunks,
+        }
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute(
+                "SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()]
+        return [self.get_job(job_id) for job_id in ids]
+
+    def get_files(self, job_id: str, states: Sequence[str] = None) -> List[Dict[str, Any]]:
+        query = "SELECT source, path, size, sha256, state, chunks, error FROM job_files WHERE job_id = ?"
+        params: List[Any] = [job_id]
+        if states:
+            query += f" AND state IN ({','.join('?' * len(states))})"
+            params.extend(states)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY source", params).fetchall()
+        keys = ("source", "path", "size", "sha256", "state", "chunks", "error")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def set_status(self, job_id: str, status: str, error: str = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                (status, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def set_file_state(self, job_id: str, source: str, state: str, chunks: int = None, error: str = None, sha256: str = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_files SET state = ?, chunks = COALESCE(?, chunks), error = ?, "
+                "sha256 = COALESCE(?, sha256), updated_at = ? WHERE job_id = ? AND source = ?",
+                (state, chunks, error, sha256, time.time(), job_id, source),
+            )
+            self._conn.commit()
+
+    def save_embeddings(self, job_id: str, source: str, ids: Sequence[str], embeddings: np.ndarray):
+        """Checkpoint freshly embedded chunks (float32 blobs)"""
+        rows = [
+            (job_id, chunk_id, source, CHUNK_EMBEDDED, np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+            for chunk_id, vector in zip(ids, embeddings)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_chunks (job_id, chunk_id, source, state, vector) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def load_embeddings(self, job_id: str, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Checkpointed vectors for chunk ids that were embedded but not stored yet"""
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                batch = list(ids[i:i + 500])
+                rows = self._conn.execute(
+                    f"SELECT chunk_id, vector FROM job_chunks WHERE job_id = ? AND state = ? "
+                    f"AND chunk_id IN ({','.join('?' * len(batch))})",
+                    [job_id, CHUNK_EMBEDDED, *batch],
+                ).fetchall()
+                for chunk_id, blob in rows:
+                    found[chunk_id] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def mark_stored(self, job_id: str, source: str, ids: Sequence[str]):
+        """Chunks reached the vector store: keep the state, drop the vectors"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO job_chunks (job_id, chunk_id, source, state, vector) VALUES (?, ?, ?, ?, NULL) "
+                "ON CONFLICT (job_id, chunk_id) DO UPDATE SET state = excluded.state, vector = NULL",
+                [(job_id, chunk_id, source, CHUNK_STORED) for chunk_id in ids],
+            )
+            self._conn.commit()
+
+    def delete_job(self, job_id: str):
+        with self._lock:
+            for table in ("job_chunks", "job_files", "jobs"):
+                self._conn.execute(f"DELETE FROM {table} WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+    def job(self, job_id: str) -> "IngestionCheckpoint":
+        return IngestionCheckpoint(self, job_id)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class IngestionCheckpoint:
+    """One job's checkpoint hooks, as used by DocumentAgent.process_documents"""
+
+    def __init__(self, store: IngestionJobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+        self._states = {f["source"]: f["state"] for f in store.get_files(job_id)}
+
+    def is_started(self, source: str) -> bool:
+        """File got past parsing in an earlier run (its chunks may be partly stored)"""
+        return self._states.get(source, FILE_PENDING) not in (FILE_PENDING, FILE_FAILED)
+
+    def file_state(self, source: str, state: str, chunks: int = None, error: str = None, sha256: str = None):
+        self._states[source] = state
+        self.store.set_file_state(self.job_id, source, state, chunks=chunks, error=error, sha256=sha256)
+
+    def load_embeddings(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        return self.store.load_embeddings(self.job_id, ids)
+
+    def save_embeddings(self, source: str, ids: Sequence[str], embeddings: np.ndarray):
+        self.store.save_embeddings(self.job_id, source, ids, embeddings)
+
+    def mark_stored(self, source: str, ids: Sequence[str]):
+        self.store.mark_stored(self.job_id, source, ids)
@@ -0,0 +1,69 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Small English stopword list (Weaviate's BM25 uses a similar "en" preset)
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its of on or our so "
+    "that the their then there these they this to was we what when where which who why will with "
+    "you your do does can could should would".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class KeywordIndex:
+    """In-memory BM25 index over (row, text) pairs, built in one pass.
+
+    Postings are kept as NumPy arrays per term so a query costs one
+    vectorised update per query term.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        lengths: Dict[int, int] = {}
+        for row, text in rows:
+            counts = Counter(tokenize(text))
+            lengths[row] = sum(counts.values())
+            for term, tf in counts.items():
+                rows_list, tfs = postings.setdefault(term, ([], []))
+                rows_list.append(row)
+                tfs.append(tf)
+
+        self.size = max(lengths, default=-1) + 1
+        self.doc_count = len(lengths)
+        self.doc_len = np.zeros(self.size, dtype=np.float32)
+        for row, length in lengths.items():
+            self.doc_len[row] = length
+        self.avgdl = float(np.mean(list(lengths.values()))) if lengths else 0.0
+        self.postings = {
+            term: (np.asarray(r, dtype=np.int64), np.asarray(t, dtype=np.float32))
+            for term, (r, t) in postings.items()
+        }
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, BM25 scores) of the top ``k`` rows that match at least one query term"""
+        if not self.doc_count or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            rows, tfs = posting
+            idf = math.log(1.0 + (self.doc_count - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[rows] / max(self.avgdl, 1e-9))
+            scores[rows] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched])]
+        return matched, scores[matched]
@@ -0,0 +1,542 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from config import Config
+from services.keyword_index import KeywordIndex
+from services.quantization import VectorCodec, normalize
+from services.vector_backends import (
+    Embeddings,
+    HYBRID_QUERY_PROPERTIES,
+    RETURN_PROPERTIES,
+    SearchResults,
+    VectorBackend,
+    fused_relevance,
+    ingestion_report,
+    reciprocal_rank_fusion,
+)
+
+try:
+    import hnswlib
+    HNSW_AVAILABLE = True
+except ImportError:
+    HNSW_AVAILABLE = False
+
+
+class LocalVectorStore(VectorBackend):
+    """In-process vector store backed by a memory-mapped float32 file.
+
+    Vectors are L2-normalised on write so cosine similarity is a dot product.
+    Search is exact NumPy by default; ``index="hnsw"`` (needs the optional
+    ``hnswlib`` package) or ``index="ivf"`` trade exactness for speed on
+    larger collections. ``hybrid_search`` adds an in-memory BM25 index fused
+    with the vector ranking by RRF. Indexes are rebuilt lazily after writes.
+
+    With VECTOR_DIMS / VECTOR_PRECISION (see services.quantization) the index
+    holds truncated, int8 or binary codes instead; searches over-fetch
+    candidates from the codes and rescore them against the full-precision
+    vectors, which stay on disk and are only paged in for those candidates.
+
+    Layout of ``<directory>``: ``vectors.f32`` (rows x dim float32, or
+    ``vectors.i8`` + ``scales.f32`` / ``vectors.b1`` codes plus ``full.f32``
+    when compressed), ``documents.jsonl`` (one property dict per row, object
+    id under ``_id``) and ``meta.json``. Deletes and upserts tombstone rows;
+    the files are compacted once more than half of the rows are dead.
+    """
+
+    backend_name = "local"
+
+    def __init__(self, directory: str = None, index: str = None, collection_name: str = None):
+        self.collection_name = collection_name or Config.WEAVIATE_CLASS_NAME
+        self.directory = directory or os.path.join(Config.LOCAL_VECTOR_STORE_DIR, self.collection_name)
+        self.index_type = (index or Config.LOCAL_VECTOR_INDEX).lower()
+        if self.index_type == "hnsw" and not HNSW_AVAILABLE:
+            print("⚠️ hnswlib not installed; LocalVectorStore falls back to exact search")
+            self.index_type = "exact"
+        if self.index_type not in ("exact", "hnsw", "ivf"):
+            raise ValueError(f"Unknown LOCAL_VECTOR_INDEX '{self.index_type}' (expected exact, hnsw or ivf)")
+
+        self._lock = threading.RLock()
+        self.codec = VectorCodec()
+        self._vectors: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._full: Optional[np.memmap] = None
+        self._documents: List[Dict[str, Any]] = []
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._deleted: set = set()
+        self.dim = 0
+        self.count = 0
+        self.capacity = 0
+        self._index = None
+        self._version = 0
+        self._index_version = -1
+        self._keyword_index = None
+        self._keyword_version = -1
+        self._load()
+
+    # ── persistence ─────────────────────────────────────────
+    @property
+    def _vectors_path(self) -> str:
+        suffix = {"float32": "f32", "int8": "i8", "binary": "b1"}[self.codec.precision]
+        return os.path.join(self.directory, f"vectors.{suffix}")
+
+    @property
+    def compressed(self) -> bool:
+        return self.dim > 0 and self.codec.is_compressed(self.dim)
+
+    def _array_specs(self):
+        """(attribute, path, dtype, row width) of each row-aligned array; width None = one value per row"""
+        specs = [("_vectors", self._vectors_path, self.codec.dtype, self.codec.code_width(self.dim))]
+        if self.codec.precision == "int8":
+            specs.append(("_scales", os.path.join(self.directory, "scales.f32"), np.float32, None))
+        if self.compressed:
+            specs.append(("_full", os.path.join(self.directory, "full.f32"), np.float32, self.dim))
+        return specs
+
+    def _open_arrays(self):
+        for attr, path, dtype, width in self._array_specs():
+            shape = (self.capacity,) if width is None else (self.capacity, width)
+            setattr(self, attr, np.memmap(path, dtype=dtype, mode="r+", shape=shape))
+
+    @property
+    def _documents_path(self) -> str:
+        return os.path.join(self.directory, "documents.jsonl")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    @property
+    def _staging_path(self) -> str:
+        return self.directory.rstrip(os.sep) + ".compacting"
+
+    @property
+    def _retired_path(self) -> str:
+        return self.directory.rstrip(os.sep) + ".retired"
+
+    def _recover_compaction(self):
+        """Finish or roll back a compaction that crashed while swapping directories"""
+        retired = self._retired_path
+        if os.path.exists(os.path.join(retired, "meta.json")) and not os.path.exists(self._meta_path):
+            # Crashed between the two renames: the pre-compaction files are complete, use them
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.replace(retired, self.directory)
+            print(f"⚠️ Restored {self.directory} from an interrupted compaction")
+        shutil.rmtree(retired, ignore_errors=True)
+        shutil.rmtree(self._staging_path, ignore_errors=True)
+
+    def _load(self):
+        self._recover_compaction()
+        os.makedirs(self.directory, exist_ok=True)
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        self.dim, self.count, self.capacity = meta["dim"], meta["count"], meta["capacity"]
+        # The encoding a store was written with wins over the current settings
+        stored = VectorCodec(meta.get("precision", "float32"), meta.get("index_dim", 0))
+        if self.dim and (stored.precision, stored.index_dim(self.dim)) != (self.codec.precision, self.codec.index_dim(self.dim)):
+            print(
+                f"⚠️ {self.directory} holds {stored.precision} vectors with {stored.index_dim(self.dim)} dims; "
+                f"wipe and re-ingest to apply VECTOR_PRECISION={self.codec.precision}, VECTOR_DIMS={self.codec.dims}"
+            )
+        self.codec = stored
+        with open(self._documents_path) as f:
+            self._documents = [json.loads(line) for line in f if line.strip()][: self.count]
+        self.count = min(self.count, len(self._documents))
+        self._ids = [doc.pop("_id", None) or str(uuid.uuid4()) for doc in self._documents]
+        self._deleted = {row for row in meta.get("deleted", []) if row < self.count}
+        self._rows = {object_id: row for row, object_id in enumerate(self._ids) if row not in self._deleted}
+        if self.capacity:
+            self._open_arrays()
+
+    def _write_meta(self):
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "dim": self.dim,
+                "count": self.count,
+                "capacity": self.capacity,
+                "collection": self.collection_name,
+                "precision": self.codec.precision,
+                "index_dim": self.codec.index_dim(self.dim) if self.dim else self.codec.dims,
+                "deleted": sorted(self._deleted),
+            }, f)
+        os.replace(tmp, self._meta_path)
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self.capacity:
+            return
+        new_capacity = max(needed, self.capacity * 2, 1024)
+        for attr, path, dtype, width in self._array_specs():
+            array = getattr(self, attr)
+            if array is not None:
+                array.flush()
+                setattr(self, attr, None)
+                del array
+            with open(path, "ab") as f:
+                f.truncate(new_capacity * (width or 1) * np.dtype(dtype).itemsize)
+        self.capacity = new_capacity
+        self._open_arrays()
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        return normalize(matrix)
+
+    def _full_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Full-precision (unit) vectors of rows"""
+        if self._full is not None:
+            return np.array(self._full[rows])
+        return np.array(self._vectors[rows])
+
+    def _index_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Float32 vectors in index space (decoded codes) for building HNSW/IVF indexes"""
+        if self.codec.precision == "float32":
+            return np.asarray(self._vectors[rows])
+        scales = self._scales[rows] if self._scales is not None else None
+        return self.codec.decode(np.asarray(self._vectors[rows]), scales, self.codec.index_dim(self.dim))
+
+    @property
+    def live_count(self) -> int:
+        return self.count - len(self._deleted)
+
+    def _live_rows(self) -> np.ndarray:
+        rows = np.arange(self.count)
+        if self._deleted:
+            rows = rows[~np.isin(rows, np.fromiter(self._deleted, dtype=np.int64))]
+        return rows
+
+    def _tombstone(self, object_ids) -> int:
+        removed = 0
+        for object_id in object_ids:
+            row = self._rows.pop(object_id, None)
+            if row is not None:
+                self._deleted.add(row)
+                removed += 1
+        return removed
+
+    def compact(self):
+        """Rewrite the store without tombstoned rows.
+
+        Live rows are written with the store's own codec into a staging
+        directory next to it, which then replaces the original; until that
+        swap the original files stay untouched, so a crash loses nothing.
+        """
+        with self._lock:
+            if not self._deleted:
+                return
+            staging, retired = self._staging_path, self._retired_path
+            shutil.rmtree(staging, ignore_errors=True)
+            compacted = LocalVectorStore(directory=staging, index=self.index_type, collection_name=self.collection_name)
+            # Same encoding as the rows being copied, whatever VECTOR_PRECISION / VECTOR_DIMS say now
+            compacted.codec = self.codec
+            with contextlib.redirect_stdout(io.StringIO()):
+                for documents, vectors, ids in self.iter_documents(batch_size=4096):
+                    compacted.store_documents_sync(documents, vectors, ids=ids)
+            compacted.close()
+            del compacted
+            self.close()
+            self._vectors = self._scales = self._full = None
+            shutil.rmtree(retired, ignore_errors=True)
+            os.replace(self.directory, retired)
+            os.replace(staging, self.directory)
+            shutil.rmtree(retired, ignore_errors=True)
+
+            self._documents, self._ids = [], []
+            self._rows, self._deleted = {}, set()
+            self.dim = self.count = self.capacity = 0
+            self._index, self._index_version = None, -1
+            self._version += 1
+            self._load()
+        print(f"🧹 Compacted local collection: {self.collection_name} ({self.live_count} rows)")
+
+    # ── VectorBackend surface ───────────────────────────────
+    def store_documents_sync(self, documents: List[Dict[str, Any]], embeddings: Embeddings, ids: List[str] = None) -> Dict[str, Any]:
+        start = time.perf_counter()
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if not documents:
+            return ingestion_report(stored=0, failed=0, total_bytes=0, elapsed=0.0)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(documents):
+            raise ValueError(f"Expected {len(documents)} embedding rows, got shape {embeddings.shape}")
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in documents]
+        if len(ids) != len(documents):
+            raise ValueError(f"Expected {len(documents)} ids, got {len(ids)}")
+
+        with self._lock:
+            if self.dim == 0:
+                self.dim = embeddings.shape[1]
+            elif embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {embeddings.shape[1]} does not match store dim {self.dim}")
+
+            # Upsert: rows already stored under these ids become tombstones
+            self._tombstone(ids)
+            first, end = self.count, self.count + len(documents)
+            self._ensure_capacity(end)
+            vectors = self._normalize(embeddings)
+            codes, scales = self.codec.encode(vectors)
+            self._vectors[first:end] = codes
+            self._vectors.flush()
+            if self._scales is not None:
+                self._scales[first:end] = scales
+                self._scales.flush()
+            if self._full is not None:
+                self._full[first:end] = vectors
+                self._full.flush()
+            with open(self._documents_path, "a") as f:
+                for object_id, doc in zip(ids, documents):
+                    f.write(json.dumps({**doc, "_id": object_id}, default=str) + "\n")
+            self._documents.extend(documents)
+            self._ids.extend(ids)
+            for row, object_id in enumerate(ids, start=first):
+                # A repeated id inside one call keeps its last row
+                if object_id in self._rows:
+                    self._deleted.add(self._rows[object_id])
+                self._rows[object_id] = row
+            self.count = end
+            self._version += 1
+            self._write_meta()
+        print(f"✅ Stored {len(documents)} documents in local vector store")
+        total_bytes = int(codes.nbytes) + sum(len(str(doc.get("content", ""))) for doc in documents)
+        return ingestion_report(stored=len(documents), failed=0, total_bytes=total_bytes, elapsed=time.perf_counter() - start)
+
+    async def store_documents(self, documents: List[Dict[str, Any]], embeddings: Embeddings, ids: List[str] = None) -> Dict[str, Any]:
+        """Store documents with embeddings (float32 matrix, row i belongs to documents[i])"""
+        return await asyncio.to_thread(self.store_documents_sync, documents, embeddings, ids)
+
+    async def get_source_chunks(self, sources: Sequence[str]) -> Dict[str, Dict[str, str]]:
+        """Map each source to {object id: source_hash} for its stored chunks"""
+        wanted = set(sources)
+        chunks: Dict[str, Dict[str, str]] = {source: {} for source in wanted}
+        with self._lock:
+            for object_id, row in self._rows.items():
+                doc = self._documents[row]
+                if doc.get("source") in wanted:
+                    chunks[doc["source"]][object_id] = doc.get("source_hash")
+        return chunks
+
+    async def delete_objects(self, ids: Sequence[str]) -> int:
+        """Tombstone objects by id (compacting when most rows are dead)"""
+        with self._lock:
+            removed = self._tombstone(ids)
+            if removed:
+                self._version += 1
+                self._write_meta()
+            needs_compaction = len(self._deleted) * 2 > self.count
+        if needs_compaction:
+            await asyncio.to_thread(self.compact)
+        if removed:
+            print(f"🗑️ Deleted {removed} objects from local vector store")
+        return removed
+
+    async def similarity_search(self, query_embedding: Sequence[float], limit: int = 5) -> List[Dict[str, Any]]:
+        """Search for similar documents (off the event loop: a lazy HNSW/IVF rebuild can take seconds)"""
+        return await asyncio.to_thread(self.similarity_search_sync, query_embedding, limit)
+
+    async def hybrid_search(self, query: str, query_embedding: Sequence[float], limit: int = 5, alpha: float = None) -> List[Dict[str, Any]]:
+        """BM25 + vector search fused with reciprocal rank fusion, off the event loop"""
+        return await asyncio.to_thread(self.hybrid_search_sync, query, query_embedding, limit, alpha)
+
+    def similarity_search_sync(self, query_embedding: Sequence[float], limit: int = 5) -> List[Dict[str, Any]]:
+        """Search for similar documents"""
+        try:
+            requested = int(limit)
+        except Exception:
+            requested = 5
+        try:
+            with self._lock:
+                if self.live_count == 0:
+                    return []
+                query_vec = self._normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+                ids, scores = self._search(query_vec, min(requested, self.live_count))
+                results = [
+                    {**{k: self._documents[i].get(k) for k in RETURN_PROPERTIES}, "distance": float(1.0 - s)}
+                    for i, s in zip(ids, scores)
+                ]
+            print(f"📚 Local vector search ({self.index_type}): returned {len(results)} objects (requested {requested})")
+            return results
+        except Exception as e:
+            print(f"Search error: {e}")
+            return SearchResults(error=str(e))
+
+    def hybrid_search_sync(self, query: str, query_embedding: Sequence[float], limit: int = 5, alpha: float = None) -> List[Dict[str, Any]]:
+        """BM25 + vector search fused with reciprocal rank fusion (alpha weights the vector ranking)"""
+        alpha = Config.HYBRID_ALPHA if alpha is None else alpha
+        try:
+            requested = int(limit)
+        except Exception:
+            requested = 5
+        try:
+            with self._lock:
+                if self.live_count == 0:
+                    return []
+                # Each side ranks a wider candidate pool before fusion
+                pool = min(self.live_count, max(requested * 4, 20))
+                query_vec = self._normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+                vector_rows, vector_scores = self._search(query_vec, pool)
+                # Like Weaviate's max_vector_distance: weak vector matches do not enter the fusion
+                vector_rows = vector_rows[vector_scores >= 1.0 - Config.HYBRID_MAX_VECTOR_DISTANCE]
+                keyword_rows, _ = self._keyword_search(query, pool)
+                fused = reciprocal_rank_fusion([
+                    (alpha, vector_rows.tolist()),
+                    (1.0 - alpha, keyword_rows.tolist()),
+                ])
+                top = sorted(fused.items(), key=lambda item: -item[1])[:requested]
+                results = [
+                    {
+                        **{k: self._documents[row].get(k) for k in RETURN_PROPERTIES},
+                        "score": score,
+                        "distance": 1.0 - fused_relevance(score),
+                    }
+                    for row, score in top
+                ]
+            print(f"📚 Local hybrid search (alpha={alpha}): returned {len(results)} objects (requested {requested})")
+            return results
+        except Exception as e:
+            print(f"Hybrid search error: {e}")
+            return SearchResults(self.similarity_search_sync(query_embedding, limit), error=f"hybrid search failed: {e}")
+
+    def wipe_collection(self):
+        """Delete all documents in collection"""
+        with self._lock:
+            self._vectors = self._scales = self._full = None
+            self.codec = VectorCodec()
+            self._documents, self._ids = [], []
+            self._rows, self._deleted = {}, set()
+            self.dim = self.count = self.capacity = 0
+            self._index, self._index_version = None, -1
+            self._version += 1
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.makedirs(self.directory, exist_ok=True)
+        print(f"✅ Wiped local collection: {self.collection_name}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get collection statistics"""
+        return {
+            "status": "healthy",
+            "total_documents": self.live_count,
+            "collection_exists": True,
+            "backend": self.backend_name,
+            "index": self.index_type,
+            "dim": self.dim,
+            "precision": self.codec.precision,
+            "index_dim": self.codec.index_dim(self.dim) if self.dim else 0,
+            "vector_bytes": self.count * self.codec.bytes_per_vector(self.dim) if self.dim else 0,
+            "full_vector_bytes": self.count * self.dim * 4 if self.compressed else 0,
+            "deleted_rows": len(self._deleted),
+        }
+
+    def iter_documents(self, batch_size: int = 256) -> Iterator[Tuple[List[Dict[str, Any]], np.ndarray, List[str]]]:
+        live = self._live_rows()
+        for start in range(0, len(live), batch_size):
+            rows = live[start:start + batch_size]
+            yield [self._documents[r] for r in rows], self._full_vectors(rows), [self._ids[r] for r in rows]
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+
+    # ── search internals ────────────────────────────────────
+    def _keyword_search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._keyword_index is None or self._keyword_version != self._version:
+            live = self._live_rows()
+            self._keyword_index = KeywordIndex(
+                (int(row), " ".join(str(self._documents[row].get(p) or "") for p in HYBRID_QUERY_PROPERTIES))
+                for row in live
+            )
+            self._keyword_version = self._version
+        return self._keyword_index.search(query, k)
+
+    def _search(self, query_vec: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.compressed:
+            return self._search_index(query_vec, k)
+        # Over-fetch from the codes, then rescore at full precision
+        factor = max(1, Config.VECTOR_RESCORE_FACTOR)
+        rows, scores = self._search_index(query_vec, min(k * factor, self.live_count))
+        if factor == 1 or self._full is None or not len(rows):
+            return rows[:k], scores[:k]
+        scores = np.asarray(self._full[np.sort(rows)] @ query_vec)
+        rows = np.sort(rows)
+        top = np.argsort(-scores)[:k]
+        return rows[top], scores[top]
+
+    def _search_index(self, query_vec: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self.index_type == "hnsw":
+            return self._search_hnsw(query_vec, k)
+        if self.index_type == "ivf" and self.live_count >= Config.LOCAL_IVF_MIN_ROWS:
+            return self._search_ivf(query_vec, k)
+        return self._search_exact(query_vec, k, self._live_rows())
+
+    def _search_exact(self, query_vec: np.ndarray, k: int, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.compressed:
+            if len(candidates) == self.count:
+                scores = self._vectors[: self.count] @ query_vec
+            else:
+                candidates = np.sort(candidates)
+                scores = self._vectors[candidates] @ query_vec
+        else:
+            prepared = self.codec.prepare_query(query_vec)
+            if len(candidates) == self.count:
+                codes, scales = self._vectors[: self.count], self._scales[: self.count] if self._scales is not None else None
+            else:
+                candidates = np.sort(candidates)
+                codes, scales = self._vectors[candidates], self._scales[candidates] if self._scales is not None else None
+            scores = self.codec.score(codes, scales, prepared)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return candidates[top], scores[top]
+
+    def _search_hnsw(self, query_vec: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._index is None or self._index_version != self._version:
+            live = self._live_rows()
+            index = hnswlib.Index(space="ip", dim=self.codec.index_dim(self.dim))
+            index.init_index(max_elements=max(len(live), 1), ef_construction=200, M=16)
+            index.add_items(self._index_vectors(live), live)
+            self._index, self._index_version = index, self._version
+        self._index.set_ef(max(Config.LOCAL_HNSW_EF, k))
+        labels, distances = self._index.knn_query(self.codec.truncate(query_vec), k=k)
+        # hnswlib "ip" distance is 1 - dot
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def _search_ivf(self, query_vec: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._index is None or self._index_version != self._version:
+            self._index, self._index_version = self._build_ivf(), self._version
+        centroids, assignments = self._index
+        nprobe = min(Config.LOCAL_IVF_NPROBE, len(centroids))
+        probe = np.argpartition(-(centroids @ self.codec.truncate(query_vec)), nprobe - 1)[:nprobe]
+        # Tombstoned rows are assigned -1 and never probed
+        candidates = np.flatnonzero(np.isin(assignments, probe))
+        if len(candidates) < k:
+            return self._search_exact(query_vec, k, self._live_rows())
+        return self._search_exact(query_vec, k, candidates)
+
+    def _build_ivf(self, iterations: int = 10):
+        """Spherical k-means over a sample; returns (centroids, row -> list assignment)"""
+        vectors = self._index_vectors(np.arange(self.count))
+        live = self._live_rows()
+        nlist = max(1, int(np.sqrt(len(live))))
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(live, size=min(len(live), nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = self._normalize(centroids)
+        assignments = np.empty(self.count, dtype=np.int32)
+        for start in range(0, self.count, 4096):
+            assignments[start:start + 4096] = np.argmax(vectors[start:start + 4096] @ centroids.T, axis=1)
+        if self._deleted:
+            assignments[np.fromiter(self._deleted, dtype=np.int64)] = -1
+        return centroids, assignments
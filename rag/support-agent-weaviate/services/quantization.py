@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+from config import Config
+
+PRECISIONS = ("float32", "int8", "binary")
+
+# Rows scored per block: int8 codes are widened to float32 a cache-sized slice at a time
+SCORE_BLOCK_ROWS = 1024
+
+# Set bits per byte, for NumPy builds without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    bitwise_count = getattr(np, "bitwise_count", None)
+    return bitwise_count(values) if bitwise_count is not None else _POPCOUNT[values]
+
+
+class VectorCodec:
+    """How embeddings are kept in a vector index.
+
+    ``dims`` keeps only the leading dimensions, re-normalised (Matryoshka
+    truncation; Qwen3-Embedding is trained for it), and ``precision`` stores
+    each kept dimension as float32, int8 (with a per-vector scale) or a single
+    sign bit. Scores computed from codes are approximate: searches over-fetch
+    VECTOR_RESCORE_FACTOR x the requested results and rescore them against the
+    full-precision vectors.
+    """
+
+    def __init__(self, precision: str = None, dims: int = None):
+        self.precision = (precision or Config.VECTOR_PRECISION).lower()
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"Unknown VECTOR_PRECISION '{self.precision}' (expected {', '.join(PRECISIONS)})")
+        self.dims = max(0, int(Config.VECTOR_DIMS if dims is None else dims))
+
+    def index_dim(self, full_dim: int) -> int:
+        return self.dims if 0 < self.dims < full_dim else full_dim
+
+    def is_compressed(self, full_dim: int) -> bool:
+        return self.precision != "float32" or self.index_dim(full_dim) < full_dim
+
+    def code_width(self, full_dim: int) -> int:
+        """Columns per row of the code matrix"""
+        dim = self.index_dim(full_dim)
+        return (dim + 7) // 8 if self.precision == "binary" else dim
+
+    @property
+    def dtype(self):
+        return {"float32": np.float32, "int8": np.int8, "binary": np.uint8}[self.precision]
+
+    def bytes_per_vector(self, full_dim: int) -> int:
+        width = self.code_width(full_dim) * np.dtype(self.dtype).itemsize
+        return width + 4 if self.precision == "int8" else width
+
+    def truncate(self, vectors: np.ndarray) -> np.ndarray:
+        """Leading index_dim dimensions of each row, re-normalised to unit length"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = self.index_dim(vectors.shape[-1])
+        return normalize(vectors[..., :dim]) if dim < vectors.shape[-1] else normalize(vectors)
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """(codes, per-row scales or None) for full-dimension embeddings"""
+        truncated = self.truncate(vectors)
+        if self.precision == "float32":
+            return truncated, None
+        if self.precision == "binary":
+            return np.packbits(truncated > 0, axis=-1), None
+        scales = np.abs(truncated).max(axis=-1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(truncated / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def decode(self, codes: np.ndarray, scales: np.ndarray = None, dim: int = None) -> np.ndarray:
+        """Approximate float32 vectors back from codes (unit length)"""
+        if self.precision == "float32":
+            return np.asarray(codes, dtype=np.float32)
+        if self.precision == "binary":
+            signs = np.unpackbits(codes, axis=-1, count=dim).astype(np.float32) * 2.0 - 1.0
+            return normalize(signs)
+        return normalize(np.asarray(codes, dtype=np.float32) * scales[:, None])
+
+    def prepare_query(self, query: np.ndarray):
+        """Query in the form score() expects: truncated float, or packed sign bits for binary"""
+        truncated = self.truncate(np.asarray(query, dtype=np.float32).reshape(-1))
+        if self.precision == "binary":
+            return np.packbits(truncated > 0), len(truncated)
+        return truncated, len(truncated)
+
+    def score(self, codes: np.ndarray, scales: Optional[np.ndarray], prepared) -> np.ndarray:
+        """Approximate cosine similarity of each code row to a prepare_query() result"""
+        query, dim = prepared
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = np.asarray(codes[start:start + SCORE_BLOCK_ROWS])
+            if self.precision == "binary":
+                # Sign agreement: 1 - 2 * hamming / dim
+                hamming = _popcount(np.bitwise_xor(block, query)).sum(axis=1, dtype=np.int32)
+                scores[start:start + len(block)] = 1.0 - 2.0 * hamming / dim
+            elif self.precision == "int8":
+                scores[start:start + len(block)] = (block.astype(np.float32) @ query) * scales[start:start + len(block)]
+            else:
+                scores[start:start + len(block)] = block @ query
+        return scores
+
+
+def rescore(candidates: Sequence, full_vectors: np.ndarray, query: np.ndarray, limit: int) -> Tuple[list, np.ndarray]:
+    """Re-rank candidates by exact cosine against their full-precision vectors; returns (top candidates, scores)"""
+    if not len(candidates):
+        return [], np.empty(0, dtype=np.float32)
+    scores = normalize(full_vectors) @ normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+    order = np.argsort(-scores)[:limit]
+    return [candidates[i] for i in order], scores[order]
+
+
+class FullVectorStore:
+    """Full-precision vectors by object id (SQLite, float32 blobs).
+
+    Used by backends whose index holds truncated/quantized vectors, to rescore
+    the over-fetched candidates of a search.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.FULL_VECTOR_STORE_PATH
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (object_id TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def put_many(self, ids: Sequence[str], vectors: np.ndarray):
+        rows = [
+            (str(object_id), np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+            for object_id, vector in zip(ids, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO vectors (object_id, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def get_many(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        ids = [str(object_id) for object_id in ids]
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT object_id, vector FROM vectors WHERE object_id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for object_id, blob in rows:
+                    found[object_id] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def delete_many(self, ids: Sequence[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM vectors WHERE object_id = ?", [(str(object_id),) for object_id in ids])
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM vectors")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
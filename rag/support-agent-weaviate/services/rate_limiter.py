@@ -0,0 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limiter for calls to a rate-limited upstream.
+
+    The number of in-flight calls grows by roughly one per fully successful
+    window (additive increase) and is halved whenever the upstream signals
+    overload with a 429/5xx (multiplicative decrease).
+    """
+
+    def __init__(self, max_limit: int, initial_limit: int = None, min_limit: int = 1):
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        start = initial_limit if initial_limit is not None else self.max_limit
+        self.limit = float(min(max(start, self.min_limit), self.max_limit))
+        self.in_flight = 0
+        self.throttle_events = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.current_limit)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    async def on_success(self):
+        async with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    async def on_throttle(self):
+        async with self._condition:
+            self.throttle_events += 1
+            self.limit = max(float(self.min_limit), self.limit / 2.0)
@@ -0,0 +1,120 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config import Config
+
+
+class RetrievalCache:
+    """In-memory TTL cache of vector search results.
+
+    Exact hits are keyed by (normalised query, limit) and skip both the query
+    embedding and the search. With ``semantic_threshold`` set, a miss whose
+    query embedding has cosine similarity >= threshold with a cached query
+    (same limit) reuses that query's results. Call ``invalidate()`` whenever
+    the underlying collection changes.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None, semantic_threshold: float = None):
+        self.ttl = ttl if ttl is not None else Config.RETRIEVAL_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else Config.RETRIEVAL_CACHE_MAX_ENTRIES
+        self.semantic_threshold = semantic_threshold if semantic_threshold is not None else Config.RETRIEVAL_CACHE_SEMANTIC_THRESHOLD
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # key -> (expires_at, normalised query embedding or None, results)
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Optional[np.ndarray], List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return re.sub(r"\s+", " ", query or "").strip().lower().rstrip("?!. ")
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return bool(self.semantic_threshold) and self.semantic_threshold > 0
+
+    def get(self, query: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Exact lookup; counts a hit but not a miss (the semantic lookup may still hit)"""
+        key = (self.normalize_query(query), int(limit))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._copy(entry[2])
+
+    def get_semantic(self, query_embedding: Sequence[float], limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Return results of the closest cached query above the cosine threshold"""
+        if not self.semantic_enabled:
+            return None
+        query_vec = self._unit(query_embedding)
+        now = time.monotonic()
+        with self._lock:
+            keys, vectors = [], []
+            for key, (expires_at, vec, _) in self._entries.items():
+                if vec is not None and key[1] == int(limit) and expires_at >= now and vec.shape == query_vec.shape:
+                    keys.append(key)
+                    vectors.append(vec)
+            if not vectors:
+                return None
+            scores = np.stack(vectors) @ query_vec
+            best = int(np.argmax(scores))
+            if scores[best] < self.semantic_threshold:
+                return None
+            self._entries.move_to_end(keys[best])
+            self.semantic_hits += 1
+            return self._copy(self._entries[keys[best]][2])
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def put(self, query: str, limit: int, query_embedding: Optional[Sequence[float]], results: List[Dict[str, Any]]):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        key = (self.normalize_query(query), int(limit))
+        vec = self._unit(query_embedding) if self.semantic_enabled and query_embedding is not None else None
+        results = self._copy(results)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, vec, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drop every cached result (the collection changed)"""
+        with self._lock:
+            if self._entries:
+                self._entries.clear()
+            self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "ttl_s": self.ttl,
+                "semantic_threshold": self.semantic_threshold if self.semantic_enabled else None,
+            }
+
+    @staticmethod
+    def _copy(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Callers get (and hand in) their own hit dicts, so mutating them never changes the cache"""
+        return [dict(doc) for doc in results]
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
@@ -0,0 +1,228 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from config import Config
+from services.tokenizer import get_token_counter
+
+# (previous summary, turns to fold in as (user, assistant)) -> new summary
+Summarizer = Callable[[str, List[Tuple[str, str]]], Awaitable[str]]
+
+# Conversation id used when the caller gives none (scripts, the legacy single-chat behaviour)
+DEFAULT_CONVERSATION = "default"
+
+
+class ConversationSession:
+    """History of one conversation: a rolling summary plus the most recent turns verbatim"""
+
+    def __init__(self, conversation_id: str):
+        self.conversation_id = conversation_id
+        self.summary = ""
+        self.summary_tokens = 0
+        # (user, assistant, tokens of both)
+        self.turns: List[Tuple[str, str, int]] = []
+        self.last_used = time.monotonic()
+        self.compactions = 0
+        self.compaction: Optional[asyncio.Task] = None
+
+    @property
+    def tokens(self) -> int:
+        return self.summary_tokens + sum(turn[2] for turn in self.turns)
+
+
+class SessionStore:
+    """Per-conversation chat memory with a token budget, in memory.
+
+    Conversations are keyed by id (Slack channel + thread, Streamlit
+    session). Once a conversation's history exceeds ``token_budget``, its
+    oldest turns are folded into a rolling summary of at most
+    ``summary_tokens`` by ``summarizer`` (in the background; the next
+    request of that conversation waits for it). Sessions idle for longer
+    than ``ttl`` are dropped, and at most ``max_sessions`` are kept, least
+    recently used evicted first.
+    """
+
+    def __init__(
+        self,
+        summarizer: Summarizer = None,
+        token_budget: int = None,
+        summary_tokens: int = None,
+        ttl: float = None,
+        max_sessions: int = None,
+    ):
+        self.summarizer = summarizer
+        self.token_budget = token_budget if token_budget is not None else Config.SESSION_TOKEN_BUDGET
+        self.summary_tokens = summary_tokens if summary_tokens is not None else Config.SESSION_SUMMARY_MAX_TOKENS
+        self.ttl = ttl if ttl is not None else Config.SESSION_TTL
+        self.max_sessions = max_sessions if max_sessions is not None else Config.SESSION_MAX_SESSIONS
+        self.evictions = 0
+        self.compactions = 0
+        self.summary_failures = 0
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count_tokens(self, text: str) -> int:
+        return get_token_counter().count(text) if text else 0
+
+    def _evict_expired(self, now: float):
+        # Sessions are in last-used order, so the expired ones are at the front
+        while self.ttl > 0 and self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.ttl:
+                break
+            self._drop(session.conversation_id)
+        while len(self._sessions) > max(1, self.max_sessions):
+            self._drop(next(iter(self._sessions)))
+
+    def _drop(self, conversation_id: str):
+        session = self._sessions.pop(conversation_id)
+        if session.compaction is not None:
+            session.compaction.cancel()
+        self.evictions += 1
+
+    def _session(self, conversation_id: str, create: bool) -> Optional[ConversationSession]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(conversation_id)
+            if session is None and create:
+                session = self._sessions[conversation_id] = ConversationSession(conversation_id)
+                self._evict_expired(now)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(conversation_id)
+            return session
+
+    def has(self, conversation_id: str) -> bool:
+        """Whether the conversation has history (an idle or evicted one has none)"""
+        session = self._session(conversation_id or DEFAULT_CONVERSATION, create=False)
+        return session is not None and bool(session.summary or session.turns)
+
+    async def load(self, conversation_id: str) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """Chat messages to resend for this conversation, plus its size stats"""
+        session = self._session(conversation_id or DEFAULT_CONVERSATION, create=False)
+        if session is None:
+            return [], {"history_tokens": 0, "history_turns": 0, "summarized": False}
+        await self._wait_for_compaction(session)
+        messages = []
+        if session.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{session.summary}"})
+        for user, assistant, _ in session.turns:
+            messages.append({"role": "user", "content": user})
+            messages.append({"role": "assistant", "content": assistant})
+        return messages, {
+            "history_tokens": session.tokens,
+            "history_turns": len(session.turns),
+            "summarized": bool(session.summary),
+        }
+
+    def save_turn(self, conversation_id: str, user: str, assistant: str):
+        """Record a finished exchange; compacts the conversation once it is over budget"""
+        session = self._session(conversation_id or DEFAULT_CONVERSATION, create=True)
+        session.turns.append((user, assistant, self.count_tokens(user) + self.count_tokens(assistant)))
+        if session.tokens <= self.token_budget or (session.compaction is not None and not session.compaction.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            # No event loop to summarize on: fold into the truncated transcript right away
+            count, folded = self._split(session)
+            if count:
+                self._fold(session, count, self._fallback_summary(session.summary, folded))
+            return
+        session.compaction = loop.create_task(self._compact(session))
+
+    async def _wait_for_compaction(self, session: ConversationSession):
+        task = session.compaction
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            await asyncio.shield(task)
+            return
+        if task is not None:
+            task.cancel()
+            session.compaction = None
+        if session.tokens > self.token_budget:
+            # Compaction was scheduled on another (since closed) loop and never ran: compact here instead
+            await self._compact(session)
+
+    def _split(self, session: ConversationSession) -> Tuple[int, List[Tuple[str, str]]]:
+        """How many of the oldest turns to fold so the rest fit next to a full-size summary.
+
+        Turns are kept up to half of that room only, so a conversation is
+        compacted every few turns rather than on every turn once it is full.
+        """
+        keep_budget = (self.token_budget - self.summary_tokens) // 2
+        kept, count = 0, len(session.turns)
+        for _, _, tokens in reversed(session.turns):
+            if kept + tokens > keep_budget:
+                break
+            kept += tokens
+            count -= 1
+        return count, [(user, assistant) for user, assistant, _ in session.turns[:count]]
+
+    async def _compact(self, session: ConversationSession):
+        try:
+            count, folded = self._split(session)
+            if not count:
+                return
+            summary = None
+            if self.summarizer is not None:
+                try:
+                    summary = await self.summarizer(session.summary, folded)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.summary_failures += 1
+                    print(f"⚠️ Conversation summary failed, keeping a truncated transcript: {e}")
+            self._fold(session, count, summary or self._fallback_summary(session.summary, folded))
+        finally:
+            session.compaction = None
+
+    def _fold(self, session: ConversationSession, count: int, summary: str):
+        summary = self._truncate(summary.strip())
+        # Turns saved while the summary was being written were appended after the folded ones
+        del session.turns[:count]
+        session.summary = summary
+        session.summary_tokens = self.count_tokens(summary)
+        session.compactions += 1
+        self.compactions += 1
+
+    def _fallback_summary(self, previous: str, folded: List[Tuple[str, str]]) -> str:
+        lines = [previous] if previous else []
+        lines += [f"User: {user}\nAssistant: {assistant}" for user, assistant in folded]
+        return "\n".join(lines)
+
+    def _truncate(self, text: str) -> str:
+        """Keep the most recent part of ``text`` within the summary budget"""
+        tokens = self.count_tokens(text)
+        while text and tokens > self.summary_tokens:
+            # Cut the overflowing share of the characters from the front, then re-count
+            text = text[max(1, len(text) * (tokens - self.summary_tokens) // tokens):]
+            tokens = self.count_tokens(text)
+        return text
+
+    def clear(self, conversation_id: str = None):
+        """Forget one conversation, or every conversation when no id is given"""
+        with self._lock:
+            ids = [conversation_id] if conversation_id is not None else list(self._sessions)
+            for cid in ids:
+                session = self._sessions.pop(cid, None)
+                if session is not None and session.compaction is not None:
+                    session.compaction.cancel()
+
+    def turns(self, conversation_id: str = None) -> int:
+        session = self._session(conversation_id or DEFAULT_CONVERSATION, create=False)
+        return len(session.turns) if session is not None else 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "tokens": sum(session.tokens for session in self._sessions.values()),
+                "evictions": self.evictions,
+                "compactions": self.compactions,
+                "summary_failures": self.summary_failures,
+                "token_budget": self.token_budget,
+            }
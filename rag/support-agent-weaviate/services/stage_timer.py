@@ -0,0 +1,36 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Sequence
+
+
+class StageTimer:
+    """Busy time and item counts per pipeline stage.
+
+    ``overlap`` is total busy time divided by wall time: 1.0 means the stages
+    ran back to back, higher values mean they overlapped.
+    """
+
+    def __init__(self, stages: Sequence[str]):
+        self.busy = {stage: 0.0 for stage in stages}
+        self.items = {stage: 0 for stage in stages}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def measure(self, stage: str, items: int = 1):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.busy[stage] += time.perf_counter() - start
+            self.items[stage] += items
+
+    def report(self) -> Dict[str, Any]:
+        wall = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "wall_s": round(wall, 3),
+            "overlap": round(sum(self.busy.values()) / wall, 2),
+            "stages": {
+                stage: {"busy_s": round(self.busy[stage], 3), "items": self.items[stage]}
+                for stage in self.busy
+            },
+        }
@@ -0,0 +1,85 @@
+import threading
+from typing import Callable, Iterable, List
+
+from config import Config
+
+# Rough average for English prose with BPE tokenizers (Qwen, GPT, ...)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for batching and budgeting"""
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def estimate_total_tokens(texts: Iterable[str]) -> int:
+    return sum(estimate_tokens(t) for t in texts)
+
+
+class TokenCounter:
+    """Batch token counting for chunk sizing; ``name`` says which tokenizer is behind it"""
+
+    def __init__(self, name: str, count_batch: Callable[[List[str]], List[int]]):
+        self.name = name
+        self.count_batch = count_batch
+
+    def count(self, text: str) -> int:
+        return self.count_batch([text])[0]
+
+
+_counter: TokenCounter = None
+_counter_lock = threading.Lock()
+
+
+def _model_counter() -> TokenCounter:
+    # Optional: `uv pip install tokenizers` and hub access for the embedding model's own vocabulary
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_pretrained(Config.EMBEDDING_MODEL)
+    return TokenCounter(
+        Config.EMBEDDING_MODEL,
+        lambda texts: [len(e.ids) for e in tokenizer.encode_batch(texts, add_special_tokens=False)],
+    )
+
+
+def _tiktoken_counter() -> TokenCounter:
+    import tiktoken
+    from llama_index.core.utils import get_tokenizer
+
+    get_tokenizer()  # loads cl100k_base from llama_index's bundled cache, no download
+    encoding = tiktoken.get_encoding("cl100k_base")
+    # encode_ordinary_batch spins up a thread pool per call; per-text encoding is cheaper for chunk-sized batches
+    return TokenCounter("cl100k_base", lambda texts: [len(encoding.encode_ordinary(t)) for t in texts])
+
+
+def get_token_counter() -> TokenCounter:
+    """Tokenizer used for token-sized chunks (CHUNK_TOKENIZER).
+
+    The default ``cl100k_base`` is what SentenceSplitter counts with and needs
+    no network. ``auto`` prefers the embedding model's tokenizer (fetched from
+    the Hugging Face hub on first use) and falls back to cl100k_base, then to
+    the character estimate.
+    """
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            choice = Config.CHUNK_TOKENIZER
+            loaders = {
+                "model": [_model_counter],
+                "cl100k_base": [_tiktoken_counter],
+                "estimate": [],
+            }.get(choice, [_model_counter, _tiktoken_counter])
+            for loader in loaders:
+                try:
+                    _counter = loader()
+                    break
+                except ImportError:
+                    continue
+                except Exception as e:
+                    print(f"⚠️ Tokenizer {loader.__name__.strip('_')} unavailable: {e}")
+            if _counter is None:
+                _counter = TokenCounter("estimate", lambda texts: [estimate_tokens(t) for t in texts])
+            print(f"🔤 Chunk tokenizer: {_counter.name}")
+        return _counter
@@ -0,0 +1,65 @@
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Dict, List
+
+from config import Config
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def spool_upload(fileobj: BinaryIO, filename: str) -> Dict:
+    """Stream an upload to disk once, hashing it on the way.
+
+    The file keeps its original name inside a private temp directory so the
+    parser sees the real file name. Returns ``{"filename", "path", "size",
+    "sha256", "upload_dir"}``; pass it to the workflow instead of the bytes
+    and release it with ``discard_uploads`` afterwards.
+    """
+    directory = tempfile.mkdtemp(prefix="upload_", dir=Config.UPLOAD_SPOOL_DIR or None)
+    path = os.path.join(directory, os.path.basename(filename))
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as out:
+            while block := fileobj.read(COPY_BUFFER_SIZE):
+                digest.update(block)
+                out.write(block)
+                size += len(block)
+    except Exception:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return {"filename": filename, "path": path, "size": size, "sha256": digest.hexdigest(), "upload_dir": directory}
+
+
+def file_sha256(path: str) -> str:
+    """sha256 of a file read through mmap (no heap copy of the contents)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256(b"").hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+def upload_size(file_data: Dict) -> int:
+    """Byte size of an upload given as ``content`` bytes or a spooled ``path``"""
+    if "path" in file_data:
+        return file_data.get("size", os.path.getsize(file_data["path"]))
+    return len(file_data.get("content") or b"")
+
+
+def upload_sha256(file_data: Dict) -> str:
+    """Content hash of an upload given as ``content`` bytes or a spooled ``path``"""
+    if "path" in file_data:
+        return file_data.get("sha256") or file_sha256(file_data["path"])
+    return hashlib.sha256(file_data["content"]).hexdigest()
+
+
+def discard_uploads(uploaded_files: List[Dict]):
+    """Remove the spool directories created by spool_upload (files given by any other path are left alone)"""
+    for file_data in uploaded_files:
+        directory = file_data.get("upload_dir")
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,273 @@
+import hashlib
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+import numpy as np
+from config import Config
+
+Embeddings = Union[np.ndarray, Sequence[Sequence[float]]]
+
+# Properties returned with every search hit, shared by all backends
+RETURN_PROPERTIES = ["content", "source", "document_id", "chunk_index", "file_type"]
+
+# Text properties searched by the keyword (BM25) side of hybrid search
+HYBRID_QUERY_PROPERTIES = ["content", "source"]
+
+# Reciprocal-rank-fusion constant (same as Weaviate's rankedFusion)
+RRF_K = 60
+
+# Namespace for deterministic chunk ids; changing it re-keys every stored chunk
+CHUNK_ID_NAMESPACE = uuid.UUID("8f5d3c8e-2b7a-4f0e-9a51-6c1d2e4b7f90")
+
+
+def content_hash(data: Union[str, bytes]) -> str:
+    """sha256 hex digest of a chunk's text or a source file's bytes"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_id(source: str, chunk_hash: str) -> str:
+    """Deterministic object id for a chunk: identical (source, content) always maps to the same id"""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{source}\x00{chunk_hash}"))
+
+
+def ingestion_report(stored: int, failed: int, total_bytes: int, elapsed: float, **extra) -> Dict[str, Any]:
+    """Uniform store_documents result with throughput figures"""
+    elapsed = max(elapsed, 1e-9)
+    return {
+        "stored": stored,
+        "failed": failed,
+        "elapsed_s": round(elapsed, 3),
+        "objects_per_s": stored / elapsed,
+        "mb_per_s": total_bytes / 2**20 / elapsed,
+        "bytes": total_bytes,
+        **extra,
+    }
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Tuple[float, Sequence[Any]]], k: int = RRF_K) -> Dict[Any, float]:
+    """Fuse (weight, ranked ids) lists: score(id) = sum(weight / (k + rank)), rank starting at 0"""
+    scores: Dict[Any, float] = {}
+    for weight, ids in ranked_lists:
+        for rank, item in enumerate(ids):
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank)
+    return scores
+
+
+def fused_relevance(score: float, k: int = RRF_K) -> float:
+    """Map an RRF score (weights summing to 1) to 0..1; 1 = ranked first by both keyword and vector search"""
+    return max(0.0, min(1.0, float(score) * k))
+
+
+class SearchResults(list):
+    """Search hits plus ``error``: set when the search failed (or fell back) and the hits are empty or degraded"""
+
+    def __init__(self, hits=(), error: str = None):
+        super().__init__(hits)
+        self.error = error
+
+
+def search_error(results: List[Dict[str, Any]]) -> str:
+    """The error a search swallowed, or None for a clean result"""
+    return getattr(results, "error", None)
+
+
+def merge_ingestion_reports(reports: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-batch ingestion_report() dicts into one"""
+    errors = [e for r in reports for e in r.get("errors", [])]
+    return ingestion_report(
+        stored=sum(r.get("stored", 0) for r in reports),
+        failed=sum(r.get("failed", 0) for r in reports),
+        total_bytes=sum(r.get("bytes", 0) for r in reports),
+        elapsed=sum(r.get("elapsed_s", 0.0) for r in reports),
+        batches=len(reports),
+        errors=list(dict.fromkeys(errors))[:5],
+    )
+
+
+class VectorBackend(ABC):
+    """Storage/retrieval surface shared by Weaviate and the local vector store.
+
+    ``similarity_search`` returns property dicts with a cosine ``distance``
+    (0 = identical), so ``1 - distance`` is a relevance score regardless of
+    the backend. ``hybrid_search`` results carry the same key, derived from
+    the fused score (``distance = 1 - fused_relevance(score)``).
+    """
+
+    backend_name = "base"
+
+    @abstractmethod
+    async def store_documents(self, documents: List[Dict[str, Any]], embeddings: Embeddings, ids: List[str] = None) -> Dict[str, Any]:
+        """Store documents; row i of embeddings belongs to documents[i]. Returns an ingestion_report().
+
+        With ``ids`` the write is an upsert: an existing object with the same id is replaced.
+        Backends that can fail part of a write list the failed rows under ``failed_indices``.
+        """
+
+    @abstractmethod
+    async def get_source_chunks(self, sources: Sequence[str]) -> Dict[str, Dict[str, str]]:
+        """Map each source to ``{object id: source_hash}`` for the chunks already stored"""
+
+    @abstractmethod
+    async def delete_objects(self, ids: Sequence[str]) -> int:
+        """Delete objects by id; returns how many were removed"""
+
+    @abstractmethod
+    async def similarity_search(self, query_embedding: Sequence[float], limit: int = 5) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` nearest documents"""
+
+    async def hybrid_search(self, query: str, query_embedding: Sequence[float], limit: int = 5, alpha: float = None) -> List[Dict[str, Any]]:
+        """Keyword (BM25) + vector search fused with RRF; ``alpha`` weights the vector side.
+
+        Vector hits further than HYBRID_MAX_VECTOR_DISTANCE are left out, so a
+        query matching neither side returns nothing.
+
+        Backends without keyword search fall back to ``similarity_search``.
+        """
+        return await self.similarity_search(query_embedding, limit)
+
+    @abstractmethod
+    def wipe_collection(self):
+        """Delete all documents"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Return health and size information"""
+
+    @abstractmethod
+    def iter_documents(self, batch_size: int = 256) -> Iterator[Tuple[List[Dict[str, Any]], np.ndarray, List[str]]]:
+        """Yield (documents, embeddings, ids) batches of everything stored (used to hydrate replicas)"""
+
+    async def connect(self):
+        """Open loop-bound connections (called once on the workflow's event loop)"""
+
+    async def aclose(self):
+        """Close loop-bound connections"""
+
+    def close(self):
+        """Release connections/file handles"""
+
+
+class ReadReplicaVectorService(VectorBackend):
+    """Serve reads from a local replica kept in front of a primary backend.
+
+    Writes go to the primary first and are then mirrored into the replica;
+    searches hit the replica and fall back to the primary if the replica is
+    empty or fails. Meant for small, hot knowledge bases where a network
+    round trip per query dominates latency.
+    """
+
+    backend_name = "replica"
+
+    def __init__(self, primary: VectorBackend, replica: VectorBackend, hydrate: bool = True):
+        self.primary = primary
+        self.replica = replica
+        if hydrate and not self.replica.get_stats().get("total_documents"):
+            self.hydrate()
+
+    def hydrate(self) -> int:
+        """Copy every document from the primary into the (empty) replica"""
+        copied = 0
+        try:
+            for documents, embeddings, ids in self.primary.iter_documents():
+                self.replica.store_documents_sync(documents, embeddings, ids=ids)
+                copied += len(documents)
+            print(f"✅ Hydrated local replica with {copied} documents")
+        except Exception as e:
+            print(f"❌ Replica hydration failed: {e}")
+        return copied
+
+    async def store_documents(self, documents: List[Dict[str, Any]], embeddings: Embeddings, ids: List[str] = None) -> Dict[str, Any]:
+        """Write the primary, then mirror only the objects it accepted (under the same ids) into the replica"""
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in documents]
+        result = await self.primary.store_documents(documents, embeddings, ids=ids)
+        failed = set(result.get("failed_indices") or ())
+        if result.get("failed") and not failed:
+            print("⚠️ Primary did not report which objects failed; skipping the replica write")
+            return result
+        accepted = [i for i in range(len(documents)) if i not in failed]
+        if not accepted:
+            return result
+        try:
+            await self.replica.store_documents(
+                [documents[i] for i in accepted],
+                np.asarray(embeddings, dtype=np.float32)[accepted],
+                ids=[ids[i] for i in accepted],
+            )
+        except Exception as e:
+            print(f"⚠️ Replica write failed, re-hydrating on next start: {e}")
+        return result
+
+    async def get_source_chunks(self, sources: Sequence[str]) -> Dict[str, Dict[str, str]]:
+        return await self.primary.get_source_chunks(sources)
+
+    async def delete_objects(self, ids: Sequence[str]) -> int:
+        deleted = await self.primary.delete_objects(ids)
+        try:
+            await self.replica.delete_objects(ids)
+        except Exception as e:
+            print(f"⚠️ Replica delete failed: {e}")
+        return deleted
+
+    async def similarity_search(self, query_embedding: Sequence[float], limit: int = 5) -> List[Dict[str, Any]]:
+        try:
+            if self.replica.get_stats().get("total_documents"):
+                results = await self.replica.similarity_search(query_embedding, limit)
+                if not search_error(results):
+                    return results
+                print(f"⚠️ Replica search failed, using primary: {search_error(results)}")
+        except Exception as e:
+            print(f"⚠️ Replica search failed, using primary: {e}")
+        return await self.primary.similarity_search(query_embedding, limit)
+
+    async def hybrid_search(self, query: str, query_embedding: Sequence[float], limit: int = 5, alpha: float = None) -> List[Dict[str, Any]]:
+        try:
+            if self.replica.get_stats().get("total_documents"):
+                results = await self.replica.hybrid_search(query, query_embedding, limit, alpha)
+                if not search_error(results):
+                    return results
+                print(f"⚠️ Replica hybrid search failed, using primary: {search_error(results)}")
+        except Exception as e:
+            print(f"⚠️ Replica hybrid search failed, using primary: {e}")
+        return await self.primary.hybrid_search(query, query_embedding, limit, alpha)
+
+    def wipe_collection(self):
+        self.primary.wipe_collection()
+        self.replica.wipe_collection()
+
+    def iter_documents(self, batch_size: int = 256) -> Iterator[Tuple[List[Dict[str, Any]], np.ndarray, List[str]]]:
+        return self.primary.iter_documents(batch_size)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.primary.get_stats()
+        stats["replica"] = self.replica.get_stats()
+        return stats
+
+    async def connect(self):
+        await self.primary.connect()
+        await self.replica.connect()
+
+    async def aclose(self):
+        await self.primary.aclose()
+        await self.replica.aclose()
+
+    def close(self):
+        self.primary.close()
+        self.replica.close()
+
+
+def create_vector_service(backend: str = None) -> VectorBackend:
+    """Build the configured vector backend: "weaviate", "local" or "replica" (local in front of Weaviate)"""
+    backend = (backend or Config.VECTOR_BACKEND).lower()
+    if backend == "local":
+        from services.local_vector_store import LocalVectorStore
+        return LocalVectorStore()
+    if backend == "weaviate":
+        from services.vector_service import VectorService
+        return VectorService()
+    if backend == "replica":
+        from services.local_vector_store import LocalVectorStore
+        from services.vector_service import VectorService
+        return ReadReplicaVectorService(VectorService(), LocalVectorStore())
+    raise ValueError(f"Unknown VECTOR_BACKEND '{backend}' (expected weaviate, local or replica)")
@@ -1,18 +1,72 @@
+import asyncio
+import time
+import uuid
 import weaviate
 from weaviate.auth import AuthApiKey
 from weaviate.classes import config, query
 from weaviate.classes.data import DataObject
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Sequence, Tuple, Union
+import numpy as np
 from config import Config
+from services.quantization import FullVectorStore, VectorCodec, rescore
+from services.vector_backends import HYBRID_QUERY_PROPERTIES, RETURN_PROPERTIES, SearchResults, VectorBackend, fused_relevance, ingestion_report
 
-class VectorService:
-    def __init__(self):
-        self.client = weaviate.connect_to_weaviate_cloud(
+# Largest retrieval limit the UI offers; sizes Weaviate's own rescoring window
+MAX_RETRIEVAL_LIMIT = 20
+
+class VectorService(VectorBackend):
+    """Weaviate Cloud backend.
+
+    VECTOR_PRECISION int8/binary turns on Weaviate's scalar/binary
+    quantization (Weaviate rescores from its uncompressed vectors on disk).
+    VECTOR_DIMS stores truncated vectors; the full-precision ones go to a
+    local FullVectorStore and near_vector results are over-fetched and
+    rescored against them.
+    """
+
+    backend_name = "weaviate"
+
+    def __init__(self, client: weaviate.WeaviateClient = None, async_client: weaviate.WeaviateAsyncClient = None):
+        # Sync client handles schema/admin calls; the async client (opened in connect()) serves the hot path
+        self.client = client or weaviate.connect_to_weaviate_cloud(
             cluster_url=Config.WEAVIATE_URL,
             auth_credentials=AuthApiKey(Config.WEAVIATE_API_KEY)
         )
+        self.async_client = async_client
         self.collection_name = Config.WEAVIATE_CLASS_NAME
+        self.codec = VectorCodec()
+        self._full_vectors = None
         self._ensure_collection()
+        self._ensure_properties()
+        self._ensure_quantizer()
+    
+    @property
+    def full_vectors(self) -> FullVectorStore:
+        """Side store of full-precision vectors, used only when VECTOR_DIMS truncates"""
+        if self._full_vectors is None and self.codec.dims:
+            self._full_vectors = FullVectorStore()
+        return self._full_vectors
+    
+    async def connect(self):
+        """Open the native async client on the running event loop (one per process)"""
+        if self.async_client is None and Config.WEAVIATE_USE_ASYNC:
+            self.async_client = weaviate.use_async_with_weaviate_cloud(
+                cluster_url=Config.WEAVIATE_URL,
+                auth_credentials=AuthApiKey(Config.WEAVIATE_API_KEY)
+            )
+        if self.async_client is not None and not self.async_client.is_connected():
+            await self.async_client.connect()
+            print("🔌 Weaviate async client connected")
+    
+    async def aclose(self):
+        if self.async_client is not None:
+            await self.async_client.close()
+            self.async_client = None
+    
+    def _async_collection(self):
+        if self.async_client is not None and self.async_client.is_connected():
+            return self.async_client.collections.get(self.collection_name)
+        return None
     
     def _ensure_collection(self):
         """Create the schema if it doesn't exist"""
@@ -23,6 +77,7 @@ class VectorService:
             name=self.collection_name,
             description="Document chunks for RAG workflow",
             vectorizer_config=config.Configure.Vectorizer.none(),
+            vector_index_config=config.Configure.VectorIndex.hnsw(quantizer=self._quantizer(config.Configure)),
             properties=[
                 # FIX: Use keyword arguments 'name' and 'data_type'
                 config.Property(name="content", data_type=config.DataType.TEXT),
@@ -34,26 +89,196 @@ class VectorService:
                 config.Property(name="ingestion_date", data_type=config.DataType.TEXT),
                 config.Property(name="batch_id", data_type=config.DataType.TEXT),
                 config.Property(name="chunk_size", data_type=config.DataType.INT),
+                *self._incremental_properties(),
             ],
         )
         print(f"✅ Created Weaviate collection: {self.collection_name}")
     
-    async def store_documents(self, documents: List[Dict[str, Any]], embeddings: List[List[float]]):
-        """Store documents with embeddings"""
+    @staticmethod
+    def _incremental_properties() -> List[config.Property]:
+        return [
+            config.Property(name="content_hash", data_type=config.DataType.TEXT, skip_vectorization=True),
+            config.Property(name="source_hash", data_type=config.DataType.TEXT, skip_vectorization=True),
+        ]
+    
+    def _ensure_properties(self):
+        """Add the hash properties used by incremental ingestion to collections created before them"""
+        try:
+            collection = self.client.collections.get(self.collection_name)
+            existing = {prop.name for prop in collection.config.get().properties}
+            for prop in self._incremental_properties():
+                if prop.name not in existing:
+                    collection.config.add_property(prop)
+                    print(f"✅ Added property '{prop.name}' to {self.collection_name}")
+        except Exception as e:
+            print(f"⚠️ Could not verify schema properties: {e}")
+    
+    def _quantizer(self, namespace):
+        """Weaviate quantizer for VECTOR_PRECISION (Configure or Reconfigure flavour), None for float32"""
+        rescore_limit = max(1, Config.VECTOR_RESCORE_FACTOR) * MAX_RETRIEVAL_LIMIT
+        if self.codec.precision == "int8":
+            return namespace.VectorIndex.Quantizer.sq(rescore_limit=rescore_limit)
+        if self.codec.precision == "binary":
+            return namespace.VectorIndex.Quantizer.bq(rescore_limit=rescore_limit)
+        return None
+    
+    def _ensure_quantizer(self):
+        """Turn on VECTOR_PRECISION compression for collections created without it (it cannot be turned off again)"""
+        quantizer = self._quantizer(config.Reconfigure)
+        if quantizer is None:
+            return
+        try:
+            collection = self.client.collections.get(self.collection_name)
+            index_config = collection.config.get().vector_index_config
+            if index_config is not None and index_config.quantizer is None:
+                collection.config.update(vector_index_config=config.Reconfigure.VectorIndex.hnsw(quantizer=quantizer))
+                print(f"✅ Enabled {self.codec.precision} vector compression on {self.collection_name}")
+        except Exception as e:
+            print(f"⚠️ Could not enable vector compression: {e}")
+    
+    async def _call(self, namespace: str, method: str, **kwargs):
+        """Call collection.<namespace>.<method> on the async client, or the sync client off the event loop"""
+        async_collection = self._async_collection()
+        if async_collection is not None:
+            return await getattr(getattr(async_collection, namespace), method)(**kwargs)
         collection = self.client.collections.get(self.collection_name)
+        return await asyncio.to_thread(getattr(getattr(collection, namespace), method), **kwargs)
+    
+    async def store_documents(self, documents: List[Dict[str, Any]], embeddings: Union[np.ndarray, Sequence[Sequence[float]]], ids: List[str] = None) -> Dict[str, Any]:
+        """Store documents with embeddings (row i belongs to documents[i]).
+
+        Objects are inserted in batches of WEAVIATE_INSERT_BATCH_SIZE, up to
+        WEAVIATE_INSERT_CONCURRENCY at a time (async client, or worker threads
+        with the sync client) so the event loop stays free. Only objects
+        Weaviate reports as failed are retried. Passing ``ids`` makes the
+        write an upsert (batch inserts replace objects with the same uuid).
+        """
+        async_collection = self._async_collection()
+        collection = async_collection or self.client.collections.get(self.collection_name)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.full_vectors is not None and len(documents):
+            # Keep full precision locally (keyed by object uuid) and send Weaviate the truncated vectors
+            ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in documents]
+            await asyncio.to_thread(self.full_vectors.put_many, ids, embeddings)
+            embeddings = self.codec.truncate(embeddings)
+        batch_size = max(1, Config.WEAVIATE_INSERT_BATCH_SIZE)
+        semaphore = asyncio.Semaphore(max(1, Config.WEAVIATE_INSERT_CONCURRENCY))
+        start = time.perf_counter()
         
-        data_objects = [
-            DataObject(properties=doc, vector=embedding)
-            for doc, embedding in zip(documents, embeddings)
-        ]
+        pending = list(range(len(documents)))
+        errors: Dict[int, str] = {}
+        total_bytes = 0
+        attempts = 0
+        for attempt in range(Config.WEAVIATE_INSERT_MAX_RETRIES + 1):
+            attempts = attempt + 1
+            batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            outcomes = await asyncio.gather(*[
+                self._insert_batch(collection, async_collection is not None, indices, documents, embeddings, ids, semaphore)
+                for indices in batches
+            ])
+            errors = {}
+            for batch_bytes, batch_errors in outcomes:
+                total_bytes += batch_bytes
+                errors.update(batch_errors)
+            if not errors:
+                break
+            pending = sorted(errors)
+            if attempt < Config.WEAVIATE_INSERT_MAX_RETRIES:
+                print(f"⚠️ {len(pending)} objects failed to insert; retrying (attempt {attempt + 2})")
+                await asyncio.sleep(min(10.0, 0.5 * (2 ** attempt)))
         
-        collection.data.insert_many(data_objects)
-        print(f"✅ Stored {len(data_objects)} documents in Weaviate")
+        report = ingestion_report(
+            stored=len(documents) - len(errors),
+            failed=len(errors),
+            total_bytes=total_bytes,
+            elapsed=time.perf_counter() - start,
+            attempts=attempts,
+            errors=list(dict.fromkeys(errors.values()))[:5],
+            failed_indices=sorted(errors),
+        )
+        print(
+            f"✅ Stored {report['stored']} documents in Weaviate "
+            f"({report['objects_per_s']:.0f} obj/s, {report['mb_per_s']:.2f} MB/s, {report['failed']} failed)"
+        )
+        return report
+    
+    async def _insert_batch(self, collection, is_async: bool, indices: List[int], documents, embeddings: np.ndarray, ids, semaphore: asyncio.Semaphore):
+        """Insert one batch off the event loop; returns (payload bytes, {document index: error})"""
+        async with semaphore:
+            # Rows are passed as NumPy views; the Weaviate client serialises them per batch
+            data_objects = [
+                DataObject(properties=documents[i], vector=embeddings[i], uuid=ids[i] if ids is not None else None)
+                for i in indices
+            ]
+            payload_bytes = int(embeddings[indices].nbytes) + sum(len(str(documents[i].get("content", ""))) for i in indices)
+            try:
+                if is_async:
+                    result = await collection.data.insert_many(data_objects)
+                else:
+                    result = await asyncio.to_thread(collection.data.insert_many, data_objects)
+            except Exception as e:
+                return payload_bytes, {i: f"{type(e).__name__}: {e}" for i in indices}
+            failed = {indices[pos]: getattr(err, "message", str(err)) for pos, err in (result.errors or {}).items()}
+            return payload_bytes, failed
+    
+    async def get_source_chunks(self, sources: Sequence[str], page_size: int = 1000, concurrency: int = 8) -> Dict[str, Dict[str, str]]:
+        """Map each source to {object uuid: source_hash} for its stored chunks.
+
+        Sources are queried concurrently (up to ``concurrency`` at a time).
+        ``source`` is a word-tokenized TEXT property, so one ``contains_any``
+        filter over several names would match every chunk sharing a token
+        such as "pdf"; each source keeps its own ``equal`` query instead.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_source(source: str) -> Dict[str, str]:
+            found: Dict[str, str] = {}
+            offset = 0
+            async with semaphore:
+                while True:
+                    response = await self._call(
+                        "query", "fetch_objects",
+                        filters=query.Filter.by_property("source").equal(source),
+                        limit=page_size,
+                        offset=offset,
+                        return_properties=["source_hash"],
+                    )
+                    objs = response.objects or []
+                    for obj in objs:
+                        found[str(obj.uuid)] = obj.properties.get("source_hash")
+                    if len(objs) < page_size:
+                        break
+                    offset += page_size
+            return found
+
+        sources = list(dict.fromkeys(sources))
+        found = await asyncio.gather(*(fetch_source(source) for source in sources))
+        return dict(zip(sources, found))
+    
+    async def delete_objects(self, ids: Sequence[str], batch_size: int = 1000) -> int:
+        """Delete objects by uuid in batches"""
+        ids = list(ids)
+        deleted = 0
+        for i in range(0, len(ids), batch_size):
+            result = await self._call(
+                "data", "delete_many",
+                where=query.Filter.by_id().contains_any(ids[i:i + batch_size]),
+            )
+            deleted += result.successful
+            if self.full_vectors is not None:
+                await asyncio.to_thread(self.full_vectors.delete_many, ids[i:i + batch_size])
+            if result.failed:
+                print(f"⚠️ {result.failed} objects could not be deleted")
+        if deleted:
+            print(f"🗑️ Deleted {deleted} objects from Weaviate")
+        return deleted
     
     async def similarity_search(self, query_embedding: List[float], limit: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
-        collection = self.client.collections.get(self.collection_name)
-        
+        """Search for similar documents (async client when connected, otherwise off the event loop).
+
+        With VECTOR_DIMS, VECTOR_RESCORE_FACTOR x limit candidates are fetched
+        with the truncated query and re-ranked by full-precision cosine.
+        """
         try:
             # Ensure limit is an int and add debug logging
             try:
@@ -62,14 +287,18 @@ class VectorService:
                 requested = 5
             print(f"📚 Weaviate near_vector: requested limit={requested}")
 
-            response = collection.query.near_vector(
-                near_vector=query_embedding,
-                limit=requested,
+            rescoring = self.full_vectors is not None and Config.VECTOR_RESCORE_FACTOR > 1
+            search_args = dict(
+                near_vector=self.codec.truncate(query_embedding).tolist(),
+                limit=requested * Config.VECTOR_RESCORE_FACTOR if rescoring else requested,
                 return_metadata=query.MetadataQuery(distance=True),
-                return_properties=["content", "source", "document_id", "chunk_index", "file_type"]
+                return_properties=RETURN_PROPERTIES
             )
+            response = await self._call("query", "near_vector", **search_args)
             
             objs = response.objects or []
+            if rescoring and objs:
+                objs = await self._rescore(objs, query_embedding, requested)
             results = [
                 {**obj.properties, "distance": obj.metadata.distance}
                 for obj in objs
@@ -78,12 +307,55 @@ class VectorService:
             return results
         except Exception as e:
             print(f"Search error: {e}")
-            return []
+            return SearchResults(error=str(e))
+    
+    async def _rescore(self, objs: List[Any], query_embedding: Sequence[float], limit: int) -> List[Any]:
+        """Re-rank near_vector hits by full-precision cosine (hits without a full vector keep their distance)"""
+        full = await asyncio.to_thread(self.full_vectors.get_many, [str(obj.uuid) for obj in objs])
+        known = [obj for obj in objs if str(obj.uuid) in full]
+        ranked, scores = rescore(known, np.stack([full[str(obj.uuid)] for obj in known]) if known else None, query_embedding, len(known))
+        for obj, score in zip(ranked, scores):
+            obj.metadata.distance = float(1.0 - score)
+        unknown = [obj for obj in objs if str(obj.uuid) not in full]
+        return sorted(ranked + unknown, key=lambda obj: obj.metadata.distance)[:limit]
+    
+    async def hybrid_search(self, query_text: str, query_embedding: Sequence[float], limit: int = 5, alpha: float = None) -> List[Dict[str, Any]]:
+        """BM25 + near_vector in a single Weaviate request, fused by reciprocal rank (truncated query with VECTOR_DIMS)"""
+        alpha = Config.HYBRID_ALPHA if alpha is None else alpha
+        try:
+            try:
+                requested = int(limit)
+            except Exception:
+                requested = 5
+            response = await self._call(
+                "query", "hybrid",
+                query=query_text,
+                vector=self.codec.truncate(query_embedding).tolist(),
+                alpha=alpha,
+                max_vector_distance=Config.HYBRID_MAX_VECTOR_DISTANCE,
+                fusion_type=query.HybridFusion.RANKED,
+                query_properties=HYBRID_QUERY_PROPERTIES,
+                limit=requested,
+                return_metadata=query.MetadataQuery(score=True),
+                return_properties=RETURN_PROPERTIES
+            )
+            results = []
+            for obj in response.objects or []:
+                score = obj.metadata.score or 0.0
+                results.append({**obj.properties, "score": score, "distance": 1.0 - fused_relevance(score)})
+            print(f"📚 Weaviate hybrid (alpha={alpha}): returned {len(results)} objects (requested {requested})")
+            return results
+        except Exception as e:
+            print(f"Hybrid search error, falling back to near_vector: {e}")
+            results = await self.similarity_search(query_embedding, limit)
+            return SearchResults(results, error=f"hybrid search failed: {e}")
     
     def wipe_collection(self):
         """Delete all documents in collection"""
         if self.client.collections.exists(self.collection_name):
             self.client.collections.delete(self.collection_name)
+        if self.full_vectors is not None:
+            self.full_vectors.clear()
         self._ensure_collection()
         print(f"✅ Wiped collection: {self.collection_name}")
     
@@ -95,7 +367,38 @@ class VectorService:
             return {
                 "status": "healthy",
                 "total_documents": response.total_count,
-                "collection_exists": True
+                "collection_exists": True,
+                "backend": self.backend_name,
+                "precision": self.codec.precision,
+                "index_dim": self.codec.dims or "full",
             }
         except Exception as e:
             return {"error": str(e), "collection_exists": False}
+    
+    def iter_documents(self, batch_size: int = 256) -> Iterator[Tuple[List[Dict[str, Any]], np.ndarray, List[str]]]:
+        """Yield (documents, embeddings, ids) batches for every object in the collection"""
+        collection = self.client.collections.get(self.collection_name)
+        documents, vectors, ids = [], [], []
+        for obj in collection.iterator(include_vector=True):
+            documents.append(dict(obj.properties))
+            vectors.append(obj.vector["default"] if isinstance(obj.vector, dict) else obj.vector)
+            ids.append(str(obj.uuid))
+            if len(documents) >= batch_size:
+                yield documents, self._export_vectors(vectors, ids), ids
+                documents, vectors, ids = [], [], []
+        if documents:
+            yield documents, self._export_vectors(vectors, ids), ids
+    
+    def _export_vectors(self, vectors: List, ids: List[str]) -> np.ndarray:
+        """Stored vectors, swapped for the full-precision ones when Weaviate holds truncated vectors"""
+        if self.full_vectors is None:
+            return np.asarray(vectors, dtype=np.float32)
+        full = self.full_vectors.get_many(ids)
+        if len(full) < len(ids):
+            raise Exception(f"{len(ids) - len(full)} objects have no full-precision vector; re-ingest them to export")
+        return np.stack([full[object_id] for object_id in ids])
+    
+    def close(self):
+        self.client.close()
+        if self._full_vectors is not None:
+            self._full_vectors.close()
@@ -1,29 +1,20 @@
 import os
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_sdk.errors import SlackApiError
 from dotenv import load_dotenv
+from config import Config
 from graph.workflow import RAGWorkflow
 import logging
-import asyncio
 import re
+import time
 
 load_dotenv()
 
-# Initialize Slack app
-app = App(
-    token=os.environ.get("SLACK_BOT_TOKEN"),
-    signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
-)
-
-# Initialize RAG workflow
-rag_workflow = RAGWorkflow()
-
-# Get bot user ID for mention handling
-try:
-    bot_user_id = app.client.auth_test()["user_id"]
-except Exception as e:
-    print(f"Warning: Could not get bot user ID: {e}")
-    bot_user_id = None
+# Set by create_app(); nothing is built at import time, so parse workers can import this module cheaply
+app = None
+rag_workflow = None
+bot_user_id = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -89,84 +80,180 @@ def post_thinking(client, channel: str, thread_ts: str | None) -> str:
     )
     return res["ts"]
 
-def update_message(client, channel: str, ts: str, final_text: str):
-    client.chat_update(channel=channel, ts=ts, text=final_text)
+def retry_after(error: SlackApiError) -> float | None:
+    """Seconds Slack asks us to wait when rate limited (None for other errors)"""
+    if error.response is None or error.response.status_code != 429:
+        return None
+    return float(error.response.headers.get("Retry-After", 1))
 
-def run_rag_sync(query: str, user_email: str):
-    return asyncio.run(
+def update_message(client, channel: str, ts: str, final_text: str):
+    try:
+        client.chat_update(channel=channel, ts=ts, text=final_text)
+    except SlackApiError as e:
+        # The final answer must land even if streamed updates used up the rate limit
+        wait = retry_after(e)
+        if wait is None:
+            raise
+        time.sleep(wait)
+        client.chat_update(channel=channel, ts=ts, text=final_text)
+
+class StreamingMessage:
+    """Progressively edits the placeholder message, coalescing updates to one per interval"""
+
+    def __init__(self, client, channel: str, ts: str, interval: float = None):
+        self.client = client
+        self.channel = channel
+        self.ts = ts
+        self.interval = Config.SLACK_STREAM_UPDATE_INTERVAL if interval is None else interval
+        self.next_update = 0.0
+        self.updates = 0
+
+    def update(self, text: str):
+        now = time.monotonic()
+        if now < self.next_update:
+            return  # newer text arrives with the next delta or the final update
+        try:
+            self.client.chat_update(channel=self.channel, ts=self.ts, text=text)
+            self.updates += 1
+            self.next_update = now + self.interval
+        except SlackApiError as e:
+            wait = retry_after(e)
+            if wait is None:
+                raise
+            self.next_update = now + max(wait, self.interval)
+
+def conversation_id(channel: str, thread_ts: str | None = None) -> str:
+    """Conversation memory key: one per thread, or per channel for slash commands"""
+    return f"slack:{channel}:{thread_ts}" if thread_ts else f"slack:{channel}"
+
+def conversation_query(client, channel: str, parent_ts: str, text: str) -> str:
+    """The question to send: just the latest message once the thread has a memory session, else the whole thread"""
+    if rag_workflow.llm_agent.sessions.has(conversation_id(channel, parent_ts)):
+        return text
+    thread_history = get_thread_history(client, channel, parent_ts)
+    return f"Conversation so far:\n{thread_history}\n\nLatest user message:\n{text}"
+
+def run_rag_sync(query: str, user_email: str, conversation: str = None):
+    # Run on the workflow's long-lived loop so pooled connections are reused
+    return rag_workflow.run_sync(
         rag_workflow.run_workflow(
             query=query,
             uploaded_files=[],
             user_email=user_email,
+            conversation_id=conversation,
             search_limit=5
         )
     )
 
-def safe_run_rag(query: str, user_email: str) -> str:
+def safe_run_rag(query: str, user_email: str, conversation: str = None) -> str:
     """
     Run the workflow, sanitize errors, and append formatted source links if available.
 
     Returns a single string ready to send to Slack.
     """
     try:
-        result_state = run_rag_sync(query, user_email)
-
-        # Extract response depending on what workflow returns
-        if hasattr(result_state, 'final_response'):
-            response = result_state.final_response
-            stats = getattr(result_state, "stats", {}) or {}
-        else:
-            # result_state might be a dict
-            response = result_state.get('final_response', '')
-            stats = result_state.get('stats', {}) or {}
-
-        # Sanitize known error patterns (workflow might return an error string)
-        if (not response) or ("Response generation failed" in response) or ("Error code" in response) or ("does not exist" in response):
-            logger.warning("Sanitized backend error returned to user (hidden).")
-            return "⚠️ Unable to answer your question currently. I’ll be available soon."
-
-        # Format main response
-        final_text = format_slack_response(response)
-
-        # Attach sources if available in stats
-        web_sources = stats.get("web_sources") or []
-        # Some workflows may include sources at top-level (legacy)
-        if not web_sources and isinstance(result_state, dict):
-            web_sources = result_state.get("web_sources") or []
-
-        # Build a concise sources block (limit to 5)
-        if web_sources:
-            sources_lines = []
-            for s in web_sources[:5]:
-                # Accept different possible key names
-                title = s.get("title") or s.get("name") or s.get("source") or s.get("snippet") or "Source"
-                url = s.get("url") or s.get("link") or s.get("href") or ""
-                # Slack link formatting: <url|title>
-                if url:
-                    # sanitize title to avoid newlines
-                    title_clean = title.replace("\n", " ").strip()
-                    sources_lines.append(f"• <{url}|{title_clean}>")
-                else:
-                    sources_lines.append(f"• {title}")
-
-            if sources_lines:
-                sources_text = "\n\n*Sources:*\n" + "\n".join(sources_lines)
-                # Ensure message stays within limits
-                if len(final_text) + len(sources_text) > 3800:
-                    # shorten sources list if needed
-                    truncated = "\n".join(sources_lines[:2])
-                    sources_text = "\n\n*Sources:*\n" + truncated + "\n• ... (more)"
-                final_text = final_text + sources_text
+        return format_rag_result(run_rag_sync(query, user_email, conversation))
+    except Exception:
+        logger.error("RAG workflow crashed", exc_info=True)
+        return "⚠️ Unable to answer your question currently. I’ll be available soon."
 
-        return final_text
+def stream_rag(client, channel: str, ts: str, query: str, user_email: str, conversation: str = None) -> str:
+    """
+    Like safe_run_rag, but edits the placeholder message (ts) as the answer streams in.
 
+    Returns the final string to send to Slack.
+    """
+    if not Config.LLM_STREAMING:
+        return safe_run_rag(query, user_email, conversation)
+    try:
+        message = StreamingMessage(client, channel, ts)
+        text, result_state, running = "", None, {}
+        events = rag_workflow.iterate_sync(
+            rag_workflow.run_workflow(
+                query=query, uploaded_files=[], user_email=user_email, conversation_id=conversation,
+                search_limit=5, stream=True,
+            )
+        )
+        for event in events:
+            if event["event"] == "token":
+                text += event["content"]
+                message.update(format_slack_response(text) + " ▌")
+            elif event["event"] in ("tool_call", "tool_result"):
+                # Tools of one turn run concurrently: show every one still running
+                if event["event"] == "tool_call":
+                    # Text before a tool call is narration; the answer starts after the tools ran
+                    text = ""
+                    running[event["id"]] = event["name"]
+                else:
+                    running.pop(event["id"], None)
+                if running:
+                    status = f"🔧 Running {', '.join(running.values())}…"
+                    message.update(f"{format_slack_response(text)}\n\n{status}" if text else status)
+            elif event["event"] == "done":
+                result_state = event["state"]
+        stats = (result_state or {}).get("stats", {})
+        logger.info(
+            f"Streamed reply with {message.updates} message updates; prompt {stats.get('prompt_tokens', 0)} tokens "
+            f"({stats.get('history_tokens', 0)} of conversation history)"
+        )
+        return format_rag_result(result_state or {})
     except Exception:
         logger.error("RAG workflow crashed", exc_info=True)
         return "⚠️ Unable to answer your question currently. I’ll be available soon."
 
+def format_rag_result(result_state) -> str:
+    """Sanitize errors and append formatted source links to the workflow's answer."""
+    # Extract response depending on what workflow returns
+    if hasattr(result_state, 'final_response'):
+        response = result_state.final_response
+        stats = getattr(result_state, "stats", {}) or {}
+    else:
+        # result_state might be a dict
+        response = result_state.get('final_response', '')
+        stats = result_state.get('stats', {}) or {}
+
+    # Sanitize known error patterns (workflow might return an error string)
+    if (not response) or ("Response generation failed" in response) or ("Error code" in response) or ("does not exist" in response):
+        logger.warning("Sanitized backend error returned to user (hidden).")
+        return "⚠️ Unable to answer your question currently. I’ll be available soon."
+
+    # Format main response
+    final_text = format_slack_response(response)
+
+    # Attach sources if available in stats
+    web_sources = stats.get("web_sources") or []
+    # Some workflows may include sources at top-level (legacy)
+    if not web_sources and isinstance(result_state, dict):
+        web_sources = result_state.get("web_sources") or []
+
+    # Build a concise sources block (limit to 5)
+    if web_sources:
+        sources_lines = []
+        for s in web_sources[:5]:
+            # Accept different possible key names
+            title = s.get("title") or s.get("name") or s.get("source") or s.get("snippet") or "Source"
+            url = s.get("url") or s.get("link") or s.get("href") or ""
+            # Slack link formatting: <url|title>
+            if url:
+                # sanitize title to avoid newlines
+                title_clean = title.replace("\n", " ").strip()
+                sources_lines.append(f"• <{url}|{title_clean}>")
+            else:
+                sources_lines.append(f"• {title}")
+
+        if sources_lines:
+            sources_text = "\n\n*Sources:*\n" + "\n".join(sources_lines)
+            # Ensure message stays within limits
+            if len(final_text) + len(sources_text) > 3800:
+                # shorten sources list if needed
+                truncated = "\n".join(sources_lines[:2])
+                sources_text = "\n\n*Sources:*\n" + truncated + "\n• ... (more)"
+            final_text = final_text + sources_text
+
+    return final_text
+
 
 # ---------- Event: @mention ----------
-@app.event("app_mention")
 def handle_app_mention(event, say, client):
     try:
         channel = event["channel"]
@@ -187,10 +274,9 @@ def handle_app_mention(event, say, client):
         thinking_ts = post_thinking(client, channel, parent_ts)
 
         # Thread-based conversation context
-        thread_history = get_thread_history(client, channel, parent_ts)
-        full_query = f"Conversation so far:\n{thread_history}\n\nLatest user message:\n{text}"
+        full_query = conversation_query(client, channel, parent_ts, text)
 
-        final_text = safe_run_rag(full_query, user_email)
+        final_text = stream_rag(client, channel, thinking_ts, full_query, user_email, conversation_id(channel, parent_ts))
         update_message(client, channel, thinking_ts, final_text)
 
     except Exception:
@@ -202,7 +288,6 @@ def handle_app_mention(event, say, client):
             say(text="❌ Sorry, something went wrong. The issue has been logged.",
                 thread_ts=event.get("ts"))
 
-@app.message(".*")
 def handle_message(message, say, client):
     try:
         if "bot_id" in message or "subtype" in message:
@@ -224,10 +309,9 @@ def handle_message(message, say, client):
         thinking_ts = post_thinking(client, channel, parent_ts)
 
         # DM thread-based context
-        thread_history = get_thread_history(client, channel, parent_ts)
-        full_query = f"Conversation so far:\n{thread_history}\n\nLatest user message:\n{text}"
+        full_query = conversation_query(client, channel, parent_ts, text)
 
-        final_text = safe_run_rag(full_query, user_email)
+        final_text = stream_rag(client, channel, thinking_ts, full_query, user_email, conversation_id(channel, parent_ts))
         update_message(client, channel, thinking_ts, final_text)
 
     except Exception:
@@ -240,8 +324,7 @@ def handle_message(message, say, client):
                 thread_ts=message.get("ts"))
 
 # ---------- Slash command: /rag ----------
-@app.command("/rag")
-def handle_rag_command(ack, respond, command):
+def handle_rag_command(ack, respond, command, client):
     ack()
     try:
         text = (command.get("text") or "").strip()
@@ -252,22 +335,44 @@ def handle_rag_command(ack, respond, command):
             respond("Please provide a question after the /rag command. Example: `/rag What is machine learning?`")
             return
 
-        user_email = get_user_email(app.client, user_id)
-        res = app.client.chat_postMessage(channel=channel, text="🧠 Thinking…", link_names=True)
+        user_email = get_user_email(client, user_id)
+        res = client.chat_postMessage(channel=channel, text="🧠 Thinking…", link_names=True)
         thinking_ts = res["ts"]
 
-        final_text = safe_run_rag(text, user_email)
-        update_message(app.client, channel, thinking_ts, final_text)
+        final_text = stream_rag(client, channel, thinking_ts, text, user_email, conversation_id(channel))
+        update_message(client, channel, thinking_ts, final_text)
 
     except Exception:
         logger.error("Error processing command", exc_info=True)
         try:
-            update_message(app.client, channel, thinking_ts, "❌ Sorry, something went wrong. The issue has been logged.")
+            update_message(client, channel, thinking_ts, "❌ Sorry, something went wrong. The issue has been logged.")
         except Exception:
             respond("❌ Sorry, something went wrong while processing your command. The issue has been logged.")
 
+def create_app() -> App:
+    """Build the Slack app, the RAG workflow and the bot user id, and register the handlers"""
+    global app, rag_workflow, bot_user_id
+    app = App(
+        token=os.environ.get("SLACK_BOT_TOKEN"),
+        signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
+    )
+    rag_workflow = RAGWorkflow()
+
+    # Get bot user ID for mention handling
+    try:
+        bot_user_id = app.client.auth_test()["user_id"]
+    except Exception as e:
+        print(f"Warning: Could not get bot user ID: {e}")
+        bot_user_id = None
+
+    app.event("app_mention")(handle_app_mention)
+    app.message(".*")(handle_message)
+    app.command("/rag")(handle_rag_command)
+    return app
+
 if __name__ == "__main__":
     try:
+        create_app()
         print("🚀 Starting Slack RAG Bot...")
         print(f"Bot User ID: {bot_user_id}")
 
@@ -285,3 +390,6 @@ if __name__ == "__main__":
         print("\n🛑 Bot stopped by user")
     except Exception as e:
         print(f"❌ Failed to start bot: {e}")
+    finally:
+        if rag_workflow is not None:
+            rag_workflow.close()
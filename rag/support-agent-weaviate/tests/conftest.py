@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# tools/tools_notion_and_cal.py reads these with os.environ[...] at import time; the tests never reach Notion
+os.environ.setdefault("NOTION_API_KEY", "test-notion-key")
+os.environ.setdefault("NOTION_DATABASE_ID", "test-notion-database")
@@ -0,0 +1,79 @@
+"""Concurrent LLMAgent.generate_response calls on the pooled "llm" client, against a stubbed transport."""
+import asyncio
+import json
+
+import httpx
+
+from agents.llm_agent import LLMAgent
+from config import Config
+from services.http_clients import HTTPClients
+
+CALLS = 8
+LATENCY = 0.2
+
+
+class FakeChatCompletions:
+    """httpx.MockTransport handler answering /chat/completions after LATENCY, tracking overlap"""
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path.endswith("/chat/completions")
+        body = json.loads(request.content)
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(LATENCY)
+        finally:
+            self.in_flight -= 1
+        # The user prompt opens with "Question: <query>"
+        question = body["messages"][-1]["content"].split("\n", 1)[0].removeprefix("Question: ")
+        return httpx.Response(200, json={
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"answer to: {question}"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+
+def test_concurrent_generate_response_shares_pooled_client(monkeypatch):
+    fake = FakeChatCompletions()
+    created = []
+
+    def create_client(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(fake))
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(HTTPClients, "_create_client", create_client)
+    monkeypatch.setattr(Config, "NEBIUS_API_KEY", "test-key")
+    monkeypatch.setattr(Config, "LLM_MAX_RETRIES", 0)
+
+    async def run():
+        pools = HTTPClients()
+        agent = LLMAgent(http_client=pools.get("llm"))
+        try:
+            return await asyncio.gather(*(
+                agent.generate_response(f"question {i}", conversation_id=f"conversation-{i}")
+                for i in range(CALLS)
+            ))
+        finally:
+            await pools.aclose()
+
+    responses = asyncio.run(asyncio.wait_for(run(), timeout=CALLS * LATENCY + 5))
+
+    # One pooled client carried every completion, and the completions overlapped instead of queueing
+    assert len(created) == 1
+    assert fake.requests == CALLS
+    assert fake.max_in_flight == CALLS
+    assert [r["content"] for r in responses] == [f"answer to: question {i}" for i in range(CALLS)]
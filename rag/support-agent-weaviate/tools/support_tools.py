@@ -7,6 +7,11 @@ AVAILABLE_TOOLS = {
     "web_search":         web_search,
 }
 
+# Tools with side effects (a Notion page, a booking): not idempotent, so they run one at a time, without
+# TOOL_CALL_TIMEOUT, and once started are never cancelled (not even when the reply stops being consumed),
+# since a cancelled call may already have gone through
+WRITE_TOOLS = {"notion_append_entry", "cal_create_booking"}
+
 SUPPORT_TOOLS = [
     {"type": "function", "function": convert_to_openai_function(t)}
     for t in AVAILABLE_TOOLS.values()
@@ -6,8 +6,9 @@ LangChain-style tools
 """
 from __future__ import annotations
 
+from contextvars import ContextVar
 from datetime import datetime
-import os, requests, asyncio
+import os, httpx, asyncio
 from typing import Dict, Any, List
 from langchain_core.tools import tool
 from agents.search_agent import SearchAgent
@@ -28,6 +29,24 @@ HEADERS_NOTION = {
     "Content-Type": "application/json",
 }
 
+# Shared pooled clients (services.http_clients.HTTPClients), set by RAGWorkflow
+_http_clients = None
+# False while a tool runs through its sync .invoke() entry point, on a private loop the pools don't belong to
+_use_pool: ContextVar[bool] = ContextVar("use_pool", default=True)
+
+
+def set_http_clients(clients) -> None:
+    """Route Notion/Calendly calls through the workflow's pooled HTTP clients"""
+    global _http_clients
+    _http_clients = clients
+
+
+async def _post(upstream: str, url: str, **kwargs) -> httpx.Response:
+    if _http_clients is not None and _use_pool.get():
+        return await _http_clients.get(upstream).post(url, **kwargs)
+    async with httpx.AsyncClient() as client:
+        return await client.post(url, **kwargs)
+
 # ── helpers ──────────────────────────────────────────────
 # tools/notion_and_cal.py
 FIXED_SCHEMA: Dict[str, Any] = {
@@ -88,7 +107,7 @@ def _format_props(data: Dict[str, Any]) -> Dict[str, Any]:
 
 # ── Notion tool ──────────────────────────────────────────
 @tool
-def notion_append_entry(
+async def notion_append_entry(
     Name: str,
     Description_: str,          # renamed to avoid Python identifier issue
     Priority: str,
@@ -118,10 +137,10 @@ def notion_append_entry(
     }
 
     try:
-        r = requests.post("https://api.notion.com/v1/pages",
-                          json=payload, headers=HEADERS_NOTION, timeout=15)
+        r = await _post("notion", "https://api.notion.com/v1/pages",
+                        json=payload, headers=HEADERS_NOTION, timeout=15)
         r.raise_for_status()
-    except requests.exceptions.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         raise RuntimeError(f"Notion API error: {e.response.text}") from e
     return f"✅ Notion row created (page id: {r.json()['id']})"
 
@@ -129,7 +148,7 @@ def notion_append_entry(
 PRESET_EVENT_TYPE_ID = "29031588-4d93-4889-b714-df826bc756d2"  # Replace with your actual Event Type ID
 
 @tool
-def cal_create_booking() -> str:
+async def cal_create_booking() -> str:
     """
     Return a scheduling link for the pre-configured Calendly event.
     Uses CALENDLY_EVENT_TYPE_ID from env/config, falls back to preset.
@@ -138,7 +157,8 @@ def cal_create_booking() -> str:
         if not CALENDLY_API_KEY:
             raise RuntimeError("Missing CALENDLY_API_KEY")
         event_type_id = CALENDLY_EVENT_TYPE_ID or PRESET_EVENT_TYPE_ID
-        r = requests.post(
+        r = await _post(
+            "calendly",
             "https://api.calendly.com/scheduling_links",
             headers={
                 "Content-Type": "application/json",
@@ -152,7 +172,7 @@ def cal_create_booking() -> str:
             timeout=15,
         )
         r.raise_for_status()
-    except requests.exceptions.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         raise RuntimeError(f"Calendly API error: {e.response.text}") from e
     except Exception as e:
         raise RuntimeError(str(e))
@@ -174,8 +194,16 @@ async def web_search(query: str, num_results: int | None = None) -> List[Dict[st
     return results
 
 
-# utility so LLMAgent can call tools sync or async
-async def run_tool(tool_fn, args):
-    if asyncio.iscoroutinefunction(tool_fn):
-        return await tool_fn(**args)
-    return await asyncio.to_thread(tool_fn, **args)
+def _sync_entry_point(coroutine):
+    """Let synchronous callers keep using .invoke(): run the tool on a private loop with a one-off client"""
+    def run(**kwargs):
+        token = _use_pool.set(False)
+        try:
+            return asyncio.run(coroutine(**kwargs))
+        finally:
+            _use_pool.reset(token)
+    return run
+
+
+for _tool in (notion_append_entry, cal_create_booking, web_search):
+    _tool.func = _sync_entry_point(_tool.coroutine)